@@ -0,0 +1,367 @@
+"""Sales aggregates over a date-sorted index.
+
+SalesIndex keeps sales ordered by timestamp next to an epoch column and running
+totals of revenue, orders and items. A date range is two bisects into the epoch
+column and its totals are two prefix-sum lookups, so a series of B buckets costs
+O(B log n) however many sales fall inside it.
+"""
+import csv
+import heapq
+import random
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta
+
+GRANULARITIES = ('hour', 'day', 'week', 'month')
+
+# Epochs are seconds since this naive datetime. Sale timestamps carry no timezone,
+# so local wall-clock time is kept as-is and DST changes don't skew hour buckets.
+EPOCH = datetime(1970, 1, 1)
+
+
+def to_local(dt):
+    """dt as naive local time. Aware datetimes (an imported '...+08:00' timestamp) are
+    converted to this machine's zone, so they sort and bucket with the naive ones."""
+    if dt.tzinfo is not None:
+        return dt.astimezone().replace(tzinfo=None)
+    return dt
+
+
+def to_epoch(dt):
+    return (to_local(dt) - EPOCH).total_seconds()
+
+
+def from_epoch(seconds):
+    return EPOCH + timedelta(seconds=seconds)
+
+
+def parse_timestamp(text):
+    """'YYYY-MM-DD HH:MM:SS' or 'YYYY-MM-DD' to a naive local datetime, or None if it
+    isn't a date. A UTC offset, if present, is converted away (see to_local).
+
+    Uses the C ISO parser instead of strptime; callers reject None once at load time."""
+    try:
+        return to_local(datetime.fromisoformat(text.strip()))
+    except (ValueError, AttributeError, OverflowError, OSError):
+        return None
+
+
+def line_amount(item):
+    """price * quantity for one line item dict."""
+    return float(item.get('price', 0)) * float(item.get('quantity', 1))
+
+
+def item_count(sale):
+    """Units sold in a sale (sum of line quantities)."""
+    count = 0
+    for item in sale.items or ():
+        try:
+            count += int(item.get('quantity', 1))
+        except (TypeError, ValueError, AttributeError):
+            count += 1
+    return count
+
+
+# --- Buckets ---
+
+def bucket_start(dt, granularity):
+    """Start of the bucket containing dt. Weeks start on Monday."""
+    if granularity == 'hour':
+        return dt.replace(minute=0, second=0, microsecond=0)
+    day = dt.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == 'day':
+        return day
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+
+def next_bucket(dt, granularity):
+    if granularity == 'hour':
+        return dt + timedelta(hours=1)
+    if granularity == 'day':
+        return dt + timedelta(days=1)
+    if granularity == 'week':
+        return dt + timedelta(days=7)
+    if granularity == 'month':
+        return dt.replace(year=dt.year + 1, month=1) if dt.month == 12 else dt.replace(month=dt.month + 1)
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+
+def bucket_label(dt, granularity):
+    """Sortable label: '2025-11-26 14:00', '2025-11-26', '2025-W48' or '2025-11'."""
+    if granularity == 'hour':
+        return dt.strftime('%Y-%m-%d %H:00')
+    if granularity == 'day':
+        return dt.strftime('%Y-%m-%d')
+    if granularity == 'week':
+        year, week, _ = dt.isocalendar()
+        return f"{year}-W{week:02d}"
+    return dt.strftime('%Y-%m')
+
+
+class SeriesPoint:
+    __slots__ = ('label', 'start', 'revenue', 'orders', 'items')
+
+    def __init__(self, label, start, revenue, orders, items):
+        self.label = label
+        self.start = start
+        self.revenue = revenue
+        self.orders = orders
+        self.items = items
+
+    def to_row(self):
+        return [self.label, f"{self.revenue:.2f}", self.orders, self.items]
+
+
+# --- Index ---
+
+class SalesIndex:
+    """Sales sorted by timestamp, with parallel epoch and prefix-sum columns."""
+    def __init__(self):
+        self.sales = []
+        self.epochs = array('d')
+        # prefix[i] = total over sales[:i], so prefix[hi] - prefix[lo] is a range total
+        self.revenue_prefix = array('d', [0.0])
+        self.item_prefix = array('q', [0])
+
+    def __len__(self):
+        return len(self.sales)
+
+    @classmethod
+    def build(cls, dated_sales):
+        """Builds an index from (datetime, sale) pairs in any order. Naive and aware
+        datetimes may be mixed; sorting is on the epoch."""
+        index = cls()
+        for epoch, sale in sorted(((to_epoch(dt), sale) for dt, sale in dated_sales), key=lambda pair: pair[0]):
+            index.append(epoch, sale)
+        return index
+
+    def append(self, epoch, sale):
+        """Adds a sale at the end; it must not be older than the newest indexed sale."""
+        if self.epochs and epoch < self.epochs[-1]:
+            raise ValueError("SalesIndex.append() needs sales in date order")
+        self.sales.append(sale)
+        self.epochs.append(epoch)
+        self.revenue_prefix.append(self.revenue_prefix[-1] + sale.total)
+        self.item_prefix.append(self.item_prefix[-1] + item_count(sale))
+
+    # --- Range queries ---
+
+    def bounds(self, start=None, end=None):
+        """(lo, hi) positions of the sales with start <= timestamp < end. None means open."""
+        lo = 0 if start is None else bisect_left(self.epochs, to_epoch(start))
+        hi = len(self.epochs) if end is None else bisect_left(self.epochs, to_epoch(end))
+        return lo, max(lo, hi)
+
+    def range(self, start=None, end=None):
+        """Sales in [start, end), oldest first."""
+        lo, hi = self.bounds(start, end)
+        return self.sales[lo:hi]
+
+    def totals(self, start=None, end=None):
+        """(revenue, orders, items) for [start, end)."""
+        lo, hi = self.bounds(start, end)
+        return (self.revenue_prefix[hi] - self.revenue_prefix[lo], hi - lo,
+                self.item_prefix[hi] - self.item_prefix[lo])
+
+    def first_date(self):
+        return from_epoch(self.epochs[0]) if self.epochs else None
+
+    def last_date(self):
+        return from_epoch(self.epochs[-1]) if self.epochs else None
+
+    def series(self, granularity='day', start=None, end=None):
+        """Revenue, order and item totals per bucket over [start, end), as SeriesPoints.
+
+        Open ends are clamped to the first/last sale. Empty buckets are included with
+        zero totals so the series has no gaps."""
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown granularity: {granularity}")
+        if not self.epochs:
+            return []
+        first = self.first_date() if start is None else max(start, self.first_date())
+        stop = self.last_date() + timedelta(microseconds=1) if end is None else end
+        if first >= stop:
+            return []
+
+        points = []
+        epochs = self.epochs
+        revenue = self.revenue_prefix
+        items = self.item_prefix
+        bucket = bucket_start(first, granularity)
+        lo = bisect_left(epochs, to_epoch(first))
+        while bucket < stop:
+            following = next_bucket(bucket, granularity)
+            hi = bisect_left(epochs, to_epoch(min(following, stop)), lo)
+            points.append(SeriesPoint(bucket_label(bucket, granularity), bucket,
+                                      revenue[hi] - revenue[lo], hi - lo, items[hi] - items[lo]))
+            lo = hi
+            bucket = following
+        return points
+
+
+# --- Categories ---
+
+UNCATEGORIZED = 'Uncategorized'
+
+
+class CategoryJoin:
+    """Joins sale line items to a category.
+
+    An item's own category (snapshotted at sale time) wins. Older sales that predate
+    the snapshot fall back to the product's current catalog category through a
+    product_id hash lookup, and products no longer in the catalog count as Uncategorized."""
+    def __init__(self, store=None):
+        self.by_product = {}
+        if store is not None:
+            categories = store.categories
+            self.by_product = {pid: categories[cid] for pid, cid in zip(store.ids, store.category_ids)}
+
+    def category(self, item):
+        snapshot = item.get('category')
+        if snapshot:
+            return snapshot
+        return self.by_product.get(str(item.get('product_id', ''))) or UNCATEGORIZED
+
+    def fill(self, sale):
+        """Writes the resolved category onto every line item that doesn't carry one."""
+        for item in sale.items or ():
+            if isinstance(item, dict) and not item.get('category'):
+                item['category'] = self.category(item)
+
+    def line_totals(self, sale):
+        """[(category, amount)] for one sale, one entry per category it touched."""
+        if not sale.items:
+            return [(UNCATEGORIZED, sale.total)]
+        totals = {}
+        for item in sale.items:
+            try:
+                amount = line_amount(item)
+                category = self.category(item)
+            except (TypeError, ValueError, AttributeError):
+                amount, category = 0.0, UNCATEGORIZED
+            totals[category] = totals.get(category, 0.0) + amount
+        return list(totals.items())
+
+
+# --- Top-K ---
+
+class CountMinSketch:
+    """Fixed-size frequency sketch. estimate() never undercounts and overcounts by at
+    most about total_weight * e / width with high probability (depth rows)."""
+    PRIME = (1 << 61) - 1
+
+    def __init__(self, width=4096, depth=4):
+        self.width = width
+        self.depth = depth
+        self.rows = [array('d', bytes(8 * width)) for _ in range(depth)]
+        # One (a, b) pair per row: ((a * hash + b) mod p) mod width keeps the rows independent
+        rng = random.Random()
+        self.salts = [(rng.randrange(1, self.PRIME), rng.randrange(self.PRIME)) for _ in range(depth)]
+
+    def slots(self, key):
+        h = hash(key)
+        p, width = self.PRIME, self.width
+        return [((a * h + b) % p) % width for a, b in self.salts]
+
+    def add(self, key, amount=1.0):
+        """Adds amount (which must not be negative) and returns the new estimate."""
+        estimate = None
+        for row, i in zip(self.rows, self.slots(key)):
+            row[i] += amount
+            if estimate is None or row[i] < estimate:
+                estimate = row[i]
+        return estimate
+
+    def estimate(self, key):
+        return min(row[i] for row, i in zip(self.rows, self.slots(key)))
+
+
+class TopK:
+    """Streaming top-k by summed amount.
+
+    Exact mode keeps one running total per key and picks the winners with a k-sized
+    heap (heapq.nlargest) instead of sorting every key. Approximate mode keeps totals
+    in a CountMinSketch and only tracks k candidates in a min-heap, so memory stays
+    fixed however many distinct keys the range holds."""
+    def __init__(self, k=5, approximate=False, width=4096, depth=4):
+        self.k = k
+        self.approximate = approximate
+        self.totals = {}
+        if approximate:
+            self.sketch = CountMinSketch(width, depth)
+            self.heap = []  # (estimate, key); stale entries are skipped on pop
+
+    def add(self, key, amount):
+        if not self.approximate:
+            self.totals[key] = self.totals.get(key, 0.0) + amount
+            return
+        estimate = self.sketch.add(key, amount)
+        candidates = self.totals
+        if key in candidates or len(candidates) < self.k:
+            candidates[key] = estimate
+            heapq.heappush(self.heap, (estimate, key))
+        else:
+            floor_estimate, floor_key = self.floor()
+            if estimate > floor_estimate:
+                del candidates[floor_key]
+                heapq.heappop(self.heap)
+                candidates[key] = estimate
+                heapq.heappush(self.heap, (estimate, key))
+        if len(self.heap) > 8 * self.k:
+            self.heap = [(v, key) for key, v in candidates.items()]
+            heapq.heapify(self.heap)
+
+    def floor(self):
+        """Smallest live candidate, dropping stale heap entries on the way."""
+        heap = self.heap
+        while heap[0][1] not in self.totals or self.totals[heap[0][1]] != heap[0][0]:
+            heapq.heappop(heap)
+        return heap[0]
+
+    def top(self):
+        """[(key, total)] for the k largest totals, largest first."""
+        return heapq.nlargest(self.k, self.totals.items(), key=lambda kv: kv[1])
+
+
+class SalesRankings:
+    """Top products, categories and cashiers by revenue, from one pass over the sales.
+    add_sale() can be called as sales arrive to keep the rankings current."""
+    def __init__(self, k=5, approximate=False, join=None):
+        self.products = TopK(k, approximate)
+        self.categories = TopK(k, approximate)
+        self.cashiers = TopK(k, approximate)
+        self.join = join or CategoryJoin()
+
+    def add_sale(self, sale):
+        products = self.products
+        for item in sale.items or ():
+            try:
+                products.add(item.get('name') or item.get('product_id', ''), line_amount(item))
+            except (TypeError, ValueError, AttributeError):
+                continue
+        lines = getattr(sale, 'category_lines', None)
+        if lines is None:
+            lines = self.join.line_totals(sale)
+        for category, amount in lines:
+            self.categories.add(category, amount)
+        self.cashiers.add(str(sale.cashier_id or ''), sale.total)
+
+    def add_sales(self, sales):
+        for sale in sales:
+            self.add_sale(sale)
+        return self
+
+
+SERIES_HEADER = ["Period", "Revenue", "Orders", "Items"]
+
+
+def write_series_csv(filename, points):
+    with open(filename, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(SERIES_HEADER)
+        for point in points:
+            writer.writerow(point.to_row())
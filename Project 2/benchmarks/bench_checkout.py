@@ -0,0 +1,235 @@
+"""Headless checkout benchmark.
+
+Builds a synthetic data directory with create_sample_sales, then rings
+up sales the way SalesWindow.checkout does (catalog load, reserved sale id, Sale and
+SaleItem objects, journaled commit) and prints one JSON line per durability mode:
+p50/p99 latency to receipt (journaled) and to fully written, sales/sec and memory.
+With --ui-sales N (needs PyQt5), a last line (mode "ui") comes from N checkouts driven
+through SalesWindow.record_sale under the offscreen Qt platform, against the snapshot-backed
+products the window loads, and checks the stock it shows afterwards.
+
+    python benchmarks/bench_checkout.py --products 100000 --history 1000000 --sales 2000
+
+The dataset is generated once per invocation and copied for each mode, and every
+random choice comes from --seed, so runs with the same arguments are comparable.
+Dataset generation and every run happen in their own process, so each run's peak
+RSS is its own; rss_baseline_mb is the peak just before the timed phase.
+"""
+import argparse
+import importlib.util
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog_snapshot import CatalogSnapshot  # noqa: E402
+from checkout import DURABILITY_MODES, CheckoutJournal, CheckoutService  # noqa: E402
+from create_sample_sales import create_dataset  # noqa: E402
+from models import Sale, SaleItem  # noqa: E402
+from sales_store import SalesStore  # noqa: E402
+
+from bench_util import percentile  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1 << 20 if sys.platform == 'darwin' else 1 << 10), 1)
+
+
+def isolated(fn, *args):
+    """Runs fn(*args) in a fresh process and returns its result."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return pool.submit(fn, *args).result()
+
+
+def in_directory(path, fn, *args):
+    os.chdir(path)
+    return fn(*args)
+
+
+def ring_up(mode, sales, seed, trace_memory):
+    """Runs sales checkouts in the current directory and returns the measurements."""
+    store = SalesStore()
+    store.ensure()
+    service = CheckoutService(CheckoutJournal(), store, 'products.csv', durability=mode)
+    rng = random.Random(seed)
+
+    load_started = time.perf_counter()
+    products = CatalogSnapshot.load_store('products.csv').rows(active_only=True)
+    load_ms = (time.perf_counter() - load_started) * 1000
+
+    receipt_ms = []
+    done_at = {}
+    pendings = []
+    rss_baseline = peak_rss_mb()
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    for _ in range(sales):
+        t0 = time.perf_counter()
+        cart = [SaleItem(p.product_id, p.name, rng.randint(1, 3), p.price, category=p.category)
+                for p in rng.sample(products, rng.randint(1, 4))]
+        now = datetime.now()
+        total = sum(item.subtotal for item in cart)
+        sale = Sale(store.reserve_sale_id(), now.strftime('%Y-%m-%d'), now.strftime('%H:%M:%S'), cart,
+                    total, sum(item.tax_amount for item in cart), 0.0, 'cash', '1')
+        pending = service.submit(sale.to_dict(), [(item.product_id, item.quantity) for item in cart],
+                                 on_done=lambda p: done_at.__setitem__(p.txn, time.perf_counter()))
+        pending.wait_journaled()
+        receipt_ms.append((time.perf_counter() - t0) * 1000)
+        pendings.append((pending, t0))
+    service.close()
+    elapsed = time.perf_counter() - started
+    traced_peak = None
+    if trace_memory:
+        traced_peak = round(tracemalloc.get_traced_memory()[1] / (1 << 20), 2)
+        tracemalloc.stop()
+
+    failed = sum(1 for pending, _ in pendings if pending.error is not None)
+    done_ms = [(done_at[p.txn] - t0) * 1000 for p, t0 in pendings if p.txn in done_at]
+    return {
+        'catalog_load_ms': round(load_ms, 1),
+        'seconds': round(elapsed, 3),
+        'sales_per_sec': round(sales / elapsed, 1),
+        'receipt_p50_ms': round(percentile(receipt_ms, 50), 3),
+        'receipt_p99_ms': round(percentile(receipt_ms, 99), 3),
+        'written_p50_ms': round(percentile(done_ms, 50), 3),
+        'written_p99_ms': round(percentile(done_ms, 99), 3),
+        'failed': failed,
+        'traced_peak_mb': traced_peak,
+        'rss_baseline_mb': rss_baseline,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def ui_ring_up(sales, seed):
+    """Rings up sales through SalesWindow.record_sale (offscreen Qt) in the current
+    directory and returns the measurements, including whether the stock the window
+    shows matches products.csv once everything is written."""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtCore import QEventLoop
+    from PyQt5.QtWidgets import QApplication
+    from checkout import checkout_service
+    from csv_handler import CSVHandler
+    from models import User
+    from ui.sales_window import SalesWindow
+
+    app = QApplication.instance() or QApplication([])
+    window = SalesWindow(User('1', 'admin', 'x', 'Admin'))
+    window.refresh_timer.stop()
+    window.loader.wait()
+    app.processEvents()
+    rng = random.Random(seed)
+    committed = []
+    receipts = []
+    window.committer.sale_committed.connect(committed.append)
+    # The receipt dialog is modal; note when it would open instead
+    window.show_receipt = lambda sale, payment_method: receipts.append(time.perf_counter())
+
+    def wait_for(condition, timeout=30):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                raise TimeoutError("checkout did not finish")
+            app.processEvents(QEventLoop.AllEvents, 10)
+
+    products = [p for p in window.products if p.stock > 0]
+    rss_baseline = peak_rss_mb()
+    record_ms = []
+    receipt_ms = []
+    written_ms = []
+    for n in range(sales):
+        window.cart = [SaleItem(p.product_id, p.name, 1, p.price, category=p.category)
+                       for p in rng.sample(products, rng.randint(1, 4))]
+        total = sum(item.subtotal for item in window.cart)
+        t0 = time.perf_counter()
+        if window.record_sale('cash', total) is None:
+            raise RuntimeError("record_sale failed")
+        record_ms.append((time.perf_counter() - t0) * 1000)
+        wait_for(lambda: len(receipts) > n)
+        receipt_ms.append((receipts[-1] - t0) * 1000)
+        wait_for(lambda: len(committed) > n)
+        written_ms.append((time.perf_counter() - t0) * 1000)
+    checkout_service.close()
+
+    # Overlay and reloaded snapshot together must show what the writer stored
+    window.refresh_products()
+    window.loader.wait()
+    app.processEvents()
+    stored = {row['product_id']: int(float(row.get('stock') or 0))
+              for row in CSVHandler.read_csv('products.csv')}
+    stock_ok = all(window.stock_of(p) == stored.get(p.product_id) for p in window.products)
+    window.close()
+    return {
+        'record_sale_p50_ms': round(percentile(record_ms, 50), 3),
+        'record_sale_p99_ms': round(percentile(record_ms, 99), 3),
+        'receipt_p50_ms': round(percentile(receipt_ms, 50), 3),
+        'receipt_p99_ms': round(percentile(receipt_ms, 99), 3),
+        'written_p50_ms': round(percentile(written_ms, 50), 3),
+        'written_p99_ms': round(percentile(written_ms, 99), 3),
+        'stock_ok': stock_ok,
+        'rss_baseline_mb': rss_baseline,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Headless checkout benchmark')
+    parser.add_argument('--products', type=int, default=1000, help='catalog size (SKUs)')
+    parser.add_argument('--history', type=int, default=10000, help='existing sales before the run')
+    parser.add_argument('--sales', type=int, default=500, help='checkouts to time')
+    parser.add_argument('--modes', nargs='+', choices=DURABILITY_MODES, default=list(DURABILITY_MODES))
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='report the tracemalloc peak of the timed phase (slows it down)')
+    parser.add_argument('--ui-sales', type=int, default=0,
+                        help='checkouts driven through SalesWindow (needs PyQt5; default 0 skips them)')
+    args = parser.parse_args()
+    if args.ui_sales and importlib.util.find_spec('PyQt5') is None:
+        print("PyQt5 is not installed; skipping --ui-sales", file=sys.stderr)
+        args.ui_sales = 0
+
+    with tempfile.TemporaryDirectory() as root:
+        template = os.path.join(root, 'template')
+        started = time.perf_counter()
+        isolated(create_dataset, template, args.products, args.history, 10, 10, 365, args.seed)
+        setup_seconds = round(time.perf_counter() - started, 1)
+
+        runs = [(mode, ring_up, (mode, args.sales, args.seed + run, args.trace_memory), run)
+                for run in range(args.repeat) for mode in args.modes]
+        if args.ui_sales:
+            runs.append(('ui', ui_ring_up, (args.ui_sales, args.seed), 0))
+        for mode, fn, fn_args, run in runs:
+            work = os.path.join(root, f'{mode}-{run}')
+            shutil.copytree(template, work)
+            try:
+                result = isolated(in_directory, work, fn, *fn_args)
+            finally:
+                shutil.rmtree(work, ignore_errors=True)
+            report = {'benchmark': 'checkout', 'mode': mode, 'run': run, 'products': args.products,
+                      'history': args.history, 'sales': fn_args[0] if mode == 'ui' else args.sales,
+                      'seed': args.seed, 'setup_seconds': setup_seconds}
+            report.update(result)
+            print(json.dumps(report), flush=True)
+
+
+if __name__ == '__main__':
+    main()
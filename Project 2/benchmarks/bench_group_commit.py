@@ -0,0 +1,94 @@
+"""Checkout write throughput for each durability mode.
+
+Runs concurrent producers against a fresh data directory per mode and prints one
+JSON line per mode (sales/sec, p50/p99 latency to journaled and to fully written).
+
+    python benchmarks/bench_group_commit.py --sales 2000 --producers 4
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from checkout import DURABILITY_MODES, CheckoutJournal, CheckoutService  # noqa: E402
+from csv_handler import CSVHandler  # noqa: E402
+from sales_store import SalesStore  # noqa: E402
+
+from bench_util import percentile  # noqa: E402
+
+
+def make_products(path, count):
+    rows = [{'product_id': str(1000 + i), 'name': f'Item {i}', 'category': 'General', 'price': '10.0',
+             'stock': '1000000', 'active': 'True', 'cost': '5.0', 'barcode': str(480000000000 + i),
+             'discount_eligibility': 'True'} for i in range(count)]
+    CSVHandler.write_csv(path, rows)
+
+
+def run_mode(mode, sales, producers, products):
+    with tempfile.TemporaryDirectory() as root:
+        products_file = os.path.join(root, 'products.csv')
+        make_products(products_file, products)
+        store = SalesStore(os.path.join(root, 'sales'), os.path.join(root, 'sales.csv'))
+        store.ensure()
+        service = CheckoutService(CheckoutJournal(directory=os.path.join(root, 'journal')), store,
+                                  products_file, durability=mode)
+        journaled_ms = []
+        done_ms = []
+        lock = threading.Lock()
+
+        def producer(offset):
+            for n in range(offset, sales, producers):
+                pid = str(1000 + n % products)
+                record = {'sale_id': str(n + 1), 'date': datetime.now().strftime('%Y-%m-%d'),
+                          'time': datetime.now().strftime('%H:%M:%S'),
+                          'items_data': json.dumps([{'product_id': pid, 'name': 'x', 'quantity': 1,
+                                                     'price': 10.0}]),
+                          'total': '11.2', 'tax': '1.2', 'discount': '0', 'payment_method': 'Cash',
+                          'cashier_id': '1'}
+                started = time.perf_counter()
+                pending = service.submit(record, [(pid, 1)])
+                pending.wait_journaled()
+                journaled = time.perf_counter()
+                pending.wait()
+                finished = time.perf_counter()
+                with lock:
+                    journaled_ms.append((journaled - started) * 1000)
+                    done_ms.append((finished - started) * 1000)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=producer, args=(i,)) for i in range(producers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        service.close()
+        elapsed = time.perf_counter() - started
+
+        stored = sum(1 for _ in store.iter_records())
+        return {'mode': mode, 'sales': sales, 'stored': stored, 'producers': producers, 'products': products,
+                'seconds': round(elapsed, 3), 'sales_per_sec': round(sales / elapsed, 1),
+                'journaled_p50_ms': round(percentile(journaled_ms, 50), 3),
+                'journaled_p99_ms': round(percentile(journaled_ms, 99), 3),
+                'done_p50_ms': round(percentile(done_ms, 50), 3),
+                'done_p99_ms': round(percentile(done_ms, 99), 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sales', type=int, default=1000)
+    parser.add_argument('--producers', type=int, default=4)
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--modes', nargs='+', choices=DURABILITY_MODES, default=list(DURABILITY_MODES))
+    args = parser.parse_args()
+    for mode in args.modes:
+        print(json.dumps(run_mode(mode, args.sales, args.producers, args.products)), flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""Reports page benchmarks (headless).
+
+For each history size a data directory is generated with create_sample_sales, then
+these steps of the Reports page are timed under the offscreen Qt platform:
+
+    load           ReportLoaderThread.run (partition read, category join, index build)
+    process_data   one call per period filter, on a window holding the full index
+    chart_set_data TrendChart (per granularity) / CategoryChart set_data
+    chart_render   painting each chart into its cache (QWidget.grab)
+    table          ReportsWindow.populate_table with the 50 most recent sales
+
+The report is JSON (one object, "results" holding one entry per step), written to
+--output or stdout, so runs can be diffed or checked in CI.
+
+    python benchmarks/bench_reports.py --sizes 10000 100000 1000000 --output reports.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtCore import QT_VERSION_STR  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+from create_sample_sales import create_dataset  # noqa: E402
+from sales_store import sales_store  # noqa: E402
+from ui.reports_window import GRANULARITY_OPTIONS, ReportLoaderThread, ReportsWindow  # noqa: E402
+
+PERIODS = ["Last 7 Days", "Last 30 Days", "This Month", "All Time", "Custom Range"]
+
+
+def timed(fn, repeat, before=None):
+    """Runs fn repeat times (calling before() untimed first) and returns the timings in ms."""
+    times = []
+    for _ in range(repeat):
+        if before:
+            before()
+        started = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - started) * 1000)
+    return times
+
+
+def entry(size, step, times, **extra):
+    result = {'sales': size, 'step': step, 'repeat': len(times),
+              'median_ms': round(statistics.median(times), 3), 'min_ms': round(min(times), 3),
+              'max_ms': round(max(times), 3)}
+    result.update(extra)
+    return result
+
+
+def load_index():
+    """Runs the loader on this thread and returns the SalesIndex it emits."""
+    loaded = []
+    errors = []
+    loader = ReportLoaderThread()
+    loader.data_loaded.connect(lambda index, rejected: loaded.append(index))
+    loader.error_occurred.connect(errors.append)
+    loader.run()
+    if errors:
+        raise RuntimeError(errors[-1])
+    return loaded[-1]
+
+
+def bench_size(app, size, args):
+    results = []
+    root = os.path.join(args.workdir, f'sales-{size}')
+    create_dataset(root, args.products, size, users=args.users, promos=10, days=args.days, seed=args.seed)
+    cwd = os.getcwd()
+    os.chdir(root)
+    # The module-level store caches the manifest of whatever directory it saw last
+    sales_store.manifest = None
+    try:
+        index = None
+
+        def load():
+            nonlocal index
+            index = load_index()
+        results.append(entry(size, 'load', timed(load, args.repeat)))
+
+        window = ReportsWindow()
+        window.resize(1280, 900)
+        window.loader.wait()
+        app.processEvents()
+        window.on_data_loaded(index, [], (None, None))
+
+        for period in PERIODS:
+            window.period_combo.blockSignals(True)
+            window.period_combo.setCurrentText(period)
+            window.period_combo.blockSignals(False)
+            start, end = window.period_range()
+            rows = len(index.range(start, end))
+            results.append(entry(size, 'process_data', timed(window.process_data, args.repeat),
+                                 period=period, rows=rows))
+
+        window.period_combo.setCurrentText("All Time")
+        charts = [(f'trend/{granularity}', window.trend_chart,
+                   {p.label: p.revenue for p in index.series(granularity, None, None)})
+                  for _, granularity in GRANULARITY_OPTIONS]
+        charts.append(('category', window.cat_chart, list(window.cat_chart.categories)))
+        for name, chart, data in charts:
+            chart.resize(800, 300)
+            results.append(entry(size, 'chart_set_data', timed(lambda: chart.set_data(data), args.repeat),
+                                 chart=name, points=len(data)))
+            results.append(entry(size, 'chart_render', timed(chart.grab, args.repeat, before=chart.invalidate),
+                                 chart=name, points=len(data)))
+
+        recent = index.sales[:-51:-1]
+        results.append(entry(size, 'table', timed(lambda: window.populate_table(recent), args.repeat),
+                             rows=len(recent)))
+        window.close()
+        window.deleteLater()
+        app.processEvents()
+    finally:
+        os.chdir(cwd)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reports page benchmarks (offscreen Qt)')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--products', type=int, default=5000)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--days', type=int, default=730)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        args.workdir = workdir
+        for size in args.sizes:
+            # The window's DEBUG prints would otherwise swamp the report
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                results.extend(bench_size(app, size, args))
+
+    report = {'benchmark': 'reports', 'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+              'python': platform.python_version(), 'qt': QT_VERSION_STR, 'platform': platform.platform(),
+              'settings': {'products': args.products, 'days': args.days, 'repeat': args.repeat,
+                           'seed': args.seed},
+              'results': results}
+    text = json.dumps(report, indent=1)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
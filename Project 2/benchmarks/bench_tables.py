@@ -0,0 +1,187 @@
+"""UI table population micro-benchmarks (headless).
+
+Fills the main tables of each page from synthetic data at each size under the
+offscreen Qt platform and records wall time plus Python allocations:
+
+    products.update_table       ProductsWindow.update_table
+    inventory.populate          InventoryWindow.populate
+    sales.update_products_table SalesWindow.update_products_table (paged; unfiltered and filtered)
+    sales.update_cart_table     SalesWindow.update_cart_table
+    users.populate_table        UsersWindow.populate_table
+
+Each fill starts from an empty table. Allocations come from tracemalloc on a
+separate run: peak and net traced bytes and net live blocks. Qt's own C++ heap is
+not traced, so compare widget-heavy tables by wall time. The cart and sales
+product tables create a widget per row, so the 100k sizes take a while.
+
+    python benchmarks/bench_tables.py --sizes 1000 10000 100000 --output tables.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtCore import QT_VERSION_STR  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+from create_sample_sales import create_dataset, iter_products  # noqa: E402
+from models import Product, SaleItem, User  # noqa: E402
+from ui.inventory_window import InventoryWindow  # noqa: E402
+from ui.products_window import ProductsWindow  # noqa: E402
+from ui.sales_window import SalesWindow  # noqa: E402
+from ui.users_window import UsersWindow  # noqa: E402
+
+BENCHES = ['products.update_table', 'inventory.populate', 'sales.update_products_table',
+           'sales.update_cart_table', 'users.populate_table']
+
+
+def make_products(count, seed):
+    return [Product(*row) for row in iter_products(count, random.Random(seed))]
+
+
+def make_users(count):
+    roles = ['Admin', 'Manager', 'Cashier', 'Cashier', 'Cashier']
+    return [User(str(i + 1), f"user{i + 1}", 'x', roles[i % len(roles)], i % 17 != 0) for i in range(count)]
+
+
+def make_cart(products):
+    return [SaleItem(p.product_id, p.name, 1 + i % 3, p.price, category=p.category)
+            for i, p in enumerate(products)]
+
+
+def measure(app, fn, reset, repeat):
+    """(wall times in ms, allocation stats) for fn, each run starting from reset()."""
+    times = []
+    for _ in range(repeat):
+        reset()
+        app.processEvents()
+        started = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - started) * 1000)
+
+    reset()
+    app.processEvents()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    base, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    fn()
+    current, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    net_blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename'))
+    return times, {'alloc_peak_kb': round((peak - base) / 1024, 1),
+                   'alloc_net_kb': round((current - base) / 1024, 1),
+                   'alloc_net_blocks': net_blocks}
+
+
+def entry(name, rows, times, allocations, **extra):
+    result = {'bench': name, 'rows': rows, 'repeat': len(times),
+              'median_ms': round(statistics.median(times), 3), 'min_ms': round(min(times), 3),
+              'max_ms': round(max(times), 3)}
+    result.update(allocations)
+    result.update(extra)
+    return result
+
+
+def clear(table):
+    return lambda: table.setRowCount(0)
+
+
+def bench_size(app, windows, size, args):
+    products = make_products(size, args.seed)
+    results = []
+
+    def run(name, fn, reset, **extra):
+        if name.split(' ')[0] in args.only:
+            times, allocations = measure(app, fn, reset, args.repeat)
+            results.append(entry(name, size, times, allocations, **extra))
+
+    page = windows['products']
+    run('products.update_table', lambda: page.update_table(products), clear(page.products_table))
+
+    page = windows['inventory']
+    run('inventory.populate', lambda: page.populate(products), clear(page.table))
+
+    sales = windows['sales']
+    sales.products = products
+    sales.current_page = 0
+    run('sales.update_products_table', sales.update_products_table, clear(sales.products_table),
+        catalog=size, filter=None)
+    run('sales.update_products_table filtered', lambda: sales.update_products_table('cola'),
+        clear(sales.products_table), catalog=size, filter='cola')
+
+    cart = make_cart(products)
+
+    def fill_cart():
+        sales.cart = cart
+        sales.update_cart_table()
+    run('sales.update_cart_table', fill_cart, clear(sales.cart_table))
+
+    users = make_users(size)
+    page = windows['users']
+    run('users.populate_table', lambda: page.populate_table(users), clear(page.table))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='UI table population micro-benchmarks (offscreen Qt)')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10_000, 100_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', nargs='+', choices=BENCHES, default=BENCHES)
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    results = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        # The pages load their CSVs on construction; give them a small data directory
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            create_dataset(workdir, products=10, sales=0, users=2, promos=2, seed=args.seed)
+        os.chdir(workdir)
+        try:
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                windows = {
+                    'products': ProductsWindow(),
+                    'inventory': InventoryWindow(),
+                    'sales': SalesWindow(User('1', 'admin', 'x', 'Admin')),
+                    'users': UsersWindow(),
+                }
+                windows['sales'].refresh_timer.stop()
+                windows['sales'].loader.wait()
+                app.processEvents()
+                for size in args.sizes:
+                    results.extend(bench_size(app, windows, size, args))
+                for window in windows.values():
+                    window.close()
+                    window.deleteLater()
+                app.processEvents()
+        finally:
+            os.chdir(cwd)
+
+    report = {'benchmark': 'tables', 'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+              'python': platform.python_version(), 'qt': QT_VERSION_STR, 'platform': platform.platform(),
+              'settings': {'repeat': args.repeat, 'seed': args.seed},
+              'results': results}
+    text = json.dumps(report, indent=1)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,9 @@
+"""Helpers shared by the benchmark scripts."""
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of values (0.0 for none)."""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
@@ -0,0 +1,428 @@
+import csv
+import os
+import sys
+from array import array
+
+from csv_handler import CSVHandler
+from file_lock import FileLock
+from models import Product
+
+# Range of array('l'), which is 32-bit on Windows and 64-bit elsewhere
+LONG_MAX = (1 << (8 * array('l').itemsize - 1)) - 1
+LONG_MIN = -LONG_MAX - 1
+
+_BOOL_VALUES = {
+    'true': True, 'True': True, 'TRUE': True,
+    'false': False, 'False': False, 'FALSE': False, '': False,
+}
+
+
+class CatalogReport:
+    """Aggregate of the malformed values found while loading a catalog."""
+    def __init__(self, filename, row_count=0):
+        self.filename = filename
+        self.row_count = row_count
+        self.malformed = {}  # field -> list of CSV line numbers
+
+    def add(self, field, bad_indices):
+        if bad_indices:
+            # +2: one for the header row, one because CSV lines are 1-based
+            self.malformed.setdefault(field, []).extend(i + 2 for i in bad_indices)
+
+    @property
+    def ok(self):
+        return not self.malformed
+
+    def summary(self):
+        if self.ok:
+            return f"{self.filename}: {self.row_count} rows loaded"
+        parts = []
+        for field, lines in self.malformed.items():
+            sample = ", ".join(str(n) for n in lines[:5])
+            more = f" (+{len(lines) - 5} more)" if len(lines) > 5 else ""
+            parts.append(f"{field} on line(s) {sample}{more}")
+        return f"{self.filename}: {self.row_count} rows loaded, malformed values defaulted: " + "; ".join(parts)
+
+
+# --- Column parsers ---
+# Each parser converts a whole column in one call and only falls back to
+# per-value handling when the bulk conversion fails.
+
+def parse_float_column(values, default=0.0):
+    """Returns (floats, bad_indices). Empty cells take the default silently."""
+    try:
+        return list(map(float, values)), []
+    except ValueError:
+        pass
+    out = []
+    bad = []
+    for i, v in enumerate(values):
+        try:
+            out.append(float(v))
+        except ValueError:
+            if v.strip():
+                bad.append(i)
+            out.append(default)
+    return out, bad
+
+
+def parse_int_column(values, default=0, lo=LONG_MIN, hi=LONG_MAX):
+    """Returns (ints, bad_indices). Accepts '12' and '12.0' like Product did. Values that
+    aren't finite or fall outside [lo, hi] (an array('l') by default) are bad."""
+    try:
+        out = list(map(int, values))
+        if not out or (lo <= min(out) and max(out) <= hi):
+            return out, []
+    except ValueError:
+        pass
+    out = []
+    bad = []
+    for i, v in enumerate(values):
+        try:
+            n = int(v)
+        except ValueError:
+            try:
+                n = int(float(v))
+            except (ValueError, OverflowError):
+                n = None
+        if n is None or not lo <= n <= hi:
+            if v.strip():
+                bad.append(i)
+            n = default
+        out.append(n)
+    return out, bad
+
+
+def long_array(values):
+    """array('l') of values, clamping any that don't fit (parse_int_column already
+    rejects them; this guards columns built elsewhere, e.g. a 64-bit snapshot)."""
+    try:
+        return array('l', values)
+    except OverflowError:
+        return array('l', (min(LONG_MAX, max(LONG_MIN, v)) for v in values))
+
+
+def parse_bool_column(values):
+    """Returns (bools, bad_indices). Anything but a 'true' spelling is False, as in Product."""
+    lookup = _BOOL_VALUES.get
+    out = [lookup(v) for v in values]
+    if None not in out:
+        return out, []
+    bad = []
+    for i, b in enumerate(out):
+        if b is None:
+            v = values[i].strip().lower()
+            out[i] = v == 'true'
+            if v not in ('true', 'false', ''):
+                bad.append(i)
+    return out, bad
+
+
+# --- Loader ---
+
+class CatalogLoader:
+    @staticmethod
+    def read_columns(filename):
+        """Reads a CSV file into {header: [values]} without building a dict per row."""
+        if not os.path.exists(filename):
+            return {}, 0
+        with open(filename, mode='r', newline='', encoding='utf-8') as file:
+            reader = csv.reader(file)
+            headers = next(reader, None)
+            if not headers:
+                return {}, 0
+            rows = list(reader)
+        width = len(headers)
+        # Pad short rows so zip() doesn't silently drop trailing columns
+        rows = [r if len(r) == width else (r + [''] * width)[:width] for r in rows if r]
+        if not rows:
+            return {h: [] for h in headers}, 0
+        columns = {h: list(col) for h, col in zip(headers, zip(*rows))}
+        return columns, len(rows)
+
+    @staticmethod
+    def parse_columns(columns, row_count, filename='products.csv'):
+        """Converts raw string columns into typed columns. Returns (typed, report)."""
+        report = CatalogReport(filename, row_count)
+
+        def column(name, default):
+            values = columns.get(name)
+            return values if values is not None else [default] * row_count
+
+        price, bad = parse_float_column(column('price', '0'))
+        report.add('price', bad)
+        cost, bad = parse_float_column(column('cost', '0'))
+        report.add('cost', bad)
+        stock, bad = parse_int_column(column('stock', '0'))
+        report.add('stock', bad)
+        active, bad = parse_bool_column(column('active', 'true'))
+        report.add('active', bad)
+        discount, bad = parse_bool_column(column('discount_eligibility', 'true'))
+        report.add('discount_eligibility', bad)
+
+        typed = {
+            'product_id': column('product_id', ''),
+            'name': column('name', 'Unknown'),
+            'category': column('category', 'Uncategorized'),
+            'price': price,
+            'stock': stock,
+            'active': active,
+            'cost': cost,
+            'barcode': column('barcode', ''),
+            'discount_eligibility': discount,
+        }
+        return typed, report
+
+    @staticmethod
+    def load_columns(filename='products.csv'):
+        """Reads and parses a catalog file column-wise. Returns (typed_columns, report)."""
+        columns, row_count = CatalogLoader.read_columns(filename)
+        return CatalogLoader.parse_columns(columns, row_count, filename)
+
+    @staticmethod
+    def load_products(filename='products.csv', active_only=False):
+        """Loads Product objects in bulk, printing one summary line if any values were malformed."""
+        try:
+            typed, report = CatalogLoader.load_columns(filename)
+        except Exception as e:
+            print(f"Error reading {filename}: {e}")
+            return []
+        if not report.ok:
+            print(report.summary())
+
+        build = Product.from_parsed
+        products = []
+        for pid, name, cat, price, stock, active, cost, barcode, disc in zip(
+                typed['product_id'], typed['name'], typed['category'], typed['price'], typed['stock'],
+                typed['active'], typed['cost'], typed['barcode'], typed['discount_eligibility']):
+            if active_only and not active:
+                continue
+            products.append(build(pid, name, cat, price, stock, active, cost, barcode, disc))
+        return products
+
+
+# --- Array-backed store ---
+
+class ProductRow:
+    """View of one row in a ProductStore. Reads and writes go straight to the store's columns,
+    and it exposes the same attributes as Product so UI code can use either. Rows of a
+    read-only store (a mapped catalog snapshot) refuse writes."""
+    __slots__ = ('store', 'index')
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+
+    def _column(self, name):
+        """The store column to write, after checking the store may be written."""
+        if self.store.read_only:
+            raise TypeError(f"product {self.product_id}: rows mapped from the catalog snapshot are "
+                            f"read-only; edit a to_product() copy and save it to products.csv")
+        return getattr(self.store, name)
+
+    @property
+    def product_id(self): return self.store.ids[self.index]
+
+    @property
+    def name(self): return self.store.names[self.index]
+
+    @property
+    def category(self): return self.store.categories[self.store.category_ids[self.index]]
+
+    @category.setter
+    def category(self, value):
+        column = self._column('category_ids')
+        column[self.index] = self.store.intern_category(value)
+
+    @property
+    def price(self): return self.store.prices[self.index]
+
+    @price.setter
+    def price(self, value): self._column('prices')[self.index] = float(value)
+
+    @property
+    def cost(self): return self.store.costs[self.index]
+
+    @cost.setter
+    def cost(self, value): self._column('costs')[self.index] = float(value)
+
+    @property
+    def stock(self): return self.store.stock[self.index]
+
+    @stock.setter
+    def stock(self, value): self._column('stock')[self.index] = int(value)
+
+    @property
+    def active(self): return bool(self.store.active[self.index])
+
+    @active.setter
+    def active(self, value): self._column('active')[self.index] = 1 if value else 0
+
+    @property
+    def barcode(self): return self.store.barcodes[self.index]
+
+    @property
+    def discount_eligibility(self): return bool(self.store.discount[self.index])
+
+    @discount_eligibility.setter
+    def discount_eligibility(self, value): self._column('discount')[self.index] = 1 if value else 0
+
+    def to_product(self):
+        return Product.from_parsed(self.product_id, self.name, self.category, self.price, self.stock,
+                                   self.active, self.cost, self.barcode, self.discount_eligibility)
+
+    def to_dict(self):
+        return self.to_product().to_dict()
+
+
+class ProductStore:
+    """Struct-of-arrays product catalog.
+
+    Numbers live in typed arrays, flags in bytearrays, and each category string is
+    stored once in an intern table that rows reference by index."""
+    def __init__(self):
+        self.ids = []
+        self.names = []
+        self.barcodes = []
+        self.categories = []           # intern table: category id -> name
+        self.category_lookup = {}      # name -> category id
+        self.category_ids = array('l')
+        self.prices = array('d')
+        self.costs = array('d')
+        self.stock = array('l')
+        self.active = bytearray()
+        self.discount = bytearray()
+        self.id_index = None           # product_id -> row, built on first find()
+        self.snapshot = None           # mmap backing the columns, if loaded from a snapshot
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def read_only(self):
+        return self.snapshot is not None
+
+    def __getitem__(self, index):
+        if not 0 <= index < len(self.ids):
+            raise IndexError(index)
+        return ProductRow(self, index)
+
+    def intern_category(self, name):
+        cid = self.category_lookup.get(name)
+        if cid is None:
+            cid = len(self.categories)
+            self.categories.append(sys.intern(name))
+            self.category_lookup[name] = cid
+        return cid
+
+    def category_names(self):
+        """Sorted, non-empty category names, read from the intern table."""
+        return sorted(c for c in self.categories if c)
+
+    @classmethod
+    def from_columns(cls, typed):
+        store = cls()
+        store.ids = list(typed['product_id'])
+        store.names = list(typed['name'])
+        store.barcodes = list(typed['barcode'])
+        intern = store.intern_category
+        store.category_ids = long_array([intern(c) for c in typed['category']])
+        store.prices = array('d', typed['price'])
+        store.costs = array('d', typed['cost'])
+        store.stock = long_array(typed['stock'])
+        store.active = bytearray(typed['active'])
+        store.discount = bytearray(typed['discount_eligibility'])
+        return store
+
+    @classmethod
+    def load(cls, filename='products.csv'):
+        """Loads a catalog file into a new store; an unreadable file gives an empty store."""
+        try:
+            typed, report = CatalogLoader.load_columns(filename)
+        except Exception as e:
+            print(f"Error reading {filename}: {e}")
+            return cls()
+        if not report.ok:
+            print(report.summary())
+        return cls.from_columns(typed)
+
+    def append(self, product):
+        """Adds a Product (or anything with the same attributes) and returns its row view."""
+        index = len(self.ids)
+        self.ids.append(str(product.product_id))
+        self.names.append(str(product.name))
+        self.barcodes.append(str(getattr(product, 'barcode', '') or ''))
+        self.category_ids.append(self.intern_category(str(product.category)))
+        self.prices.append(float(product.price))
+        self.costs.append(float(getattr(product, 'cost', 0.0)))
+        self.stock.append(int(product.stock))
+        self.active.append(1 if product.active else 0)
+        self.discount.append(1 if getattr(product, 'discount_eligibility', True) else 0)
+        if self.id_index is not None:
+            self.id_index[self.ids[index]] = index
+        return ProductRow(self, index)
+
+    def rows(self, active_only=False):
+        if active_only:
+            active = self.active
+            return [ProductRow(self, i) for i in range(len(self.ids)) if active[i]]
+        return [ProductRow(self, i) for i in range(len(self.ids))]
+
+    def find(self, product_id):
+        if self.id_index is None:
+            self.id_index = {pid: i for i, pid in enumerate(self.ids)}
+        index = self.id_index.get(str(product_id))
+        return None if index is None else ProductRow(self, index)
+
+
+# --- Locked edits ---
+# Every products.csv writer (CheckoutService included) holds products_lock() around its
+# read-modify-write, and starts from the rows on disk rather than a loaded snapshot, so
+# a page edit can't overwrite stock a checkout on any terminal took in the meantime.
+
+def products_lock(filename='products.csv'):
+    return FileLock(filename + '.lock')
+
+
+def edit_products_csv(change, filename='products.csv'):
+    """Runs change(rows) on the current rows of filename under products_lock() and
+    writes the rows it returns back atomically. A read error is raised, not treated as
+    an empty catalog."""
+    with products_lock(filename):
+        rows = []
+        if os.path.exists(filename):
+            with open(filename, 'r', newline='', encoding='utf-8') as f:
+                reader = csv.DictReader(f)
+                header = reader.fieldnames or []
+                rows = list(reader)
+        else:
+            header = list(Product('', '', '', 0, 0).to_dict())
+        rows = change(rows)
+        if rows:
+            CSVHandler.replace_csv(filename, rows)
+        else:
+            CSVHandler.create_csv(filename, header)
+
+
+def add_product_row(values, filename='products.csv'):
+    """Appends a product (a Product.to_dict() dict)."""
+    edit_products_csv(lambda rows: rows + [values], filename)
+
+
+def update_product_row(product_id, values, loaded_stock, filename='products.csv'):
+    """Replaces product_id's row with values. If the stock in values is still the
+    loaded_stock the edit started from, the row keeps its current stock, so sales
+    rung up while the dialog was open aren't undone."""
+    def change(rows):
+        for row in rows:
+            if row.get('product_id') == str(product_id):
+                updated = dict(values)
+                if str(updated.get('stock')) == str(loaded_stock):
+                    updated['stock'] = row.get('stock', updated.get('stock'))
+                row.update(updated)
+        return rows
+    edit_products_csv(change, filename)
+
+
+def delete_product_row(product_id, filename='products.csv'):
+    edit_products_csv(lambda rows: [row for row in rows if row.get('product_id') != str(product_id)], filename)
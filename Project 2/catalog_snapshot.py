@@ -0,0 +1,191 @@
+"""Compiled, memory-mapped snapshot of products.csv.
+
+The snapshot is a flat binary file: a header, one fixed-width section per numeric
+column, an offset table and a UTF-8 string heap. Every terminal maps the same file
+read-only, so a cold start costs a page-in instead of a CSV parse and the OS shares
+the pages between processes. The header records the size, mtime and inode of the CSV
+it was built from; a mismatch means the catalog changed and the snapshot is rebuilt.
+The inode catches an atomic replace that lands within the filesystem's mtime
+granularity with the same size, e.g. a stock edit from 10 to 11.
+"""
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+
+from catalog import CatalogLoader, ProductStore
+from startup_trace import trace
+
+MAGIC = b'POSCAT1\0'
+VERSION = 2
+# magic, version, source mtime_ns, source size, source inode, rows, categories, heap bytes
+HEADER = struct.Struct('<8sIqqQIIQ')
+
+DEFAULT_SNAPSHOT = 'products.snapshot'
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+def _layout(rows, categories, heap_len):
+    """Byte offset of every section. Writer and reader share this so the header stays small."""
+    strings = 3 * rows + categories
+    sections = [
+        ('prices', 'd', rows),
+        ('costs', 'd', rows),
+        ('stock', 'q', rows),
+        ('category_ids', 'i', rows),
+        ('active', 'B', rows),
+        ('discount', 'B', rows),
+        ('offsets', 'I', strings + 1),
+        ('heap', 'B', heap_len),
+    ]
+    layout = {}
+    offset = _align(HEADER.size)
+    for name, fmt, count in sections:
+        size = struct.calcsize(fmt) * count
+        layout[name] = (offset, size, fmt)
+        offset = _align(offset + size)
+    return layout, offset
+
+
+class HeapStrings:
+    """Read-only sequence of strings decoded on access from the snapshot heap."""
+    def __init__(self, heap, offsets, start, count):
+        self.heap = heap
+        self.offsets = offsets
+        self.start = start
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        i = self.start + index
+        return str(self.heap[self.offsets[i]:self.offsets[i + 1]], 'utf-8')
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self[i]
+
+
+class CatalogSnapshot:
+    @staticmethod
+    def source_stamp(csv_path):
+        st = os.stat(csv_path)
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    @staticmethod
+    def build(csv_path='products.csv', snapshot_path=DEFAULT_SNAPSHOT):
+        """Compiles csv_path into a snapshot file, replacing any existing one atomically."""
+        mtime_ns, size, inode = CatalogSnapshot.source_stamp(csv_path)
+        typed, report = CatalogLoader.load_columns(csv_path)
+        if not report.ok:
+            print(report.summary())
+        store = ProductStore.from_columns(typed)
+        rows, categories = len(store), len(store.categories)
+
+        # String heap: ids, then names, then barcodes, then the category table
+        offsets = array('I', [0])
+        heap = bytearray()
+        for seq in (store.ids, store.names, store.barcodes, store.categories):
+            for s in seq:
+                heap += s.encode('utf-8')
+                offsets.append(len(heap))
+
+        columns = {
+            'prices': store.prices,
+            'costs': store.costs,
+            'stock': array('q', store.stock),
+            'category_ids': array('i', store.category_ids),
+            'active': store.active,
+            'discount': store.discount,
+            'offsets': offsets,
+            'heap': heap,
+        }
+        layout, total = _layout(rows, categories, len(heap))
+        buf = bytearray(total)
+        HEADER.pack_into(buf, 0, MAGIC, VERSION, mtime_ns, size, inode, rows, categories, len(heap))
+        for name, (offset, length, _) in layout.items():
+            buf[offset:offset + length] = bytes(columns[name])
+
+        # A unique temp file per call: worker threads of one process may rebuild at once
+        fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(snapshot_path) + '.',
+                                         suffix='.tmp', dir=os.path.dirname(snapshot_path) or '.')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(buf)
+            os.replace(temp_path, snapshot_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    @staticmethod
+    def is_current(csv_path='products.csv', snapshot_path=DEFAULT_SNAPSHOT):
+        try:
+            with open(snapshot_path, 'rb') as f:
+                header = f.read(HEADER.size)
+            if len(header) < HEADER.size:
+                return False
+            magic, version, mtime_ns, size, inode = HEADER.unpack(header)[:5]
+            return (magic == MAGIC and version == VERSION and
+                    (mtime_ns, size, inode) == CatalogSnapshot.source_stamp(csv_path))
+        except OSError:
+            return False
+
+    @staticmethod
+    def map_store(snapshot_path=DEFAULT_SNAPSHOT):
+        """Maps a snapshot read-only and returns a ProductStore whose columns are views into it."""
+        with open(snapshot_path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, _, _, rows, categories, heap_len = HEADER.unpack_from(mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{snapshot_path} is not a catalog snapshot")
+        layout, total = _layout(rows, categories, heap_len)
+        if len(mm) < total:
+            raise ValueError(f"{snapshot_path} is truncated")
+
+        view = memoryview(mm)
+
+        def section(name):
+            offset, length, fmt = layout[name]
+            return view[offset:offset + length].cast(fmt)
+
+        heap = section('heap')
+        offsets = section('offsets')
+        store = ProductStore()
+        store.snapshot = mm  # keeps the mapping alive as long as the store
+        store.ids = HeapStrings(heap, offsets, 0, rows)
+        store.names = HeapStrings(heap, offsets, rows, rows)
+        store.barcodes = HeapStrings(heap, offsets, 2 * rows, rows)
+        store.categories = list(HeapStrings(heap, offsets, 3 * rows, categories))
+        store.category_lookup = {c: i for i, c in enumerate(store.categories)}
+        store.prices = section('prices')
+        store.costs = section('costs')
+        store.stock = section('stock')
+        store.category_ids = section('category_ids')
+        store.active = section('active')
+        store.discount = section('discount')
+        return store
+
+    @staticmethod
+    def load_store(csv_path='products.csv', snapshot_path=DEFAULT_SNAPSHOT):
+        """Returns a read-only ProductStore backed by the snapshot, rebuilding it first if
+        products.csv changed. Falls back to parsing the CSV if the snapshot can't be used."""
+        if not os.path.exists(csv_path):
+            return ProductStore()
+        try:
+            if not CatalogSnapshot.is_current(csv_path, snapshot_path):
+                with trace.span(f"build snapshot {csv_path}", 'csv'):
+                    CatalogSnapshot.build(csv_path, snapshot_path)
+            with trace.span(f"map snapshot {snapshot_path}", 'csv'):
+                return CatalogSnapshot.map_store(snapshot_path)
+        except (OSError, ValueError, OverflowError) as e:
+            # e.g. Windows refuses to replace a snapshot another terminal has mapped
+            print(f"Catalog snapshot unavailable, parsing {csv_path}: {e}")
+            return ProductStore.load(csv_path)
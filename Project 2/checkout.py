@@ -0,0 +1,494 @@
+"""Journaled checkout persistence.
+
+Recording a sale touches two files: the sale goes into the sales partitions and each
+line item lowers a stock count in products.csv. A crash between the two used to
+leave a recorded sale with stock not decremented. Every checkout now goes through a
+write-ahead log (one JSON object per line):
+
+    intent   the sale record and its (product_id, quantity) lines
+    sale     the sale has been appended to the sales store
+    stock    the quantities about to be taken out of products.csv, and the
+             (mtime, size, inode) products.csv had just before that rewrite
+    commit   both files are up to date
+    abort    the transaction was given up; nothing more is done for it
+
+Several terminals can share one data directory, so each process writes its own
+journal, journal/checkout-<pid>-<id>.wal, and holds an OS lock on <journal>.lock
+while it runs. Stock is read, decremented and rewritten under catalog.products_lock()
+(products.csv.lock), which the product and inventory pages' edits also take, so no
+writer overwrites another terminal's decrements.
+
+A journal whose lock can be taken belongs to a process that has exited or crashed.
+recover() replays such journals at startup, and the writer checks for them before
+each products.csv rewrite. Only the dead writer's uncommitted transactions are
+redone: appending the sale is skipped if its id is already stored, and a logged
+stock decrement is applied only if products.csv still has the stamp recorded with
+it (the dead writer never got to rewrite it). The journal is then deleted. A paid
+sale is never rolled back. An intent that can't be read is aborted.
+
+Checkouts are written by one background writer thread (group commit): a sale that
+finds nothing else queued is written at once, while sales that queue up behind it
+(collected for up to GROUP_COMMIT_WINDOW_MS while they keep arriving) are journaled
+with one write and one fsync, appended to the sales store together, and take stock
+out of products.csv with a single rewrite. If a batch fails, stock entries it logged for a rewrite that
+never happened are cut from the journal, and the batch is retried once from the
+journal; what still fails is finished before the next batch. DURABILITY picks the
+trade-off:
+
+    sync      every sale is its own batch and every file write is fsynced
+    group     batches share their fsyncs (the default)
+    buffered  nothing is fsynced; a power cut can lose the last few seconds of sales
+"""
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+
+from catalog import products_lock
+from csv_handler import CSVHandler
+from file_lock import FileLock
+from sales_store import sales_store
+
+JOURNAL_DIR = 'journal'
+# Single journal of earlier versions, replayed like a dead terminal's if one is left
+LEGACY_JOURNAL_FILE = 'checkout.wal'
+# A process's journal is truncated when it grows past this size with nothing
+# pending, and deleted when the process closes cleanly
+JOURNAL_COMPACT_BYTES = 1 << 20
+
+DURABILITY_MODES = ('sync', 'group', 'buffered')
+DURABILITY = 'group'
+# How long the writer waits for more sales after the first one of a batch
+GROUP_COMMIT_WINDOW_MS = 10
+GROUP_COMMIT_MAX_BATCH = 64
+
+
+class CheckoutJournal:
+    """One process's journal file. The owner holds the lock on path + '.lock' from its
+    first write until release(); recovery takes it without waiting to claim a dead
+    writer's journal."""
+    def __init__(self, path=None, directory=JOURNAL_DIR):
+        if path is None:
+            path = os.path.join(directory, f"checkout-{os.getpid()}-{uuid.uuid4().hex[:8]}.wal")
+        self.path = path
+        self.lock = threading.Lock()
+        self.owner = FileLock(path + '.lock')
+
+    def claim(self, blocking=True):
+        """Takes the journal's lock if this object doesn't hold it yet. Without blocking,
+        returns False while another process holds it."""
+        with self.lock:
+            if self.owner.depth:
+                return True
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            return self.owner.acquire(blocking)
+
+    def release(self, remove=False):
+        """Drops the lock; with remove, deletes the journal (and its lock file) first."""
+        with self.lock:
+            if remove and os.path.exists(self.path):
+                os.remove(self.path)
+            if self.owner.depth:
+                self.owner.release()
+            if remove:
+                try:
+                    os.remove(self.owner.path)
+                except OSError:
+                    pass
+
+    def log(self, entry, sync=True):
+        """Appends one entry and forces it to disk before returning."""
+        self.log_many([entry], sync)
+
+    def log_many(self, entries, sync=True):
+        """Appends entries with one write; with sync, one fsync covers them all."""
+        if not entries:
+            return
+        data = ''.join(json.dumps(entry, separators=(',', ':')) + '\n' for entry in entries)
+        self.claim()
+        with self.lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(data)
+                f.flush()
+                if sync:
+                    os.fsync(f.fileno())
+
+    def entries(self):
+        """All readable entries in order. A torn last line (crash mid-write) is ignored."""
+        if not os.path.exists(self.path):
+            return []
+        out = []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    out.append(json.loads(line))
+                except ValueError:
+                    print(f"{self.path}: skipping unreadable journal line")
+        return out
+
+    def pending(self):
+        """{txn: {'intent': ..., 'sale': bool, 'stock': entry or None}} for uncommitted transactions."""
+        txns = {}
+        for entry in self.entries():
+            txn = entry.get('txn')
+            op = entry.get('op')
+            if op == 'intent':
+                txns[txn] = {'intent': entry, 'sale': False, 'stock': None}
+            elif txn in txns:
+                if op == 'sale':
+                    txns[txn]['sale'] = True
+                elif op == 'stock':
+                    txns[txn]['stock'] = entry
+                elif op in ('commit', 'abort'):
+                    del txns[txn]
+        return txns
+
+    def size(self):
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def truncate(self, offset=0):
+        """Cuts the journal back to offset bytes (all of it by default)."""
+        with self.lock:
+            if offset and not os.path.exists(self.path):
+                return
+            with open(self.path, 'r+' if offset else 'w', encoding='utf-8') as f:
+                f.truncate(offset)
+                f.flush()
+                os.fsync(f.fileno())
+
+
+class PendingCommit:
+    """A checkout waiting on the writer thread.
+
+    journaled is set once the intent is in the journal (the sale can no longer be
+    lost), done once both files are written or the batch failed. The callbacks run
+    on the writer thread with this object as their argument."""
+    def __init__(self, sale_record, lines, on_journaled=None, on_done=None):
+        self.txn = uuid.uuid4().hex
+        self.intent = {'op': 'intent', 'txn': self.txn, 'sale': sale_record,
+                       'lines': [[str(pid), int(qty)] for pid, qty in lines]}
+        self.on_journaled = on_journaled
+        self.on_done = on_done
+        self.journaled = threading.Event()
+        self.done = threading.Event()
+        self.error = None
+        self.is_journaled = False
+
+    def mark_journaled(self):
+        self.is_journaled = True
+        self.journaled.set()
+        if self.on_journaled:
+            self.on_journaled(self)
+
+    def finish(self, error=None):
+        self.error = error
+        if error is not None:
+            # Unblock anyone still waiting on the journal
+            self.journaled.set()
+        self.done.set()
+        if self.on_done:
+            self.on_done(self)
+
+    def wait_journaled(self, timeout=None):
+        """Blocks until the sale is safe in the journal; raises if journaling failed."""
+        if not self.journaled.wait(timeout):
+            raise TimeoutError(f"checkout {self.txn} not journaled yet")
+        if not self.is_journaled:
+            raise self.error
+        return self.txn
+
+    def wait(self, timeout=None):
+        """Blocks until the checkout is fully written; re-raises a write error."""
+        if not self.done.wait(timeout):
+            raise TimeoutError(f"checkout {self.txn} still pending")
+        if self.error is not None:
+            raise self.error
+        return self.txn
+
+
+class GroupCommitWriter(threading.Thread):
+    """Takes PendingCommits off a queue and hands them to the service in batches."""
+    def __init__(self, service):
+        super().__init__(name='checkout-writer', daemon=True)
+        self.service = service
+        self.queue = queue.Queue()
+
+    def run(self):
+        while True:
+            first = self.queue.get()
+            if first is None:
+                return
+            batch = [first]
+            stop = False
+            if self.service.durability != 'sync':
+                deadline = time.monotonic() + GROUP_COMMIT_WINDOW_MS / 1000
+                while len(batch) < GROUP_COMMIT_MAX_BATCH:
+                    try:
+                        pending = self.queue.get_nowait()
+                    except queue.Empty:
+                        # A lone sale has nothing to share its fsync with: don't make
+                        # it wait. Only a burst already queued waits out the window.
+                        remaining = deadline - time.monotonic()
+                        if len(batch) == 1 or remaining <= 0:
+                            break
+                        try:
+                            pending = self.queue.get(timeout=remaining)
+                        except queue.Empty:
+                            break
+                    if pending is None:
+                        stop = True
+                        break
+                    batch.append(pending)
+            self.service.write_batch(batch)
+            if stop:
+                return
+
+
+class CheckoutService:
+    def __init__(self, journal=None, store=None, products_file='products.csv', durability=DURABILITY):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Unknown durability mode: {durability}")
+        self.journal = journal or CheckoutJournal()
+        self.store = store or sales_store
+        self.products_file = products_file
+        self.durability = durability
+        # One checkout at a time touches products.csv: self.lock between this process's
+        # threads, products_lock between terminals
+        self.lock = threading.Lock()
+        self.products_lock = products_lock(products_file)
+        self.writer = None
+        self.writer_lock = threading.Lock()
+        # A failed batch left transactions pending in our journal; finish them first
+        self.unfinished = False
+
+    def submit(self, sale_record, lines, on_journaled=None, on_done=None):
+        """Queues one sale for the writer thread and returns its PendingCommit.
+        lines is [(product_id, quantity)]."""
+        pending = PendingCommit(sale_record, lines, on_journaled, on_done)
+        with self.writer_lock:
+            if self.writer is None or not self.writer.is_alive():
+                self.writer = GroupCommitWriter(self)
+                self.writer.start()
+            self.writer.queue.put(pending)
+        return pending
+
+    def commit(self, sale_record, lines):
+        """Journals and applies one sale, waiting for the writer. Returns the transaction id."""
+        return self.submit(sale_record, lines).wait()
+
+    def close(self):
+        """Writes everything still queued, stops the writer thread and deletes the
+        journal if nothing in it is pending."""
+        with self.writer_lock:
+            writer, self.writer = self.writer, None
+        if writer is not None and writer.is_alive():
+            writer.queue.put(None)
+            writer.join()
+        with self.lock:
+            if not self.journal.pending():
+                self.journal.release(remove=True)
+
+    def write_batch(self, batch):
+        """Journals a batch of intents with one fsync, then applies them together."""
+        sync = self.durability != 'buffered'
+        try:
+            self.journal.log_many([pending.intent for pending in batch], sync)
+        except Exception as e:
+            print(f"Checkout journal error: {e}")
+            for pending in batch:
+                pending.finish(e)
+            return
+        for pending in batch:
+            pending.mark_journaled()
+        try:
+            with self.lock, self.products_lock:
+                if self.unfinished:
+                    self.replay(self.journal, skip={pending.txn for pending in batch})
+                    self.unfinished = False
+                try:
+                    self.apply_batch(batch, sync)
+                except Exception as e:
+                    # Retry once from the journal; apply_batch took back the stock entries it
+                    # logged for products.csv changes that were never written
+                    print(f"Checkout write error, retrying: {e}")
+                    self.replay(self.journal)
+        except Exception as e:
+            # The intents are still journaled: the next batch, or recovery once this
+            # process exits, finishes them
+            print(f"Checkout write error: {e}")
+            self.unfinished = True
+            for pending in batch:
+                pending.finish(e)
+            return
+        for pending in batch:
+            pending.finish()
+        self.compact_journal()
+
+    def apply_batch(self, batch, sync):
+        """Appends the batch's sales, then takes their stock out of products.csv with one
+        rewrite. Runs under self.lock and self.products_lock."""
+        # A dead terminal's logged decrements are only safe to redo before products.csv changes again
+        self.recover_dead()
+        self.store.append_many([pending.intent['sale'] for pending in batch], sync)
+        self.journal.log_many([{'op': 'sale', 'txn': pending.txn} for pending in batch], False)
+
+        rows = CSVHandler.read_csv(self.products_file)
+        base = self.products_stamp()
+        stock_entries = []
+        changed = False
+        for pending in batch:
+            take = self.stock_take(pending.intent['lines'])
+            changed = self.take_stock(rows, take) or changed
+            stock_entries.append({'op': 'stock', 'txn': pending.txn, 'take': take, 'base': base})
+        offset = self.journal.size()
+        try:
+            self.journal.log_many(stock_entries, sync)
+            if changed:
+                CSVHandler.replace_csv(self.products_file, rows, sync)
+        except Exception:
+            # products.csv wasn't replaced: roll the journal back to before the stock
+            # entries, so a replay recomputes these decrements instead of skipping them
+            self.journal.truncate(offset)
+            raise
+        self.journal.log_many([{'op': 'commit', 'txn': pending.txn} for pending in batch], sync)
+
+    def replay(self, journal, skip=()):
+        """Finishes the uncommitted transactions in journal (a dead writer's, or ours
+        after a failed batch) other than those in skip, with one products.csv rewrite.
+        Returns how many were completed."""
+        rows = CSVHandler.read_csv(self.products_file)
+        base = self.products_stamp()
+        changed = False
+        completed = []
+        for txn, state in journal.pending().items():
+            if txn in skip:
+                continue
+            intent = state['intent']
+            record = intent.get('sale')
+            stock = state['stock']
+            try:
+                if not isinstance(record, dict):
+                    raise ValueError("intent has no sale record")
+                if stock is None:
+                    take = self.stock_take(intent['lines'])
+                elif 'set' in stock:
+                    # Absolute values, logged by versions that had a single journal
+                    take = None
+                elif stock.get('base') == base:
+                    take = stock.get('take', {})
+                else:
+                    take = {}  # products.csv was rewritten after this was logged
+            except (KeyError, TypeError, ValueError) as e:
+                print(f"Checkout recovery: aborting transaction {txn}: {e}")
+                journal.log({'op': 'abort', 'txn': txn, 'reason': str(e)})
+                continue
+            if not state['sale']:
+                # The sale may have been stored just before the crash
+                if not self.store.contains(record):
+                    self.store.append(record)
+                journal.log({'op': 'sale', 'txn': txn})
+            if take is None:
+                changed = self.set_stock(rows, stock['set']) or changed
+            else:
+                changed = self.take_stock(rows, take) or changed
+            completed.append(txn)
+        if changed:
+            CSVHandler.replace_csv(self.products_file, rows)
+        journal.log_many([{'op': 'commit', 'txn': txn} for txn in completed])
+        return len(completed)
+
+    def products_stamp(self):
+        """(mtime, size, inode) of products.csv as a list (how it reads back from JSON)."""
+        try:
+            st = os.stat(self.products_file)
+        except OSError:
+            return None
+        return [st.st_mtime_ns, st.st_size, st.st_ino]
+
+    @staticmethod
+    def stock_take(lines):
+        """{product_id: quantity} for a sale's [(product_id, quantity)] lines."""
+        take = {}
+        for pid, qty in lines:
+            take[pid] = take.get(pid, 0) + qty
+        return take
+
+    @staticmethod
+    def take_stock(rows, take):
+        """Lowers each product's stock by its quantity in take, not below zero.
+        Returns whether any row changed."""
+        changed = False
+        for row in rows:
+            pid = row.get('product_id')
+            if pid in take:
+                try:
+                    stock = int(float(row.get('stock') or 0))
+                except ValueError:
+                    stock = 0
+                row['stock'] = str(max(0, stock - take[pid]))
+                changed = True
+        return changed
+
+    @staticmethod
+    def set_stock(rows, values):
+        changed = False
+        for row in rows:
+            pid = row.get('product_id')
+            if pid in values:
+                row['stock'] = str(values[pid])
+                changed = True
+        return changed
+
+    def dead_journals(self, legacy=False):
+        """Journals in this journal's directory other than our own, plus with legacy a
+        checkout.wal left in the working directory by an earlier version."""
+        directory = os.path.dirname(self.journal.path) or '.'
+        paths = []
+        if os.path.isdir(directory):
+            paths = [os.path.join(directory, name) for name in sorted(os.listdir(directory))
+                     if name.startswith('checkout-') and name.endswith('.wal')]
+        if legacy and os.path.exists(LEGACY_JOURNAL_FILE):
+            paths.append(LEGACY_JOURNAL_FILE)
+        own = os.path.abspath(self.journal.path)
+        return [path for path in paths if os.path.abspath(path) != own]
+
+    def recover_dead(self, legacy=False):
+        """Replays and deletes every journal whose writer has exited. Runs under
+        self.lock and self.products_lock. Returns how many sales were completed."""
+        replayed = 0
+        for path in self.dead_journals(legacy):
+            journal = CheckoutJournal(path)
+            if not journal.claim(blocking=False):
+                continue  # its terminal is still running
+            try:
+                replayed += self.replay(journal)
+            except Exception as e:
+                print(f"Checkout recovery: {path}: {e}")
+            finally:
+                journal.release(remove=not journal.pending())
+        return replayed
+
+    def recover(self):
+        """Finishes every checkout a stopped terminal journaled but didn't commit.
+        Returns how many were replayed."""
+        with self.lock, self.products_lock:
+            replayed = self.recover_dead(legacy=True)
+        if replayed:
+            print(f"Checkout recovery: completed {replayed} interrupted sale(s)")
+        return replayed
+
+    def compact_journal(self):
+        """Truncates a large journal once nothing in it is pending."""
+        with self.lock:
+            if self.journal.size() > JOURNAL_COMPACT_BYTES and not self.journal.pending():
+                self.journal.truncate()
+
+
+checkout_service = CheckoutService()
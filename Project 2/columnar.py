@@ -0,0 +1,332 @@
+"""Self-describing columnar archive for sales history (stdlib only).
+
+Layout:
+    MAGIC | header length (u32 little-endian) | header (UTF-8 JSON) | column blocks
+
+The header lists each table's row count and, per column, its type, codec, byte
+range and any dictionary, so a reader can load one column without touching the
+others. Column types:
+    f8    float64 array
+    i8    int64 array, optionally delta-encoded (sorted ids, running indexes)
+    str   uint32 byte lengths followed by the UTF-8 bytes
+    dict  uint32 codes into a value list stored in the header (low-cardinality text)
+Each block is compressed on its own with zlib, lzma or not at all.
+
+Sales archives hold two tables: "sales" (one row per sale) and "items" (one row
+per line item, with the row number of its sale).
+"""
+import json
+import lzma
+import os
+import struct
+import sys
+import zlib
+from array import array
+from datetime import datetime
+from itertools import accumulate
+
+MAGIC = b'POSCOL1\n'
+VERSION = 1
+HEADER_LEN = struct.Struct('<I')
+
+CODECS = ('none', 'zlib', 'lzma')
+DEFAULT_CODEC = 'zlib'
+# sales_tables() checks its cancelled callback once per this many sales
+CANCEL_CHECK_ROWS = 5000
+
+
+class WriteCancelled(Exception):
+    """Raised when a cancelled() callback asks a write to stop; nothing is left on disk."""
+
+
+# --- Codecs ---
+
+def compress(codec, raw):
+    if codec == 'zlib':
+        return zlib.compress(raw, 6)
+    if codec == 'lzma':
+        return lzma.compress(raw, preset=6)
+    if codec == 'none':
+        return bytes(raw)
+    raise ValueError(f"Unknown codec: {codec}")
+
+
+def decompress(codec, blob):
+    if codec == 'zlib':
+        return zlib.decompress(blob)
+    if codec == 'lzma':
+        return lzma.decompress(blob)
+    if codec == 'none':
+        return blob
+    raise ValueError(f"Unknown codec: {codec}")
+
+
+# --- Column encoders ---
+
+def encode_column(kind, values, delta=False):
+    """Returns (raw bytes, extra header fields) for one column."""
+    if kind == 'f8':
+        return array('d', values).tobytes(), {}
+    if kind == 'i8':
+        ints = array('q', values)
+        if delta and ints:
+            ints = array('q', [ints[0]] + [b - a for a, b in zip(ints, ints[1:])])
+        return ints.tobytes(), {'delta': bool(delta)}
+    if kind == 'str':
+        encoded = [str(v).encode('utf-8') for v in values]
+        return array('I', map(len, encoded)).tobytes() + b''.join(encoded), {}
+    if kind == 'dict':
+        lookup = {}
+        codes = array('I', [lookup.setdefault(str(v), len(lookup)) for v in values])
+        return codes.tobytes(), {'values': list(lookup)}
+    raise ValueError(f"Unknown column type: {kind}")
+
+
+def decode_column(spec, raw, rows):
+    kind = spec['type']
+    swap = spec.get('byteorder', 'little') != sys.byteorder
+    if kind in ('f8', 'i8'):
+        values = array('d' if kind == 'f8' else 'q')
+        values.frombytes(raw)
+        if swap:
+            values.byteswap()
+        if spec.get('delta'):
+            values = array('q', accumulate(values))
+        return values
+    if kind == 'str':
+        lengths = array('I')
+        lengths.frombytes(raw[:4 * rows])
+        if swap:
+            lengths.byteswap()
+        heap = raw[4 * rows:]
+        out = []
+        pos = 0
+        for n in lengths:
+            out.append(heap[pos:pos + n].decode('utf-8'))
+            pos += n
+        return out
+    if kind == 'dict':
+        codes = array('I')
+        codes.frombytes(raw)
+        if swap:
+            codes.byteswap()
+        values = spec['values']
+        return [values[c] for c in codes]
+    raise ValueError(f"Unknown column type: {kind}")
+
+
+# --- Writer / reader ---
+
+def write_archive(path, tables, codec=DEFAULT_CODEC, meta=None, progress=None, cancelled=None):
+    """Writes {table: [(name, type, values, options)]} to path.
+
+    codec may be one name for every column or a {column name: codec} dict; options
+    is a dict such as {'delta': True}. progress(columns done, total columns) is called
+    after each column is compressed, and cancelled() checked before each; if it returns
+    True, WriteCancelled is raised and path is left untouched. Returns the number of
+    bytes written."""
+    header = {'version': VERSION, 'created': datetime.now().isoformat(timespec='seconds'),
+              'meta': meta or {}, 'tables': {}}
+    blocks = []
+    offset = 0
+    total_columns = sum(len(columns) for columns in tables.values())
+    for table, columns in tables.items():
+        rows = None
+        specs = []
+        for name, kind, values, options in columns:
+            if cancelled is not None and cancelled():
+                raise WriteCancelled(path)
+            if rows is None:
+                rows = len(values)
+            elif len(values) != rows:
+                raise ValueError(f"{table}.{name} has {len(values)} rows, expected {rows}")
+            column_codec = codec.get(name, DEFAULT_CODEC) if isinstance(codec, dict) else codec
+            raw, extra = encode_column(kind, values, **options)
+            blob = compress(column_codec, raw)
+            spec = {'name': name, 'type': kind, 'codec': column_codec, 'offset': offset,
+                    'length': len(blob), 'raw': len(raw), 'byteorder': sys.byteorder}
+            spec.update(extra)
+            specs.append(spec)
+            blocks.append(blob)
+            offset += len(blob)
+            if progress is not None:
+                progress(len(blocks), total_columns)
+        header['tables'][table] = {'rows': rows or 0, 'columns': specs}
+
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    temp_path = f"{path}.tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(HEADER_LEN.pack(len(header_bytes)))
+            f.write(header_bytes)
+            for blob in blocks:
+                if cancelled is not None and cancelled():
+                    raise WriteCancelled(path)
+                f.write(blob)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return len(MAGIC) + HEADER_LEN.size + len(header_bytes) + offset
+
+
+class ColumnarFile:
+    """Reader for write_archive files. Columns are read and decoded on demand."""
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a columnar archive")
+            (length,) = HEADER_LEN.unpack(f.read(HEADER_LEN.size))
+            self.header = json.loads(f.read(length).decode('utf-8'))
+        if self.header.get('version') != VERSION:
+            raise ValueError(f"{path}: unsupported archive version {self.header.get('version')}")
+        self.data_start = len(MAGIC) + HEADER_LEN.size + length
+
+    @property
+    def meta(self):
+        return self.header.get('meta', {})
+
+    def tables(self):
+        return list(self.header['tables'])
+
+    def rows(self, table):
+        return self.header['tables'][table]['rows']
+
+    def columns(self, table):
+        return [spec['name'] for spec in self.header['tables'][table]['columns']]
+
+    def read_table(self, table, columns=None):
+        """{column name: values} for the requested columns (all by default)."""
+        info = self.header['tables'][table]
+        wanted = [s for s in info['columns'] if columns is None or s['name'] in columns]
+        out = {}
+        with open(self.path, 'rb') as f:
+            for spec in wanted:
+                f.seek(self.data_start + spec['offset'])
+                raw = decompress(spec['codec'], f.read(spec['length']))
+                out[spec['name']] = decode_column(spec, raw, info['rows'])
+        return out
+
+    def read(self, table, column):
+        return self.read_table(table, [column])[column]
+
+
+# --- Sales archives ---
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _int(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return 0
+
+
+ITEM_KEYS = ('product_id', 'name', 'category', 'quantity', 'price')
+
+
+class _RecordSale:
+    """Attribute view of a sales_store record, for archiving partitions."""
+    def __init__(self, record):
+        self.__dict__.update(record)
+        items = record.get('items_data') or '[]'
+        try:
+            self.items = json.loads(items) if isinstance(items, str) else items
+        except ValueError:
+            self.items = []
+
+
+def sales_tables(sales, cancelled=None):
+    """Columns for a sales archive from sale objects (sale_id, date, time, items as
+    dicts, total, tax, discount, payment_method, cashier_id). cancelled() is checked
+    every CANCEL_CHECK_ROWS sales and raises WriteCancelled when it returns True."""
+    sale_cols = {k: [] for k in ('sale_id', 'date', 'time', 'total', 'tax', 'discount',
+                                 'payment_method', 'cashier_id')}
+    item_cols = {k: [] for k in ('sale_row', 'product_id', 'name', 'category', 'quantity', 'price', 'extra')}
+    for row, sale in enumerate(sales):
+        if cancelled is not None and row % CANCEL_CHECK_ROWS == 0 and cancelled():
+            raise WriteCancelled()
+        sale_cols['sale_id'].append(str(sale.sale_id))
+        sale_cols['date'].append(sale.date)
+        sale_cols['time'].append(sale.time)
+        sale_cols['total'].append(_float(sale.total))
+        sale_cols['tax'].append(_float(sale.tax))
+        sale_cols['discount'].append(_float(sale.discount))
+        sale_cols['payment_method'].append(sale.payment_method)
+        sale_cols['cashier_id'].append(str(sale.cashier_id))
+        for item in sale.items or ():
+            item_cols['sale_row'].append(row)
+            item_cols['product_id'].append(str(item.get('product_id', '')))
+            item_cols['name'].append(str(item.get('name', '')))
+            item_cols['category'].append(str(item.get('category', '') or ''))
+            item_cols['quantity'].append(_int(item.get('quantity', 0)))
+            item_cols['price'].append(_float(item.get('price', 0)))
+            # Any other keys (e.g. tax_rate from older tools) are kept as JSON
+            extra = {k: v for k, v in item.items() if k not in ITEM_KEYS}
+            item_cols['extra'].append(json.dumps(extra) if extra else '')
+    no_delta = {}
+    return {
+        'sales': [
+            ('sale_id', 'str', sale_cols['sale_id'], no_delta),
+            ('date', 'dict', sale_cols['date'], no_delta),
+            ('time', 'str', sale_cols['time'], no_delta),
+            ('total', 'f8', sale_cols['total'], no_delta),
+            ('tax', 'f8', sale_cols['tax'], no_delta),
+            ('discount', 'f8', sale_cols['discount'], no_delta),
+            ('payment_method', 'dict', sale_cols['payment_method'], no_delta),
+            ('cashier_id', 'dict', sale_cols['cashier_id'], no_delta),
+        ],
+        'items': [
+            ('sale_row', 'i8', item_cols['sale_row'], {'delta': True}),
+            ('product_id', 'dict', item_cols['product_id'], no_delta),
+            ('name', 'dict', item_cols['name'], no_delta),
+            ('category', 'dict', item_cols['category'], no_delta),
+            ('quantity', 'i8', item_cols['quantity'], no_delta),
+            ('price', 'f8', item_cols['price'], no_delta),
+            ('extra', 'str', item_cols['extra'], no_delta),
+        ],
+    }
+
+
+def write_sales_archive(path, sales, codec=DEFAULT_CODEC, meta=None, progress=None, cancelled=None):
+    return write_archive(path, sales_tables(sales, cancelled), codec, meta, progress, cancelled)
+
+
+def write_records_archive(path, records, codec=DEFAULT_CODEC, meta=None):
+    """Same as write_sales_archive, for Sale.to_dict-style records (items_data as JSON)."""
+    return write_archive(path, sales_tables(_RecordSale(r) for r in records), codec, meta)
+
+
+def read_sales_archive(path):
+    """Sale records (dicts with the Sale.to_dict keys, items as a list of dicts and
+    numbers already typed) from a sales archive, in stored order."""
+    archive = ColumnarFile(path)
+    s = archive.read_table('sales')
+    items = archive.read_table('items')
+    n = archive.rows('sales')
+    per_sale = [[] for _ in range(n)]
+    extras = items.get('extra') or [''] * len(items['sale_row'])
+    for row, pid, name, category, qty, price, extra in zip(items['sale_row'], items['product_id'], items['name'],
+                                                           items['category'], items['quantity'], items['price'],
+                                                           extras):
+        item = {'product_id': pid, 'name': name, 'quantity': qty, 'price': price}
+        if category:
+            item['category'] = category
+        if extra:
+            item.update(json.loads(extra))
+        per_sale[row].append(item)
+    return [
+        {'sale_id': sid, 'date': date, 'time': time, 'items_data': lines, 'total': total, 'tax': tax,
+         'discount': discount, 'payment_method': method, 'cashier_id': cashier}
+        for sid, date, time, lines, total, tax, discount, method, cashier in zip(
+            s['sale_id'], s['date'], s['time'], per_sale, s['total'], s['tax'], s['discount'],
+            s['payment_method'], s['cashier_id'])
+    ]
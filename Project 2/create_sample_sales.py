@@ -1,59 +1,282 @@
-from csv_handler import CSVHandler
+"""Synthetic data for demos and load tests.
+
+Generates a product catalog (categories, EAN-13 barcodes, log-normal prices and
+margins), users, promo codes and a sales history with seasonal, weekday and hourly
+patterns and Zipf-distributed product popularity. Everything comes from one seed,
+so the same arguments give the same data (password salts aside). Sales come from a
+generator and are appended to the sales store CHUNK at a time, so millions of them
+never sit in memory.
+
+    python create_sample_sales.py                       # 20 demo sales over the last week
+    python create_sample_sales.py --products 100000 --users 50 --promos 20 --sales 1000000
+
+Benchmarks call create_dataset() to build a data directory.
+"""
+from sales_store import SalesStore, sales_store
+from passwords import MIN_ITERATIONS, hash_password
 from datetime import datetime, timedelta
+import argparse
+import bisect
+import csv
+import json
+import math
+import os
 import random
 
+PRODUCT_FIELDS = ['product_id', 'name', 'category', 'price', 'stock', 'active', 'cost', 'barcode', 'discount_eligibility']
+USER_FIELDS = ['user_id', 'username', 'password', 'role', 'active']
+PROMO_FIELDS = ['code', 'discount_percent', 'active']
+
+# category: (median price, log-normal sigma, product nouns)
+CATEGORY_PROFILES = {
+    'Beverages': (45.0, 0.6, ['Cola', 'Iced Tea', 'Juice', 'Coffee', 'Water', 'Energy Drink']),
+    'Snacks': (35.0, 0.5, ['Chips', 'Crackers', 'Cookies', 'Peanuts', 'Candy Bar']),
+    'Canned Goods': (55.0, 0.4, ['Sardines', 'Corned Beef', 'Tuna', 'Luncheon Meat', 'Beans']),
+    'Dairy': (90.0, 0.5, ['Milk', 'Cheese', 'Yogurt', 'Butter', 'Condensed Milk']),
+    'Bakery': (60.0, 0.5, ['Pandesal', 'Loaf Bread', 'Ensaymada', 'Cake Slice']),
+    'Household': (150.0, 0.7, ['Detergent', 'Dish Soap', 'Bleach', 'Trash Bags', 'Tissue']),
+    'Personal Care': (120.0, 0.7, ['Shampoo', 'Soap', 'Toothpaste', 'Lotion', 'Deodorant']),
+    'Frozen': (180.0, 0.6, ['Hotdog', 'Nuggets', 'Ice Cream', 'Dumplings', 'Longganisa']),
+}
+BRANDS = ['Royal', 'Golden', 'Sunrise', 'Island', 'Prime', 'Happy', 'Fresh', 'Lucky', 'Star', 'Bayan']
+SIZES = ['Small', 'Regular', 'Large', 'Family', 'Twin Pack', '1L', '500g', '250ml']
+
+# Relative sales volume by month (Jan..Dec), weekday (Mon..Sun) and hour (0..23)
+MONTH_WEIGHTS = [0.85, 0.8, 0.9, 0.95, 1.0, 0.95, 0.9, 0.95, 1.0, 1.05, 1.2, 1.6]
+WEEKDAY_WEIGHTS = [0.9, 0.85, 0.9, 0.95, 1.1, 1.35, 1.25]
+HOUR_WEIGHTS = [0, 0, 0, 0, 0, 0, 0.2, 0.6, 1.0, 1.1, 1.3, 1.8,
+                2.2, 1.7, 1.2, 1.1, 1.3, 1.9, 2.3, 1.8, 1.1, 0.6, 0.2, 0]
+PAYMENT_METHODS = ['cash', 'card', 'gcash', 'maya']
+PAYMENT_WEIGHTS = [0.55, 0.2, 0.17, 0.08]
+PROMO_RATE = 0.05
+ZIPF_EXPONENT = 1.1
+TAX_RATE = 0.12
+
+# Sales are generated and appended this many at a time
+CHUNK = 5000
+
+
+# --- Catalog ---
+
+def ean13(stem):
+    """EAN-13 barcode for a 12-digit stem (adds the check digit)."""
+    stem = f"{stem:012d}"[-12:]
+    total = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(stem))
+    return stem + str((10 - total % 10) % 10)
+
+
+def iter_products(count, rng):
+    """Yields products.csv rows (lists in PRODUCT_FIELDS order)."""
+    categories = list(CATEGORY_PROFILES)
+    for i in range(count):
+        category = categories[i % len(categories)]
+        median, sigma, nouns = CATEGORY_PROFILES[category]
+        price = round(max(5.0, rng.lognormvariate(math.log(median), sigma)), 2)
+        cost = round(price * rng.uniform(0.55, 0.85), 2)
+        name = f"{rng.choice(BRANDS)} {rng.choice(nouns)} {rng.choice(SIZES)}"
+        yield [str(100000 + i), name, category, price, rng.randint(20, 2000),
+               'True' if rng.random() < 0.97 else 'False', cost,
+               ean13(480_000_000_000 + i), 'True' if rng.random() < 0.9 else 'False']
+
+
+def create_catalog(count, path='products.csv', seed=0):
+    """Writes a products.csv with count products."""
+    rng = random.Random(seed)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(PRODUCT_FIELDS)
+        rows = iter_products(count, rng)
+        while True:
+            chunk = [row for _, row in zip(range(CHUNK), rows)]
+            if not chunk:
+                break
+            writer.writerows(chunk)
+    print(f"Created {count} products in {path}")
+
+
+def load_catalog(path='products.csv'):
+    """(product ids, names, categories, prices) columns for the active products."""
+    ids, names, categories, prices = [], [], [], []
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            if (row.get('active') or 'True').lower() != 'true':
+                continue
+            try:
+                price = float(row.get('price') or 0)
+            except ValueError:
+                continue
+            ids.append(row['product_id'])
+            names.append(row.get('name', ''))
+            categories.append(row.get('category', ''))
+            prices.append(price)
+    return ids, names, categories, prices
+
+
+# --- Users and promos ---
+
+def create_users(count, path='users.csv', seed=0, password='cashier123'):
+    """Writes users.csv with the default admin and count more staff (mostly cashiers).
+    Every generated account shares one password, hashed once."""
+    rng = random.Random(seed)
+    hashed = hash_password(password, MIN_ITERATIONS)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(USER_FIELDS)
+        writer.writerow(['1', 'admin', hash_password('admin123', MIN_ITERATIONS), 'Admin', 'True'])
+        for i in range(count):
+            role = 'Manager' if rng.random() < 0.1 else 'Cashier'
+            writer.writerow([str(i + 2), f"{role.lower()}{i + 1}", hashed, role, 'True'])
+    print(f"Created {count + 1} users in {path}")
+
+
+def create_promos(count, path='promos.csv', seed=0):
+    rng = random.Random(seed)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(PROMO_FIELDS)
+        for i in range(count):
+            writer.writerow([f"PROMO{i + 1:03d}", rng.choice([5, 10, 15, 20, 25]),
+                             'True' if rng.random() < 0.8 else 'False'])
+    print(f"Created {count} promo codes in {path}")
+
+
+def read_ids(path, key, where=None):
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        return [row[key] for row in csv.DictReader(f) if where is None or where(row)]
+
+
+# --- Sales ---
+
+class ZipfPicker:
+    """Picks indexes 0..n-1 with Zipf(exponent) popularity over a seeded shuffle,
+    so the best sellers are spread through the catalog rather than its first rows."""
+    def __init__(self, n, rng, exponent=ZIPF_EXPONENT):
+        self.order = list(range(n))
+        rng.shuffle(self.order)
+        total = 0.0
+        self.cum_weights = []
+        for rank in range(1, n + 1):
+            total += rank ** -exponent
+            self.cum_weights.append(total)
+        self.rng = rng
+
+    def pick(self):
+        x = self.rng.random() * self.cum_weights[-1]
+        return self.order[min(bisect.bisect_left(self.cum_weights, x), len(self.order) - 1)]
+
+
+def daily_counts(count, start, days):
+    """(date, number of sales) per day, weighted by month and weekday, summing to count."""
+    dates = [start + timedelta(days=d) for d in range(days)]
+    weights = [MONTH_WEIGHTS[d.month - 1] * WEEKDAY_WEIGHTS[d.weekday()] for d in dates]
+    total = sum(weights)
+    running = 0.0
+    previous = 0
+    for date, weight in zip(dates, weights):
+        running += weight
+        upto = round(count * running / total)
+        yield date, upto - previous
+        previous = upto
+
+
+def iter_sales(count, catalog, cashiers, promos, start, days, rng, first_id=1):
+    """Yields Sale.to_dict()-style records in date and time order."""
+    ids, names, categories, prices = catalog
+    picker = ZipfPicker(len(ids), rng)
+    hours = list(range(24))
+    sale_id = first_id
+    for date, n in daily_counts(count, start, days):
+        day = date.strftime('%Y-%m-%d')
+        times = sorted((h, rng.randrange(60), rng.randrange(60))
+                       for h in rng.choices(hours, weights=HOUR_WEIGHTS, k=n))
+        for h, m, s in times:
+            lines = {}
+            for _ in range(min(12, 1 + int(rng.expovariate(0.6)))):
+                index = picker.pick()
+                lines[index] = lines.get(index, 0) + rng.choice((1, 1, 1, 2, 2, 3))
+            items = [{'product_id': ids[i], 'name': names[i], 'quantity': qty, 'price': prices[i],
+                      'category': categories[i]} for i, qty in lines.items()]
+            subtotal = sum(item['quantity'] * item['price'] for item in items)
+            discount = 0.0
+            if promos and rng.random() < PROMO_RATE:
+                discount = subtotal * rng.choice(promos) / 100
+            total = subtotal - discount
+            yield {
+                'sale_id': str(sale_id),
+                'date': day,
+                'time': f"{h:02d}:{m:02d}:{s:02d}",
+                'items_data': json.dumps(items),
+                'total': f"{total:.2f}",
+                # Prices include VAT, as in SaleItem.tax_amount
+                'tax': f"{total / (1 + TAX_RATE) * TAX_RATE:.2f}",
+                'discount': f"{discount:.2f}",
+                'payment_method': rng.choices(PAYMENT_METHODS, weights=PAYMENT_WEIGHTS)[0],
+                'cashier_id': rng.choice(cashiers),
+            }
+            sale_id += 1
+
+
+def create_sales_history(count, products_path='products.csv', days=365, seed=0, store=None,
+                         users_path='users.csv', promos_path='promos.csv'):
+    """Appends count sales over the days up to today to the sales store, CHUNK at a time.
+    Returns the number written."""
+    store = store or sales_store
+    rng = random.Random(seed)
+    catalog = load_catalog(products_path)
+    if not catalog[0]:
+        raise ValueError(f"{products_path} has no active products")
+    cashiers = read_ids(users_path, 'user_id', lambda row: row.get('role') in ('Cashier', 'Manager')) or ['1']
+    promos = [float(p) for p in read_ids(promos_path, 'discount_percent')]
+    start = datetime.now().date() - timedelta(days=days - 1)
+    sales = iter_sales(count, catalog, cashiers, promos, start, days, rng, store.reserve_sale_ids(count))
+    written = 0
+    while True:
+        chunk = [record for _, record in zip(range(CHUNK), sales)]
+        if not chunk:
+            break
+        store.append_many(chunk)
+        written += len(chunk)
+    print(f"Created {written} sales over {days} days")
+    return written
+
+
+def create_dataset(root, products=1000, sales=10000, users=10, promos=10, days=365, seed=0):
+    """Builds a complete data directory (products, users, promos, sales partitions) in root."""
+    os.makedirs(root, exist_ok=True)
+    create_catalog(products, os.path.join(root, 'products.csv'), seed)
+    create_users(users, os.path.join(root, 'users.csv'), seed)
+    create_promos(promos, os.path.join(root, 'promos.csv'), seed)
+    store = SalesStore(os.path.join(root, 'sales'), os.path.join(root, 'sales.csv'))
+    store.ensure()
+    return create_sales_history(sales, os.path.join(root, 'products.csv'), days, seed, store,
+                                os.path.join(root, 'users.csv'), os.path.join(root, 'promos.csv'))
+
+
 def create_sample_sales():
-    """Create sample sales data for testing"""
-    
-    # Sample products
-    products = [
-        {'id': '1', 'name': 'Product A', 'price': 100.0, 'tax_rate': 12.0},
-        {'id': '2', 'name': 'Product B', 'price': 200.0, 'tax_rate': 12.0},
-        {'id': '3', 'name': 'Product C', 'price': 150.0, 'tax_rate': 12.0},
-    ]
-    
-    # Create sample sales for the last 7 days
-    sales_data = []
-    for i in range(20):
-        sale_date = (datetime.now() - timedelta(days=random.randint(0, 6))).strftime('%Y-%m-%d')
-        sale_time = f"{random.randint(8, 20):02d}:{random.randint(0, 59):02d}:{random.randint(0, 59):02d}"
-        
-        # Create 1-3 random items per sale
-        items = []
-        for _ in range(random.randint(1, 3)):
-            product = random.choice(products)
-            quantity = random.randint(1, 3)
-            items.append({
-                'product_id': product['id'],
-                'name': product['name'],
-                'quantity': quantity,
-                'price': product['price'],
-                'tax_rate': product['tax_rate']
-            })
-        
-        # Calculate totals
-        subtotal = sum(item['quantity'] * item['price'] for item in items)
-        tax = subtotal * 0.12  # 12% tax
-        discount = subtotal * random.uniform(0, 0.2)  # 0-20% discount
-        total = subtotal + tax - discount
-        
-        sale_data = {
-            'sale_id': str(i + 1),
-            'date': sale_date,
-            'time': sale_time,
-            'total': f"{total:.2f}",
-            'tax': f"{tax:.2f}",
-            'discount': f"{discount:.2f}",
-            'payment_method': random.choice(['cash', 'card', 'mixed']),
-            'cashier_id': '1',
-            'items': str(items).replace("'", '"')  # Convert to JSON string
-        }
-        
-        sales_data.append(sale_data)
-    
-    # Write to CSV
-    CSVHandler.write_csv('sales.csv', sales_data)
-    print(f"Created {len(sales_data)} sample sales records")
+    """Create sample sales data for testing: 20 sales over the last 7 days from the
+    current products.csv"""
+    create_sales_history(20, days=7, seed=random.randrange(1 << 30))
+
 
 if __name__ == '__main__':
-    create_sample_sales()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Generate sample data in the current directory')
+    parser.add_argument('--products', type=int, help='write a products.csv with this many products')
+    parser.add_argument('--users', type=int, help='write a users.csv with the admin and this many staff')
+    parser.add_argument('--promos', type=int, help='write a promos.csv with this many codes')
+    parser.add_argument('--sales', type=int, help='append this many sales over --days days')
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    if all(n is None for n in (args.products, args.users, args.promos, args.sales)):
+        create_sample_sales()
+    else:
+        if args.products is not None:
+            create_catalog(args.products, seed=args.seed)
+        if args.users is not None:
+            create_users(args.users, seed=args.seed)
+        if args.promos is not None:
+            create_promos(args.promos, seed=args.seed)
+        if args.sales is not None:
+            create_sales_history(args.sales, days=args.days, seed=args.seed)
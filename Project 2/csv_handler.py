@@ -1,6 +1,8 @@
 import csv
 import os
 
+from startup_trace import trace
+
 class CSVHandler:
     @staticmethod
     def create_csv(filename, headers):
@@ -17,8 +19,9 @@ class CSVHandler:
         if not os.path.exists(filename):
             return []
         try:
-            with open(filename, mode='r', newline='', encoding='utf-8') as file:
-                return list(csv.DictReader(file))
+            with trace.span(f"read_csv {filename}", 'csv'):
+                with open(filename, mode='r', newline='', encoding='utf-8') as file:
+                    return list(csv.DictReader(file))
         except Exception as e:
             print(f"Error reading {filename}: {e}")
             return []
@@ -36,6 +39,23 @@ class CSVHandler:
         except Exception as e:
             print(f"Error writing {filename}: {e}")
 
+    @staticmethod
+    def replace_csv(filename, data, sync=True):
+        """Like write_csv, but writes a temp file and swaps it in, so a crash mid-write
+        can't leave a truncated file. Errors are raised, not printed."""
+        if not data:
+            return
+        headers = list(data[0].keys())
+        temp_path = f"{filename}.{os.getpid()}.tmp"
+        with open(temp_path, mode='w', newline='', encoding='utf-8') as file:
+            writer = csv.DictWriter(file, fieldnames=headers)
+            writer.writeheader()
+            writer.writerows(data)
+            if sync:
+                file.flush()
+                os.fsync(file.fileno())
+        os.replace(temp_path, filename)
+
     @staticmethod
     def append_csv(filename, row_dict):
         file_exists = os.path.exists(filename)
@@ -0,0 +1,88 @@
+"""Chunked CSV export.
+
+Rows are produced lazily from the records being exported and written a chunk at a
+time to a temporary file, which replaces the target only when the export finishes.
+A cancelled or failed export leaves no partial file behind. This module has no Qt
+dependency; ui/export_worker.py runs it on a background thread.
+"""
+import csv
+import os
+
+CHUNK_RECORDS = 2000
+
+SALE_HEADER = ["Sale ID", "Date", "Time", "Cashier ID", "Payment Method", "Sale Total", "Tax", "Discount",
+               "Product ID", "Product", "Category", "Quantity", "Unit Price", "Line Total"]
+
+PRODUCT_HEADER = ['ID', 'Name', 'Category', 'Price', 'Cost', 'Margin %', 'Stock', 'Barcode', 'Status']
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+def sale_rows(sale):
+    """One row per line item, with the sale's own columns repeated on each."""
+    head = [sale.sale_id, sale.date, sale.time, sale.cashier_id, sale.payment_method,
+            f"{sale.total:.2f}", f"{sale.tax:.2f}", f"{sale.discount:.2f}"]
+    if not sale.items:
+        return [head + [''] * 6]
+    rows = []
+    for item in sale.items:
+        try:
+            quantity = item.get('quantity', 1)
+            price = float(item.get('price', 0))
+            line_total = f"{price * float(quantity):.2f}"
+            price = f"{price:.2f}"
+        except (TypeError, ValueError):
+            quantity, price, line_total = item.get('quantity', ''), item.get('price', ''), ''
+        rows.append(head + [item.get('product_id', ''), item.get('name', ''), item.get('category', ''),
+                            quantity, price, line_total])
+    return rows
+
+
+def product_rows(p):
+    cost = getattr(p, 'cost', 0.0)
+    margin = 0
+    if p.price > 0:
+        margin = ((p.price - cost) / p.price) * 100
+    return [[
+        p.product_id, p.name, p.category,
+        f"{p.price:.2f}", f"{cost:.2f}", f"{margin:.1f}%",
+        p.stock, getattr(p, 'barcode', ''), "Active" if p.active else "Inactive"
+    ]]
+
+
+def write_chunked(path, header, records, to_rows, total=None, progress=None, cancelled=None,
+                  chunk_records=CHUNK_RECORDS):
+    """Writes header plus to_rows(record) for every record, chunk_records at a time.
+
+    progress(done, total) is called after each chunk and cancelled() is checked before
+    each one; a cancel raises ExportCancelled. Returns the number of records written."""
+    temp_path = f"{path}.{os.getpid()}.part"
+    done = 0
+    try:
+        with open(temp_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            chunk = []
+            for record in records:
+                chunk.extend(to_rows(record))
+                done += 1
+                if done % chunk_records == 0:
+                    if cancelled and cancelled():
+                        raise ExportCancelled()
+                    writer.writerows(chunk)
+                    chunk = []
+                    if progress:
+                        progress(done, total)
+            writer.writerows(chunk)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    if progress:
+        progress(done, total)
+    return done
@@ -0,0 +1,73 @@
+"""OS-level exclusive file locks shared by every process using the data directory.
+
+The lock is held on a small side file (flock on POSIX, msvcrt byte lock on Windows)
+and is released by the OS if the holder dies, so a lock that can be taken without
+waiting also tells us its previous owner is gone.
+"""
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """Exclusive lock on path. Re-entrant by depth, not thread-safe: callers serialise
+    their own threads (SalesStore.lock, CheckoutService.lock)."""
+    def __init__(self, path):
+        self.path = path
+        self.depth = 0
+        self.file = None
+
+    def acquire(self, blocking=True):
+        """Takes the lock; without blocking, returns False if another process holds it."""
+        if self.depth == 0:
+            f = open(self.path, 'a+b')
+            try:
+                if not self.lock_file(f, blocking):
+                    f.close()
+                    return False
+            except BaseException:
+                f.close()
+                raise
+            self.file = f
+        self.depth += 1
+        return True
+
+    def release(self):
+        self.depth -= 1
+        if self.depth == 0:
+            f, self.file = self.file, None
+            try:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            finally:
+                f.close()
+
+    @staticmethod
+    def lock_file(f, blocking):
+        if fcntl is not None:
+            try:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            return True
+        f.seek(0)
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+                return True
+            except OSError:
+                if not blocking:
+                    return False
+                # LK_LOCK gives up after about 10 s; keep waiting
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
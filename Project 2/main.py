@@ -1,8 +1,17 @@
 import sys
 import os
+import threading
+from datetime import datetime
+
+# Enabled before the PyQt5 / ui imports below so their import time is on the timeline
+from startup_trace import trace
+if __name__ == "__main__":
+    trace.enable_from_argv(sys.argv)
+
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
-                             QHBoxLayout, QPushButton, QStackedWidget, QLabel, QFrame)
-from PyQt5.QtCore import Qt
+                             QHBoxLayout, QPushButton, QStackedWidget, QLabel, QFrame,
+                             QDialog)
+from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QFont, QIcon, QPalette, QColor
 
 # Import your windows from the ui subfolder
@@ -11,10 +20,19 @@ from ui.products_window import ProductsWindow  # Add this import
 from ui.sales_window import SalesWindow
 from ui.reports_window import ReportsWindow
 from ui.users_window import UsersWindow
-from ui.login_window import LoginWindow
+from ui.login_window import LoginWindow, QuickSwitchDialog
 from csv_handler import CSVHandler
+from sales_store import sales_store
+from checkout import checkout_service
 from models import User
 
+# Page shown right after login (index into the sidebar order below)
+START_PAGE = 2  # Sales
+USERS_PAGE = 4  # Admin only
+# Build the remaining pages in the background once the first one is on screen
+PREWARM_PAGES = True
+PREWARM_INTERVAL_MS = 250
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -27,15 +45,23 @@ class MainWindow(QMainWindow):
 
     def show_login(self):
         """Show login window"""
-        self.login_window = LoginWindow(self.on_login_success)
+        with trace.span("build LoginWindow", 'page'):
+            self.login_window = LoginWindow(self.on_login_success)
         self.login_window.show()
+        trace.mark("login shown")
 
     def on_login_success(self, user):
         """Handle successful login"""
+        trace.mark("login accepted")
         self.current_user = user
         self.login_window.close()
-        self.init_ui()
+        with trace.span("MainWindow.init_ui", 'page'):
+            self.init_ui()
         self.show()
+        # Runs once the start page has been laid out and painted
+        QTimer.singleShot(0, lambda: trace.mark("ready"))
+        if not PREWARM_PAGES:
+            QTimer.singleShot(0, trace.finish)
 
     def init_ui(self):
         """Initialize main UI after login"""
@@ -96,17 +122,35 @@ class MainWindow(QMainWindow):
         create_nav_btn("Sales", 2)
         create_nav_btn("Reports", 3)
         
-        # Only show Users tab for admin users
-        if self.current_user.role.lower() == 'admin':
-            create_nav_btn("Users", 4)
+        # Users tab always exists but is only shown to admin users, so a quick
+        # user switch can toggle it instead of rebuilding the sidebar
+        create_nav_btn("Users", USERS_PAGE)
         
         sidebar_layout.addStretch()
         
         # User Info
-        user_lbl = QLabel(f"Logged in as:\n{self.current_user.username}\n({self.current_user.role})")
-        user_lbl.setStyleSheet("color: #94a3b8; padding: 20px; font-size: 12px;")
-        user_lbl.setAlignment(Qt.AlignCenter)
-        sidebar_layout.addWidget(user_lbl)
+        self.user_lbl = QLabel()
+        self.user_lbl.setStyleSheet("color: #94a3b8; padding: 20px; font-size: 12px;")
+        self.user_lbl.setAlignment(Qt.AlignCenter)
+        sidebar_layout.addWidget(self.user_lbl)
+
+        # Quick switch (cashier handover) button
+        switch_btn = QPushButton("Switch User")
+        switch_btn.setFixedHeight(40)
+        switch_btn.clicked.connect(self.quick_switch_user)
+        switch_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #334155;
+                color: white;
+                border: none;
+                margin: 10px 10px 0px 10px;
+                border-radius: 4px;
+            }
+            QPushButton:hover {
+                background-color: #475569;
+            }
+        """)
+        sidebar_layout.addWidget(switch_btn)
 
         # Logout button
         logout_btn = QPushButton("Logout")
@@ -136,32 +180,92 @@ class MainWindow(QMainWindow):
         
         self.stack = QStackedWidget()
         
-        # Initialize Windows with current user where needed
-        self.inventory_window = InventoryWindow()
-        self.products_window = ProductsWindow()  # Initialize ProductsWindow
-        self.sales_window = SalesWindow(self.current_user)
-        self.reports_window = ReportsWindow()
-        self.users_window = UsersWindow()
-        
-        self.stack.addWidget(self.inventory_window)
-        self.stack.addWidget(self.products_window)  # Add ProductsWindow to stack
-        self.stack.addWidget(self.sales_window)
-        self.stack.addWidget(self.reports_window)
+        # Pages are built on first visit: (attribute name, factory), in sidebar order.
+        # Each slot starts as an empty placeholder so stack indices match the buttons.
+        self.page_factories = [
+            ('inventory_window', InventoryWindow),
+            ('products_window', ProductsWindow),
+            ('sales_window', lambda: SalesWindow(self.current_user)),
+            ('reports_window', ReportsWindow),
+            ('users_window', UsersWindow),  # never built unless an admin opens it
+        ]
         
-        # Only add Users window for admin users
-        if self.current_user.role.lower() == 'admin':
-            self.stack.addWidget(self.users_window)
+        self.inventory_window = None
+        self.products_window = None
+        self.sales_window = None
+        self.reports_window = None
+        self.users_window = None
+        self.built_pages = set()
+        for _ in self.page_factories:
+            self.stack.addWidget(QWidget())
         
         content_layout.addWidget(self.stack)
         main_layout.addWidget(content_area)
         
-        # Select first page
+        self.update_user_info()
+        
+        # Select start page
         if self.nav_btns:
-            self.nav_btns[0].click()
+            start = START_PAGE if START_PAGE < len(self.nav_btns) else 0
+            self.nav_btns[start].click()
+        
+        if PREWARM_PAGES:
+            QTimer.singleShot(PREWARM_INTERVAL_MS, self.prewarm_next_page)
+
+    def get_page(self, index):
+        """Return the page at index, constructing it on first use"""
+        if index not in self.built_pages:
+            attr, factory = self.page_factories[index]
+            with trace.span(f"build {attr}", 'page'):
+                page = factory()
+            placeholder = self.stack.widget(index)
+            self.stack.insertWidget(index, page)
+            self.stack.removeWidget(placeholder)
+            placeholder.deleteLater()
+            setattr(self, attr, page)
+            self.built_pages.add(index)
+        return self.stack.widget(index)
+
+    def prewarm_next_page(self):
+        """Build one not-yet-visited page per tick so the UI stays responsive"""
+        if self.current_user is None:
+            return
+        pending = [i for i in range(len(self.page_factories))
+                   if i not in self.built_pages and (i != USERS_PAGE or self.is_admin())]
+        if pending:
+            self.get_page(pending[0])
+            QTimer.singleShot(PREWARM_INTERVAL_MS, self.prewarm_next_page)
+        else:
+            trace.finish()
+
+    def is_admin(self):
+        return self.current_user is not None and self.current_user.role.strip().lower() == 'admin'
+
+    def update_user_info(self):
+        """Refresh the sidebar for the current user and toggle role-restricted tabs"""
+        self.user_lbl.setText(f"Logged in as:\n{self.current_user.username}\n({self.current_user.role})")
+        self.nav_btns[USERS_PAGE].setVisible(self.is_admin())
+
+    def quick_switch_user(self):
+        """Hand the terminal to another user, keeping every page and its loaded data"""
+        dialog = QuickSwitchDialog(self)
+        if dialog.exec_() != QDialog.Accepted:
+            return
+        self.current_user = dialog.user
+        if self.sales_window is not None:
+            self.sales_window.current_user = dialog.user
+        self.update_user_info()
+        
+        # Leave the Users page if the new user isn't allowed on it
+        if self.stack.currentIndex() == USERS_PAGE and not self.is_admin():
+            self.nav_btns[START_PAGE].click()
 
     def switch_page(self, index, active_btn):
-        # Ensure index is valid (users tab might not be available)
+        # Ensure index is valid and the user may open it
+        if index == USERS_PAGE and not self.is_admin():
+            return
         if index < self.stack.count():
+            self.get_page(index)
             self.stack.setCurrentIndex(index)
             
             # Update button styles
@@ -180,16 +284,29 @@ def ensure_data_files():
     files = {
         'products.csv': ['product_id', 'name', 'category', 'price', 'stock', 'active', 'cost', 'barcode', 'discount_eligibility'],
         'users.csv': ['user_id', 'username', 'password', 'role', 'active'],
-        'sales.csv': ['sale_id', 'date', 'time', 'total', 'tax', 'discount', 'payment_method', 'cashier_id', 'items_data'],
         'promos.csv': ['code', 'discount_percent', 'active']
     }
     
     for filename, headers in files.items():
         if not os.path.exists(filename):
             CSVHandler.create_csv(filename, headers)
+    
+    # Monthly sales partitions (migrates a legacy sales.csv, closes finished months)
+    try:
+        sales_store.ensure(datetime.now().strftime('%Y-%m-%d'))
+        # Finish any checkout interrupted by a crash before anything reads stock or sales
+        checkout_service.recover()
+        # Compress closed months in the background; reads stay transparent meanwhile
+        threading.Thread(target=sales_store.compact_closed, daemon=True).start()
+    except Exception as e:
+        print(f"Error opening sales history: {e}")
 
 if __name__ == "__main__":
-    ensure_data_files()
-    app = QApplication(sys.argv)
+    with trace.span("ensure_data_files"):
+        ensure_data_files()
+    with trace.span("QApplication"):
+        app = QApplication(sys.argv)
+        # Let the checkout writer finish queued sales before exit
+        app.aboutToQuit.connect(checkout_service.close)
     window = MainWindow()
     sys.exit(app.exec_())
\ No newline at end of file
@@ -44,6 +44,21 @@ class Product:
             discount_eligibility=data.get('discount_eligibility', 'true') # Defaults to True if missing
         )
 
+    @classmethod
+    def from_parsed(cls, product_id, name, category, price, stock, active, cost, barcode, discount_eligibility):
+        """Builds a Product from values that are already typed (see CatalogLoader), skipping coercion."""
+        product = cls.__new__(cls)
+        product.product_id = product_id
+        product.name = name
+        product.category = category
+        product.price = price
+        product.stock = stock
+        product.cost = cost
+        product.active = active
+        product.barcode = barcode
+        product.discount_eligibility = discount_eligibility
+        return product
+
     def to_dict(self):
         return {
             'product_id': self.product_id,
@@ -59,9 +74,12 @@ class Product:
 
 # --- SaleItem, Sale, User classes (Standard) ---
 class SaleItem:
-    def __init__(self, product_id, name, quantity, price, tax_rate=0.0):
+    def __init__(self, product_id, name, quantity, price, tax_rate=0.0, category=''):
         self.product_id = str(product_id)
         self.name = str(name)
+        # Snapshot of the product's category when it was sold, so reports stay right
+        # after the product is deleted or recategorized
+        self.category = str(category or '')
         try: self.quantity = int(float(quantity))
         except: self.quantity = 0
         try: self.price = float(price)
@@ -74,7 +92,10 @@ class SaleItem:
     def tax_amount(self): return (self.subtotal / 1.12) * 0.12
 
     def to_dict(self):
-        return {'product_id': self.product_id, 'name': self.name, 'quantity': self.quantity, 'price': self.price}
+        data = {'product_id': self.product_id, 'name': self.name, 'quantity': self.quantity, 'price': self.price}
+        if self.category:
+            data['category'] = self.category
+        return data
 
 class Sale:
     def __init__(self, sale_id, date, time, items, total, tax, discount, payment_method, cashier_id):
@@ -96,7 +117,7 @@ class Sale:
         items = []
         try:
             raw = json.loads(data.get('items_data', '[]'))
-            for i in raw: items.append(SaleItem(i.get('product_id',''), i.get('name',''), i.get('quantity',0), i.get('price',0)))
+            for i in raw: items.append(SaleItem(i.get('product_id',''), i.get('name',''), i.get('quantity',0), i.get('price',0), category=i.get('category','')))
         except: pass
         return cls(data.get('sale_id',''), data.get('date',''), data.get('time',''), items, 
                    data.get('total',0), data.get('tax',0), data.get('discount',0), 
@@ -120,4 +141,8 @@ class User:
 
     @classmethod
     def from_dict(cls, data):
-        return cls(data.get('user_id',''), data.get('username',''), data.get('password',''), data.get('role','Cashier'), data.get('active','true'))
\ No newline at end of file
+        return cls(data.get('user_id',''), data.get('username',''), data.get('password',''), data.get('role','Cashier'), data.get('active','true'))
+
+    def to_dict(self):
+        return {'user_id': self.user_id, 'username': self.username, 'password': self.password,
+                'role': self.role, 'active': str(self.active)}
\ No newline at end of file
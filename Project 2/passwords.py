@@ -0,0 +1,130 @@
+"""Salted password hashing for users.csv.
+
+New hashes use PBKDF2-HMAC-SHA256 with a random salt, stored as
+    pbkdf2_sha256$<iterations>$<salt hex>$<hash hex>
+The iteration count is calibrated once per process so one verification takes about
+TARGET_LOGIN_MS on this machine (never fewer than MIN_ITERATIONS). Older entries -
+plaintext, or the unsalted sha256 hex the users page used to write - still verify, and
+needs_rehash() tells the caller to upgrade them after a successful login.
+"""
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+
+ALGORITHM = 'pbkdf2_sha256'
+TARGET_LOGIN_MS = 250
+MIN_ITERATIONS = 100_000
+MAX_ITERATIONS = 5_000_000
+CALIBRATION_ITERATIONS = 20_000
+SALT_BYTES = 16
+CACHE_SIZE = 256
+
+_iterations = None
+_dummy_hash = None
+_lock = threading.Lock()
+
+
+def calibrate_iterations(target_ms=TARGET_LOGIN_MS):
+    """Times a short PBKDF2 run and scales it to the target latency."""
+    start = time.perf_counter()
+    hashlib.pbkdf2_hmac('sha256', b'calibration', b'0' * SALT_BYTES, CALIBRATION_ITERATIONS)
+    elapsed_ms = max((time.perf_counter() - start) * 1000, 0.001)
+    iterations = int(CALIBRATION_ITERATIONS * target_ms / elapsed_ms)
+    return max(MIN_ITERATIONS, min(MAX_ITERATIONS, iterations))
+
+
+def get_iterations():
+    global _iterations
+    with _lock:
+        if _iterations is None:
+            _iterations = calibrate_iterations()
+        return _iterations
+
+
+def hash_password(password, iterations=None):
+    iterations = iterations or get_iterations()
+    salt = os.urandom(SALT_BYTES)
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations)
+    return f"{ALGORITHM}${iterations}${salt.hex()}${digest.hex()}"
+
+
+def identify(stored):
+    """Returns 'pbkdf2_sha256', 'sha256' (legacy unsalted hex) or 'plaintext'."""
+    if stored.startswith(ALGORITHM + '$') and stored.count('$') == 3:
+        return ALGORITHM
+    if len(stored) == 64 and all(c in '0123456789abcdef' for c in stored):
+        return 'sha256'
+    return 'plaintext'
+
+
+def needs_rehash(stored):
+    kind = identify(stored)
+    if kind != ALGORITHM:
+        return True
+    try:
+        return int(stored.split('$')[1]) < MIN_ITERATIONS
+    except ValueError:
+        return True
+
+
+# --- Verification cache ---
+# Remembers successful (stored hash, password) pairs so a cashier logging in again
+# at the same terminal doesn't pay the full PBKDF2 cost. Keys are HMACs under a
+# per-process random key, so the cache never holds the password itself.
+
+_cache_key = os.urandom(32)
+_cache = OrderedDict()
+
+
+def _cache_token(password, stored):
+    return hmac.new(_cache_key, stored.encode('utf-8') + b'\0' + password.encode('utf-8'), 'sha256').digest()
+
+
+def _verify_uncached(password, stored):
+    kind = identify(stored)
+    if kind == ALGORITHM:
+        try:
+            _, iterations, salt, expected = stored.split('$')
+            digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), bytes.fromhex(salt), int(iterations))
+        except ValueError:
+            return False
+        return hmac.compare_digest(digest.hex(), expected)
+    if kind == 'sha256':
+        candidate = hashlib.sha256(password.encode('utf-8')).hexdigest()
+        if hmac.compare_digest(candidate, stored):
+            return True
+    # Plaintext (and a plaintext password that merely looks like sha256 hex)
+    return hmac.compare_digest(password.encode('utf-8'), stored.encode('utf-8'))
+
+
+def verify_password(password, stored):
+    token = _cache_token(password, stored)
+    with _lock:
+        if token in _cache:
+            _cache.move_to_end(token)
+            return True
+    ok = _verify_uncached(password, stored)
+    if ok:
+        with _lock:
+            _cache[token] = True
+            if len(_cache) > CACHE_SIZE:
+                _cache.popitem(last=False)
+    return ok
+
+
+def dummy_hash():
+    """Hash to check against when the username doesn't exist, so a failed login takes
+    the same time either way and doesn't reveal which usernames are valid.
+
+    Built once by hash_password, with the same parameters as a real user's hash. The
+    first call calibrates and hashes, so make it off the GUI thread."""
+    global _dummy_hash
+    if _dummy_hash is None:
+        stored = hash_password(os.urandom(SALT_BYTES).hex())
+        with _lock:
+            if _dummy_hash is None:
+                _dummy_hash = stored
+    return _dummy_hash
@@ -0,0 +1,477 @@
+"""Month-partitioned sales storage.
+
+Sales live in one CSV segment per calendar month under sales/, described by a small
+JSON manifest:
+
+    sales/manifest.json
+    sales/sales-2025-11.csv
+    sales/sales-2025-12.csv
+
+The manifest records each partition's row count and date span, whether it is open
+or closed, and the next sale id, so issuing an id no longer reads the whole history
+and a date-range query only opens the partitions that overlap it. When a sale for a
+new month arrives (or the app starts in a new month) earlier partitions are closed:
+they are made read-only and never written again.
+
+A sale dated in a closed month goes to the newest open partition, or, if there is
+none, to a new partition with a unique name (sales-2025-11-2.csv). An existing
+partition file or manifest entry is never truncated or reused.
+
+Closed partitions are then compacted into the lzma-compressed columnar format of
+columnar.py (sales-2025-11.poscol). read_partition() decodes either format, so
+callers see the same records; the only difference is that an archived record's
+items_data is already a list of dicts and its numbers are already floats.
+
+The legacy single sales.csv is migrated on first use and renamed to
+sales.csv.migrated.
+
+Several terminals (and the maintenance scripts) may share one sales directory.
+Every manifest change happens inside transaction(), which holds an OS file lock
+on sales/.lock and re-reads the manifest if another process saved it since.
+"""
+import csv
+import json
+import os
+import stat
+import threading
+from contextlib import contextmanager
+
+from columnar import ColumnarFile, read_sales_archive, write_records_archive
+from file_lock import FileLock
+
+SALES_DIR = 'sales'
+MANIFEST_NAME = 'manifest.json'
+LOCK_NAME = '.lock'
+LEGACY_FILE = 'sales.csv'
+MANIFEST_VERSION = 1
+
+# Column order of Sale.to_dict, which is what checkout writes
+SALE_FIELDS = ['sale_id', 'date', 'time', 'items_data', 'total', 'tax', 'discount', 'payment_method', 'cashier_id']
+
+UNDATED = 'undated'
+
+# Closed months are read rarely, so favour size over compression speed
+COLD_CODEC = 'lzma'
+READ_ONLY = stat.S_IREAD | stat.S_IRGRP | stat.S_IROTH
+
+
+def month_of(date_str):
+    """'2025-11-26' -> '2025-11'; anything unrecognisable goes to the 'undated' partition."""
+    date_str = (date_str or '').strip()
+    if len(date_str) >= 7 and date_str[4] == '-' and date_str[:4].isdigit() and date_str[5:7].isdigit():
+        return date_str[:7]
+    return UNDATED
+
+
+def normalize_legacy_row(row):
+    """Maps a row of the old sales.csv to SALE_FIELDS.
+
+    The old file's header lists total before items_data, but checkout appended rows
+    in Sale.to_dict order, so most rows have every column after 'time' shifted by
+    one. Those are recognised by a JSON list sitting in the 'total' column."""
+    if (row.get('total') or '').lstrip().startswith('['):
+        return {
+            'sale_id': row.get('sale_id', ''), 'date': row.get('date', ''), 'time': row.get('time', ''),
+            'items_data': row.get('total', '[]'), 'total': row.get('tax', ''), 'tax': row.get('discount', ''),
+            'discount': row.get('payment_method', ''), 'payment_method': row.get('cashier_id', ''),
+            'cashier_id': row.get('items_data', ''),
+        }
+    record = {field: row.get(field, '') or '' for field in SALE_FIELDS}
+    record['items_data'] = row.get('items_data') or row.get('items') or '[]'
+    return record
+
+
+def file_stem(name):
+    return os.path.splitext(name)[0]
+
+
+class SalesStore:
+    def __init__(self, root=SALES_DIR, legacy_file=LEGACY_FILE):
+        self.root = root
+        self.legacy_file = legacy_file
+        self.manifest_path = os.path.join(root, MANIFEST_NAME)
+        self.manifest = None
+        self.manifest_stamp = None  # (mtime, size, inode) of the manifest we hold
+        self.lock = threading.RLock()
+        self.file_lock = FileLock(os.path.join(root, LOCK_NAME))
+
+    # --- Manifest ---
+
+    @contextmanager
+    def transaction(self):
+        """Holds the store against other threads and processes, with the manifest
+        re-read if someone else saved it. Nested calls reuse the outer lock."""
+        with self.lock:
+            os.makedirs(self.root, exist_ok=True)
+            self.file_lock.acquire()
+            try:
+                if self.file_lock.depth == 1:
+                    self.refresh()
+                yield self.manifest
+            finally:
+                self.file_lock.release()
+
+    def stat_manifest(self):
+        try:
+            st = os.stat(self.manifest_path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def refresh(self):
+        stamp = self.stat_manifest()
+        if stamp is None:
+            if self.manifest is None:
+                self.create()
+            else:
+                self.save_manifest()
+        elif stamp != self.manifest_stamp or self.manifest is None:
+            self.manifest = self.load_manifest()
+            self.manifest_stamp = stamp
+
+    def partition_path(self, part):
+        return os.path.join(self.root, part['file'])
+
+    def load_manifest(self):
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') != MANIFEST_VERSION:
+            raise ValueError(f"{self.manifest_path}: unsupported version {manifest.get('version')}")
+        return manifest
+
+    def save_manifest(self, sync=False):
+        temp_path = f"{self.manifest_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=1)
+            if sync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(temp_path, self.manifest_path)
+        self.manifest_stamp = self.stat_manifest()
+
+    def ensure(self, today=None):
+        """Loads the manifest, creating the store (and migrating sales.csv) if needed,
+        then closes any partition from a month that has already ended."""
+        with self.transaction():
+            if today is not None:
+                self.rollover(month_of(today))
+            return self.manifest
+
+    def create(self):
+        os.makedirs(self.root, exist_ok=True)
+        self.manifest = {'version': MANIFEST_VERSION, 'next_sale_id': 1, 'partitions': []}
+        if os.path.exists(self.legacy_file):
+            self.migrate_legacy()
+        self.save_manifest()
+
+    def migrate_legacy(self):
+        with open(self.legacy_file, 'r', newline='', encoding='utf-8') as f:
+            records = [normalize_legacy_row(row) for row in csv.DictReader(f)]
+        by_month = {}
+        for record in records:
+            by_month.setdefault(month_of(record['date']), []).append(record)
+        for month in sorted(by_month):
+            part = self.new_partition(month)
+            with open(self.partition_path(part), 'a', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=SALE_FIELDS)
+                for record in by_month[month]:
+                    writer.writerow(record)
+                    self.note_row(part, record)
+        # Legacy ids were len(rows) + 1, so carry on from the larger of that and the max id
+        self.manifest['next_sale_id'] = max(self.manifest['next_sale_id'], len(records) + 1)
+        os.replace(self.legacy_file, self.legacy_file + '.migrated')
+        print(f"Migrated {len(records)} sales from {self.legacy_file} into {len(by_month)} monthly partition(s)")
+
+    # --- Partitions ---
+
+    def partitions(self):
+        with self.transaction():
+            return list(self.manifest['partitions'])
+
+    def find_partition(self, month):
+        """The month's open partition if it has one, else its newest closed one."""
+        matches = [part for part in self.manifest['partitions'] if part['month'] == month]
+        open_parts = [part for part in matches if part['state'] == 'open']
+        if open_parts:
+            return open_parts[-1]
+        return matches[-1] if matches else None
+
+    def find_file(self, name):
+        """The partition stored in name now, or whose CSV name was before compaction."""
+        for part in self.manifest['partitions']:
+            if part['file'] == name or part.get('csv_file') == name:
+                return part
+        return None
+
+    def unused_stem(self, month):
+        """sales-MONTH, or sales-MONTH-N when that name is taken by a manifest entry
+        or a file on disk in either format."""
+        used = set()
+        for part in self.manifest['partitions']:
+            used.add(file_stem(part['file']))
+            if part.get('csv_file'):
+                used.add(file_stem(part['csv_file']))
+        base = stem = f"sales-{month}"
+        n = 1
+        while (stem in used or os.path.exists(os.path.join(self.root, stem + '.csv')) or
+               os.path.exists(os.path.join(self.root, stem + '.poscol'))):
+            n += 1
+            stem = f"{base}-{n}"
+        return stem
+
+    def new_partition(self, month):
+        part = {'month': month, 'file': self.unused_stem(month) + '.csv', 'rows': 0,
+                'first_date': None, 'last_date': None, 'state': 'open'}
+        # 'x': fail rather than truncate if the name is somehow taken
+        with open(self.partition_path(part), 'x', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerow(SALE_FIELDS)
+        self.manifest['partitions'].append(part)
+        self.manifest['partitions'].sort(key=lambda p: p['month'])
+        return part
+
+    def note_row(self, part, record):
+        part['rows'] += 1
+        date = record.get('date') or ''
+        if month_of(date) != UNDATED:
+            date = date[:10]
+            if part['first_date'] is None or date < part['first_date']:
+                part['first_date'] = date
+            if part['last_date'] is None or date > part['last_date']:
+                part['last_date'] = date
+        try:
+            self.manifest['next_sale_id'] = max(self.manifest['next_sale_id'], int(record['sale_id']) + 1)
+        except (KeyError, ValueError):
+            pass
+
+    def close_partition(self, part):
+        """Marks a partition closed and makes its file read-only."""
+        part['state'] = 'closed'
+        path = self.partition_path(part)
+        if os.path.exists(path):
+            os.chmod(path, READ_ONLY)
+
+    def rollover(self, current_month):
+        """Closes every open partition from a month before current_month."""
+        changed = False
+        for part in self.manifest['partitions']:
+            if part['state'] == 'open' and part['month'] != UNDATED and part['month'] < current_month:
+                self.close_partition(part)
+                changed = True
+        if changed:
+            self.save_manifest()
+
+    # --- Writes ---
+
+    def next_sale_id(self):
+        with self.transaction():
+            return str(self.manifest['next_sale_id'])
+
+    def reserve_sale_ids(self, count):
+        """Hands out count consecutive sale ids before the sales are appended and returns
+        the first. The reservation is saved at once, so sales still queued for a checkout
+        writer, or being written by another terminal, never share an id."""
+        with self.transaction():
+            first = self.manifest['next_sale_id']
+            self.manifest['next_sale_id'] = first + count
+            self.save_manifest()
+            return first
+
+    def reserve_sale_id(self):
+        return str(self.reserve_sale_ids(1))
+
+    def append(self, record, sync=False):
+        """Appends one sale (a Sale.to_dict() dict) to its month's partition."""
+        self.append_many([record], sync)
+
+    def target_partition(self, month):
+        """Open partition a sale for month goes to. A sale dated in a month that is
+        already closed goes to the newest open partition, or to a new uniquely named
+        one when none is open; the partition date spans in the manifest keep range
+        queries right."""
+        if month != UNDATED:
+            self.rollover(month)
+        part = self.find_partition(month)
+        if part is not None and part['state'] == 'closed':
+            open_parts = [p for p in self.manifest['partitions'] if p['state'] == 'open']
+            part = open_parts[-1] if open_parts else None
+        if part is None:
+            part = self.new_partition(month)
+        return part
+
+    def append_many(self, records, sync=False):
+        """Appends sales with one open/write per partition and one manifest save.
+        With sync, the partition files and manifest are fsynced before returning."""
+        with self.transaction():
+            groups = {}
+            for record in records:
+                part = self.target_partition(month_of(record.get('date')))
+                groups.setdefault(part['file'], (part, []))[1].append(record)
+            for part, group in groups.values():
+                with open(self.partition_path(part), 'a', newline='', encoding='utf-8') as f:
+                    csv.DictWriter(f, fieldnames=SALE_FIELDS, extrasaction='ignore').writerows(group)
+                    if sync:
+                        f.flush()
+                        os.fsync(f.fileno())
+                for record in group:
+                    self.note_row(part, record)
+            self.save_manifest(sync)
+
+    # --- Reads ---
+
+    def partitions_for(self, start_date=None, end_date=None):
+        """Partitions that may hold sales dated in [start_date, end_date) ('YYYY-MM-DD'
+        strings, None for open). Undated partitions only match open-ended queries."""
+        selected = []
+        for part in self.partitions():
+            if part['rows'] == 0:
+                continue
+            if part['first_date'] is None:
+                if start_date is None and end_date is None:
+                    selected.append(part)
+                continue
+            if start_date is not None and part['last_date'] < start_date:
+                continue
+            if end_date is not None and part['first_date'] >= end_date:
+                continue
+            selected.append(part)
+        return selected
+
+    def read_partition(self, part):
+        try:
+            return self.read_partition_file(part)
+        except FileNotFoundError:
+            # Compacted by another thread or terminal since part came from the manifest
+            with self.transaction():
+                current = self.find_file(part['file'])
+            if current is None or current['file'] == part['file']:
+                raise
+            return self.read_partition_file(current)
+
+    def read_partition_file(self, part):
+        if part.get('format') == 'columnar':
+            return read_sales_archive(self.partition_path(part))
+        with open(self.partition_path(part), 'r', newline='', encoding='utf-8') as f:
+            return list(csv.DictReader(f))
+
+    def iter_records(self, start_date=None, end_date=None):
+        """Sale records (dicts keyed by SALE_FIELDS) from the partitions overlapping the range.
+        Records are not filtered by date here; callers index them by timestamp."""
+        for part in self.partitions_for(start_date, end_date):
+            yield from self.read_partition(part)
+
+    def read_records(self, start_date=None, end_date=None):
+        return list(self.iter_records(start_date, end_date))
+
+    def contains(self, record):
+        """True if a sale with this record's id is stored in its month's partition or an
+        open one. Used by checkout recovery, so it reads at most a few partitions."""
+        sale_id = str(record.get('sale_id'))
+        month = month_of(record.get('date'))
+        for part in self.partitions():
+            if part['state'] == 'open' or part['month'] == month:
+                if any(row.get('sale_id') == sale_id for row in self.read_partition(part)):
+                    return True
+        return False
+
+    def rewrite_partition(self, part, records):
+        """Replaces an open partition's rows (used by fix_sales_data.py)."""
+        with self.transaction():
+            part = self.find_file(part['file']) or part
+            if part['state'] != 'open':
+                raise ValueError(f"Partition {part['month']} is closed and cannot be rewritten")
+            temp_path = self.partition_path(part) + '.tmp'
+            with open(temp_path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=SALE_FIELDS, extrasaction='ignore')
+                writer.writeheader()
+                writer.writerows(records)
+            os.replace(temp_path, self.partition_path(part))
+            part.update({'rows': 0, 'first_date': None, 'last_date': None})
+            for record in records:
+                self.note_row(part, record)
+            self.save_manifest()
+
+    # --- Cold archive ---
+
+    def compact_partition(self, part, codec=COLD_CODEC):
+        """Rewrites a closed CSV partition as a compressed columnar archive and drops the CSV.
+        Returns True if the partition was compacted. If the archive comes out no smaller
+        than the CSV (a partition of a few sales), the CSV is kept and the partition is
+        marked so it isn't tried again."""
+        if (part['state'] != 'closed' or part.get('format') == 'columnar'
+                or part.get('compact_skipped') == part['rows']):
+            return False
+        csv_file = part['file']
+        csv_path = self.partition_path(part)
+        records = self.read_partition(part)
+        archive_file = file_stem(csv_file) + '.poscol'
+        archive_path = os.path.join(self.root, archive_file)
+        # Built under a private name without the lock (lzma is slow); another terminal
+        # may be compacting the same partition
+        temp_path = f"{archive_path}.{os.getpid()}.{threading.get_ident()}.part"
+        try:
+            size = write_records_archive(temp_path, records, codec,
+                                         meta={'kind': 'sales', 'month': part['month']})
+            if ColumnarFile(temp_path).rows('sales') != len(records):
+                raise ValueError(f"Archive of {csv_file} does not match its partition")
+            csv_bytes = os.path.getsize(csv_path)
+            with self.transaction():
+                current = self.find_file(csv_file)
+                if (current is None or current['state'] != 'closed' or current.get('format') == 'columnar'
+                        or current['rows'] != len(records)):
+                    return False
+                if size >= csv_bytes:
+                    current['compact_skipped'] = len(records)
+                    part.update(current)
+                    self.save_manifest()
+                    return False
+                if os.path.exists(archive_path):
+                    os.chmod(archive_path, stat.S_IREAD | stat.S_IWRITE)  # left over from an interrupted run
+                os.replace(temp_path, archive_path)
+                os.chmod(archive_path, READ_ONLY)
+                current.update({'file': archive_file, 'csv_file': csv_file, 'format': 'columnar',
+                                'codec': codec, 'bytes': size, 'csv_bytes': csv_bytes})
+                part.update(current)
+                self.save_manifest()
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        self.remove_file(csv_path)
+        return True
+
+    def remove_file(self, path):
+        try:
+            os.chmod(path, stat.S_IREAD | stat.S_IWRITE)
+            os.remove(path)
+        except OSError as e:
+            # e.g. Windows refuses while a report is still reading it; retried next time
+            print(f"Could not remove {path}: {e}")
+
+    def compact_closed(self, codec=COLD_CODEC):
+        """Compacts every closed CSV partition. Safe to run on a background thread."""
+        for part in self.partitions():
+            if part['state'] != 'closed':
+                continue
+            if part.get('format') == 'columnar':
+                # The CSV an interrupted compaction left behind, unless a partition uses that name
+                leftover_file = part.get('csv_file', f"sales-{part['month']}.csv")
+                leftover = os.path.join(self.root, leftover_file)
+                with self.transaction():
+                    in_use = any(p['file'] == leftover_file for p in self.manifest['partitions'])
+                if not in_use and os.path.exists(leftover):
+                    self.remove_file(leftover)
+                continue
+            try:
+                if self.compact_partition(part, codec):
+                    print(f"Archived {part['csv_file']}: {part['csv_bytes']:,} -> {part['bytes']:,} bytes")
+            except Exception as e:
+                print(f"Error archiving sales for {part['month']}: {e}")
+
+
+# Shared by checkout, reports and the maintenance scripts
+sales_store = SalesStore()
+
+
+if __name__ == '__main__':
+    # Run from the data directory: python sales_store.py
+    sales_store.ensure()
+    sales_store.compact_closed()
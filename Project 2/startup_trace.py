@@ -0,0 +1,163 @@
+"""Opt-in startup timeline for main.py.
+
+Run `python main.py --trace-startup[=FILE]` (or set POS_TRACE_STARTUP=FILE) to record
+module imports, data-file setup, page construction and the initial CSV loads. The
+timeline is written as Chrome trace-event JSON (open it in chrome://tracing or
+https://ui.perfetto.dev) with a flat "spans" summary alongside.
+
+When tracing is off every hook is a no-op, so the calls can stay in the code.
+"""
+import atexit
+import builtins
+import json
+import os
+import sys
+import threading
+import time
+
+DEFAULT_TRACE_FILE = 'startup_trace.json'
+ENV_VAR = 'POS_TRACE_STARTUP'
+# Imports faster than this are left out to keep the timeline readable
+MIN_IMPORT_MS = 0.1
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _Span:
+    def __init__(self, trace, name, category, args):
+        self.trace = trace
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.trace.record(self.name, self.category, self.start, time.perf_counter(), self.args)
+        return False
+
+
+class StartupTrace:
+    def __init__(self):
+        self.enabled = False
+        self.path = None
+        self.origin = time.perf_counter()
+        self.events = []
+        self.original_import = None
+
+    def enable(self, path=DEFAULT_TRACE_FILE):
+        if self.enabled:
+            return
+        self.enabled = True
+        self.path = path
+        self.origin = time.perf_counter()
+        self.install_import_hook()
+        atexit.register(self.finish)
+
+    def enable_from_argv(self, argv):
+        """Turns tracing on for --trace-startup[=FILE] or the POS_TRACE_STARTUP variable."""
+        for arg in argv[1:]:
+            if arg == '--trace-startup':
+                self.enable()
+                return
+            if arg.startswith('--trace-startup='):
+                self.enable(arg.split('=', 1)[1] or DEFAULT_TRACE_FILE)
+                return
+        if os.environ.get(ENV_VAR):
+            self.enable(os.environ[ENV_VAR])
+
+    # --- Recording ---
+
+    def record(self, name, category, start, end, args=None):
+        if not self.enabled:
+            return
+        event = {
+            'name': name,
+            'cat': category,
+            'ph': 'X',
+            'ts': round((start - self.origin) * 1e6, 1),
+            'dur': round((end - start) * 1e6, 1),
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+        }
+        if args:
+            event['args'] = args
+        self.events.append(event)  # list.append is atomic, so worker threads can record too
+
+    def span(self, name, category='app', **args):
+        """Context manager timing a block: `with trace.span('load products', 'csv'):`"""
+        if not self.enabled:
+            return _NullSpan()
+        return _Span(self, name, category, args)
+
+    def mark(self, name, category='milestone'):
+        """Records an instant event such as 'login shown' or 'ready'."""
+        if not self.enabled:
+            return
+        self.events.append({
+            'name': name, 'cat': category, 'ph': 'i', 's': 'g',
+            'ts': round((time.perf_counter() - self.origin) * 1e6, 1),
+            'pid': os.getpid(), 'tid': threading.get_ident(),
+        })
+
+    def install_import_hook(self):
+        """Times the first import of every module by wrapping builtins.__import__."""
+        if self.original_import is not None:
+            return
+        original = self.original_import = builtins.__import__
+        trace = self
+
+        def traced_import(name, globals=None, locals=None, fromlist=(), level=0):
+            if level or name in sys.modules:
+                return original(name, globals, locals, fromlist, level)
+            start = time.perf_counter()
+            try:
+                return original(name, globals, locals, fromlist, level)
+            finally:
+                end = time.perf_counter()
+                if (end - start) * 1000 >= MIN_IMPORT_MS:
+                    trace.record(f"import {name}", 'import', start, end)
+
+        builtins.__import__ = traced_import
+
+    def remove_import_hook(self):
+        if self.original_import is not None:
+            builtins.__import__ = self.original_import
+            self.original_import = None
+
+    # --- Output ---
+
+    def finish(self):
+        """Stops recording and writes the timeline. Safe to call more than once."""
+        if not self.enabled:
+            return
+        self.remove_import_hook()
+        self.enabled = False
+        spans = sorted((e for e in self.events if e['ph'] == 'X'), key=lambda e: e['ts'])
+        report = {
+            'traceEvents': self.events,
+            'displayTimeUnit': 'ms',
+            'spans': [
+                {'name': e['name'], 'category': e['cat'],
+                 'start_ms': round(e['ts'] / 1000, 3), 'duration_ms': round(e['dur'] / 1000, 3)}
+                for e in spans
+            ],
+            'total_ms': round((time.perf_counter() - self.origin) * 1000, 3),
+        }
+        try:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=1)
+            print(f"Startup trace written to {self.path}")
+        except Exception as e:
+            print(f"Error writing startup trace {self.path}: {e}")
+
+
+trace = StartupTrace()
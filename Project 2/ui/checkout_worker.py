@@ -0,0 +1,33 @@
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from checkout import checkout_service
+
+
+# --- BACKGROUND COMMITTER (checkout writer -> GUI signals) ---
+class CheckoutCommitter(QObject):
+    """Hands sales to the checkout writer thread and reports back through signals.
+
+    The writer calls back on its own thread; emitting from there queues the signal
+    onto the GUI thread, so slots can touch widgets."""
+    sale_journaled = pyqtSignal(str, object)  # txn, sale object passed to submit
+    sale_committed = pyqtSignal(str)          # txn; sales and stock files are written
+    sale_failed = pyqtSignal(str, str)        # txn, error
+
+    def __init__(self, service=None, parent=None):
+        super().__init__(parent)
+        self.service = service or checkout_service
+
+    def submit(self, sale, lines):
+        """Queues sale (a models.Sale) with its [(product_id, quantity)] lines. Returns the txn."""
+        pending = self.service.submit(
+            sale.to_dict(), lines,
+            on_journaled=lambda p: self.sale_journaled.emit(p.txn, sale),
+            on_done=self.on_done,
+        )
+        return pending.txn
+
+    def on_done(self, pending):
+        if pending.error is None:
+            self.sale_committed.emit(pending.txn)
+        else:
+            self.sale_failed.emit(pending.txn, str(pending.error))
@@ -0,0 +1,56 @@
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from columnar import WriteCancelled, write_sales_archive
+from exporter import ExportCancelled, write_chunked
+
+
+# --- WORKER THREAD (chunked CSV export) ---
+class ExportThread(QThread):
+    """Runs exporter.write_chunked off the GUI thread. Cancel with requestInterruption()."""
+    progress = pyqtSignal(int, int)       # records written, total
+    export_finished = pyqtSignal(str, int)  # path, records written
+    export_cancelled = pyqtSignal()
+    export_failed = pyqtSignal(str)
+
+    def __init__(self, path, header, records, to_rows, total, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.header = header
+        self.records = records
+        self.to_rows = to_rows
+        self.total = total
+
+    def run(self):
+        try:
+            written = write_chunked(self.path, self.header, self.records, self.to_rows, self.total,
+                                    progress=self.progress.emit, cancelled=self.isInterruptionRequested)
+            self.export_finished.emit(self.path, written)
+        except ExportCancelled:
+            self.export_cancelled.emit()
+        except Exception as e:
+            print(f"Export error: {e}")
+            self.export_failed.emit(str(e))
+
+
+class ArchiveExportThread(ExportThread):
+    """Writes sales to a columnar archive (columnar.write_sales_archive) off the GUI thread."""
+    def __init__(self, path, sales, codec='zlib', parent=None):
+        super().__init__(path, None, sales, None, len(sales), parent)
+        self.codec = codec
+
+    def run(self):
+        try:
+            self.progress.emit(0, self.total)
+            # Progress is per compressed column, scaled to the record count
+            write_sales_archive(self.path, self.records, self.codec,
+                                meta={'kind': 'sales', 'source': 'reports export'},
+                                progress=lambda done, columns: self.progress.emit(self.total * done // columns,
+                                                                                  self.total),
+                                cancelled=self.isInterruptionRequested)
+            self.progress.emit(self.total, self.total)
+            self.export_finished.emit(self.path, self.total)
+        except WriteCancelled:
+            self.export_cancelled.emit()
+        except Exception as e:
+            print(f"Archive export error: {e}")
+            self.export_failed.emit(str(e))
@@ -8,7 +8,8 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QColor, QFont, QCursor
 
-from csv_handler import CSVHandler
+from catalog import add_product_row, delete_product_row, update_product_row
+from catalog_snapshot import CatalogSnapshot
 from models import Product
 
 # --- CONFIGURATION & STYLES ---
@@ -325,8 +326,7 @@ class InventoryWindow(QWidget):
 
     def load_inventory(self):
         try:
-            data = CSVHandler.read_csv('products.csv')
-            self.products = [Product.from_dict(p) for p in data]
+            self.products = CatalogSnapshot.load_store('products.csv').rows()
             self.filter_products()
         except Exception as e:
             # Handle empty file or first run gracefully
@@ -417,7 +417,7 @@ class InventoryWindow(QWidget):
         d = ProductFormDialog(self)
         if d.exec_() == QDialog.Accepted:
             try:
-                CSVHandler.append_csv('products.csv', d.get_product().to_dict())
+                add_product_row(d.get_product().to_dict())
                 self.load_inventory()
                 self.show_toast("Success", "Product added.")
             except Exception as e:
@@ -427,7 +427,7 @@ class InventoryWindow(QWidget):
         d = ProductFormDialog(self, p)
         if d.exec_() == QDialog.Accepted:
             try:
-                CSVHandler.update_csv('products.csv', 'product_id', p.product_id, d.get_product().to_dict())
+                update_product_row(p.product_id, d.get_product().to_dict(), p.stock)
                 self.load_inventory()
             except Exception as e:
                 QMessageBox.critical(self, "Error", str(e))
@@ -438,10 +438,8 @@ class InventoryWindow(QWidget):
                                      QMessageBox.Yes | QMessageBox.No)
         if confirm == QMessageBox.Yes:
             try:
-                CSVHandler.delete_row('products.csv', 'product_id', p.product_id)
+                delete_product_row(p.product_id)
                 self.load_inventory()
-            except AttributeError:
-                QMessageBox.critical(self, "Error", "CSVHandler is missing 'delete_row' method.")
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Failed to delete: {e}")
 
@@ -1,10 +1,48 @@
 # login_window.py (updated)
-from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QLabel, 
-                             QLineEdit, QPushButton, QMessageBox, QFrame)
-from PyQt5.QtCore import Qt
+import threading
+
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
+                             QLineEdit, QPushButton, QMessageBox, QFrame, QDialog)
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from PyQt5.QtGui import QFont, QIcon
-from csv_handler import CSVHandler
-from models import User
+from passwords import verify_password, needs_rehash, dummy_hash
+from user_directory import user_directory
+
+class PasswordCheckThread(QThread):
+    """Looks the user up and verifies the password off the GUI thread (PBKDF2 is
+    deliberately slow, and so is creating the default users on first start)"""
+    verified = pyqtSignal(object, bool)  # active user or None, password ok
+
+    def __init__(self, username, password, parent=None):
+        super().__init__(parent)
+        self.username = username
+        self.password = password
+
+    def run(self):
+        user, ok = None, False
+        try:
+            user_directory.ensure_defaults()
+            user, stored_hash = lookup_login(self.username)
+            ok = verify_password(self.password, stored_hash)
+        except Exception as e:
+            print(f"Password check error: {e}")
+        self.verified.emit(user, ok)
+
+def lookup_login(username):
+    """Returns (active user or None, hash to check the password against)"""
+    user = user_directory.get(username)
+    if user is not None and not user.active:
+        user = None
+    # Unknown users are still checked (against a dummy hash) so both failures take as long
+    return user, (user.password if user is not None else dummy_hash())
+
+def prepare_login():
+    """Creates the default users and the dummy hash before the first attempt needs them"""
+    try:
+        user_directory.ensure_defaults()
+        dummy_hash()
+    except Exception as e:
+        print(f"Error preparing login: {e}")
 
 class LoginWindow(QWidget):
     def __init__(self, on_login_success):
@@ -119,7 +157,7 @@ class LoginWindow(QWidget):
         main_layout.addSpacing(30)
         
         # Login button
-        login_btn = QPushButton('Sign In')
+        self.login_btn = login_btn = QPushButton('Sign In')
         login_btn.setMinimumHeight(50)
         login_btn.setStyleSheet("""
             QPushButton {
@@ -147,28 +185,8 @@ class LoginWindow(QWidget):
         main_layout.addStretch(1)
     
     def load_users(self):
-        """Create default users if none exist"""
-        users = CSVHandler.read_csv('users.csv')
-        if not users:
-            # Create default admin user
-            admin_user = User(
-                user_id='1',
-                username='admin',
-                password='admin123', 
-                role='Admin',
-                active=True
-            )
-            CSVHandler.append_csv('users.csv', admin_user.to_dict())
-            
-            # Create default cashier user
-            cashier_user = User(
-                user_id='2',
-                username='cashier', 
-                password='cashier123',
-                role='Cashier',
-                active=True
-            )
-            CSVHandler.append_csv('users.csv', cashier_user.to_dict())
+        """Create default users if none exist (hashing runs on a background thread)"""
+        threading.Thread(target=prepare_login, daemon=True).start()
     
     def attempt_login(self):
         """Handle login attempt"""
@@ -180,20 +198,119 @@ class LoginWindow(QWidget):
                                'Please enter both username and password.')
             return
         
-        users = CSVHandler.read_csv('users.csv')
-        for user_data in users:
-            try:
-                user = User.from_dict(user_data)
-                if (user.username == username and 
-                    user.password == password and 
-                    user.active):
-                    self.on_login_success(user)
-                    return
-            except Exception as e:
-                print(f"Error parsing user: {e}")
-                continue
+        self.login_btn.setEnabled(False)
+        self.login_btn.setText('Signing In...')
+        self.check_thread = PasswordCheckThread(username, password, self)
+        self.check_thread.finished.connect(self.check_thread.deleteLater)
+        self.check_thread.verified.connect(lambda user, ok: self.on_password_checked(user, password, ok))
+        self.check_thread.start()
+    
+    def on_password_checked(self, user, password, ok):
+        """Finish a login attempt once the background check is done"""
+        self.login_btn.setEnabled(True)
+        self.login_btn.setText('Sign In')
+        if ok and user is not None:
+            if needs_rehash(user.password):
+                user_directory.upgrade_password(user, password)
+            self.on_login_success(user)
+            return
         
         QMessageBox.warning(self, 'Login Error', 
                            'Invalid username or password.')
         self.password_input.clear()
-        self.password_input.setFocus()
\ No newline at end of file
+        self.password_input.setFocus()
+
+class QuickSwitchDialog(QDialog):
+    """Cashier handover: scan a badge (or type a username), then enter the PIN/password"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.user = None
+        self.check_thread = None
+        # Opened on every handover; exec_() deletes it once it returns
+        self.setAttribute(Qt.WA_DeleteOnClose)
+        self.setWindowTitle('Switch User')
+        self.setFixedWidth(340)
+        self.setStyleSheet("""
+            QDialog { background-color: #ffffff; }
+            QLabel { font-weight: bold; color: #475569; font-size: 13px; }
+            QLineEdit { padding: 8px; border: 1px solid #cbd5e1; border-radius: 4px; font-size: 14px; }
+            QLineEdit:focus { border: 1px solid #2563eb; }
+        """)
+        self.init_ui()
+    
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(25, 25, 25, 25)
+        layout.setSpacing(12)
+        
+        title = QLabel('Switch User')
+        title.setFont(QFont('Segoe UI', 16, QFont.Bold))
+        title.setStyleSheet("color: #1e293b;")
+        layout.addWidget(title)
+        
+        # Badge scanners type the username and press Enter, which moves on to the PIN
+        layout.addWidget(QLabel('Badge / Username:'))
+        self.username_input = QLineEdit()
+        self.username_input.setPlaceholderText('Scan badge or enter username')
+        self.username_input.returnPressed.connect(lambda: self.pin_input.setFocus())
+        layout.addWidget(self.username_input)
+        
+        layout.addWidget(QLabel('PIN / Password:'))
+        self.pin_input = QLineEdit()
+        self.pin_input.setEchoMode(QLineEdit.Password)
+        self.pin_input.returnPressed.connect(self.attempt_switch)
+        layout.addWidget(self.pin_input)
+        
+        btn_box = QHBoxLayout()
+        btn_box.addStretch()
+        cancel_btn = QPushButton('Cancel')
+        cancel_btn.setCursor(Qt.PointingHandCursor)
+        cancel_btn.clicked.connect(self.reject)
+        cancel_btn.setStyleSheet("background: white; border: 1px solid #cbd5e1; padding: 6px 14px; border-radius: 4px; color: #475569;")
+        
+        self.switch_btn = QPushButton('Switch')
+        self.switch_btn.setCursor(Qt.PointingHandCursor)
+        self.switch_btn.clicked.connect(self.attempt_switch)
+        self.switch_btn.setStyleSheet("background: #2563eb; color: white; border: none; padding: 6px 14px; border-radius: 4px; font-weight: bold;")
+        
+        btn_box.addWidget(cancel_btn)
+        btn_box.addWidget(self.switch_btn)
+        layout.addLayout(btn_box)
+        self.username_input.setFocus()
+    
+    def attempt_switch(self):
+        username = self.username_input.text().strip()
+        password = self.pin_input.text()
+        if not username or not password:
+            return
+        # A scanner's Enter can arrive while the previous check is still running
+        if self.check_thread is not None and self.check_thread.isRunning():
+            return
+        
+        self.set_inputs_enabled(False)
+        self.check_thread = PasswordCheckThread(username, password, self)
+        self.check_thread.verified.connect(lambda user, ok: self.on_password_checked(user, password, ok))
+        self.check_thread.start()
+    
+    def set_inputs_enabled(self, enabled):
+        for widget in (self.username_input, self.pin_input, self.switch_btn):
+            widget.setEnabled(enabled)
+    
+    def done(self, result):
+        # The check thread is our child; it must not be destroyed while running
+        if self.check_thread is not None:
+            self.check_thread.wait()
+        super().done(result)
+    
+    def on_password_checked(self, user, password, ok):
+        self.set_inputs_enabled(True)
+        if ok and user is not None:
+            if needs_rehash(user.password):
+                user_directory.upgrade_password(user, password)
+            self.user = user
+            self.accept()
+            return
+        QMessageBox.warning(self, 'Switch User', 'Invalid badge/username or PIN.')
+        self.pin_input.clear()
+        self.username_input.selectAll()
+        self.username_input.setFocus()
@@ -1,18 +1,19 @@
-import csv
 import uuid
-import os
 import shutil
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                              QLineEdit, QPushButton, QTableWidget, QTableWidgetItem,
                              QHeaderView, QMessageBox, QDialog, QDialogButtonBox,
                              QComboBox, QDoubleSpinBox, QSpinBox, QCheckBox, QFrame,
                              QScrollArea, QSplitter, QFormLayout, QMenu, QAbstractItemView, 
-                             QFileDialog, QSizePolicy, QStyle, QGraphicsDropShadowEffect)
+                             QFileDialog, QSizePolicy, QStyle, QGraphicsDropShadowEffect, QProgressBar)
 from PyQt5.QtCore import Qt, QSize, QTimer, QRegExp
 from PyQt5.QtGui import QFont, QIcon, QColor, QRegExpValidator
 
-from csv_handler import CSVHandler
+from catalog import ProductStore, add_product_row, delete_product_row, update_product_row
+from catalog_snapshot import CatalogSnapshot
 from models import Product
+from exporter import PRODUCT_HEADER, product_rows
+from ui.export_worker import ExportThread
 
 # --- CONFIGURATION (Matches Inventory Window) ---
 PRIMARY_COLOR = "#2563eb"  # Blue
@@ -101,6 +102,8 @@ class ProductsWindow(QWidget):
     def __init__(self):
         super().__init__()
         self.products = []
+        self.filtered = []
+        self.store = ProductStore()
         self.setObjectName("products_window")
         self.setStyleSheet(STYLESHEET)
         
@@ -202,14 +205,26 @@ class ProductsWindow(QWidget):
         self.delete_btn.clicked.connect(self.delete_product)
         style_btn(self.delete_btn, DANGER_COLOR)
         
-        export_btn = QPushButton(' Export')
-        export_btn.setIcon(icon_save)
-        export_btn.clicked.connect(self.export_data)
-        style_btn(export_btn, "#0f766e") # Teal
+        self.export_btn = QPushButton(' Export')
+        self.export_btn.setIcon(icon_save)
+        self.export_btn.clicked.connect(self.export_data)
+        style_btn(self.export_btn, "#0f766e") # Teal
+        
+        # Export progress (shown while an export runs)
+        self.export_progress = QProgressBar()
+        self.export_progress.setFixedWidth(160)
+        self.export_progress.hide()
+        self.cancel_export_btn = QPushButton('Cancel')
+        self.cancel_export_btn.clicked.connect(self.cancel_export)
+        style_btn(self.cancel_export_btn, DANGER_COLOR)
+        self.cancel_export_btn.hide()
+        self.export_thread = None
         
         toolbar.addWidget(add_btn)
         toolbar.addWidget(self.delete_btn)
-        toolbar.addWidget(export_btn)
+        toolbar.addWidget(self.export_btn)
+        toolbar.addWidget(self.export_progress)
+        toolbar.addWidget(self.cancel_export_btn)
         
         layout.addLayout(toolbar)
         return widget
@@ -276,12 +291,12 @@ class ProductsWindow(QWidget):
 
     def load_products(self):
         try:
-            raw_data = CSVHandler.read_csv('products.csv')
-            self.products = [Product.from_dict(p) for p in raw_data]
+            self.store = CatalogSnapshot.load_store('products.csv')
+            self.products = self.store.rows()
             
-            # Populate Category Filter
+            # Populate Category Filter (straight from the store's intern table)
             current_cat = self.cat_filter.currentText()
-            categories = sorted(list(set(p.category for p in self.products if p.category)))
+            categories = self.store.category_names()
             self.cat_filter.blockSignals(True)
             self.cat_filter.clear()
             self.cat_filter.addItem("All Categories")
@@ -297,36 +312,13 @@ class ProductsWindow(QWidget):
             self.products = []
             self.execute_filter()
 
-    def save_all_products(self):
-        temp_file = 'products_temp.csv'
-        final_file = 'products.csv'
-        
+    def save_product_change(self, write, *args):
+        """Runs one of catalog's locked products.csv edits, then reloads the page."""
         try:
-            data_to_save = []
-            for p in self.products:
-                data_to_save.append({
-                    'product_id': p.product_id,
-                    'name': p.name,
-                    'category': p.category,
-                    'price': str(p.price),
-                    'cost': str(getattr(p, 'cost', 0.0)),
-                    'stock': str(p.stock),
-                    'barcode': getattr(p, 'barcode', ''),
-                    'discount_eligibility': str(getattr(p, 'discount_eligibility', True)),
-                    'active': str(p.active)
-                })
-            
-            CSVHandler.write_csv(temp_file, data_to_save)
-            
-            if os.path.exists(final_file):
-                os.remove(final_file)
-            os.rename(temp_file, final_file)
-            
-            self.load_products()
+            write(*args)
         except Exception as e:
             QMessageBox.critical(self, "Save Error", f"Failed to save data safely.\nError: {str(e)}")
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
+        self.load_products()
 
     def on_search_text_changed(self):
         self.search_timer.start()
@@ -355,6 +347,7 @@ class ProductsWindow(QWidget):
             if match_search and match_cat and match_status:
                 filtered.append(p)
         
+        self.filtered = filtered
         self.update_table(filtered)
         self.stats_label.setText(f"Showing {len(filtered)} of {len(self.products)} products")
 
@@ -428,8 +421,7 @@ class ProductsWindow(QWidget):
         dialog = ProductDialog(self, all_products=self.products)
         if dialog.exec_() == QDialog.Accepted:
             new_prod = dialog.get_product_object()
-            self.products.append(new_prod)
-            self.save_all_products()
+            self.save_product_change(add_product_row, new_prod.to_dict())
 
     def edit_selected_product(self):
         rows = self.products_table.selectionModel().selectedRows()
@@ -444,9 +436,7 @@ class ProductsWindow(QWidget):
             dialog = ProductDialog(self, product=product, all_products=self.products)
             if dialog.exec_() == QDialog.Accepted:
                 updated_prod = dialog.get_product_object()
-                idx = self.products.index(product)
-                self.products[idx] = updated_prod
-                self.save_all_products()
+                self.save_product_change(update_product_row, product.product_id, updated_prod.to_dict(), product.stock)
 
     def delete_product(self):
         rows = self.products_table.selectionModel().selectedRows()
@@ -465,30 +455,49 @@ class ProductsWindow(QWidget):
         )
         
         if confirm == QMessageBox.Yes:
-            self.products = [p for p in self.products if str(p.product_id) != prod_id]
-            self.save_all_products()
+            self.save_product_change(delete_product_row, prod_id)
 
     def export_data(self):
+        """Exports the products matching the current filters on a worker thread."""
+        if self.export_thread is not None and self.export_thread.isRunning():
+            return
         path, _ = QFileDialog.getSaveFileName(self, "Export CSV", "inventory_export.csv", "CSV Files (*.csv)")
-        if path:
-            try:
-                with open(path, 'w', newline='', encoding='utf-8') as f:
-                    writer = csv.writer(f)
-                    headers = ['ID', 'Name', 'Category', 'Price', 'Cost', 'Margin %', 'Stock', 'Barcode', 'Status']
-                    writer.writerow(headers)
-                    for p in self.products:
-                        cost = getattr(p, 'cost', 0.0)
-                        margin = 0
-                        if p.price > 0: 
-                            margin = ((p.price - cost) / p.price) * 100
-                        writer.writerow([
-                            p.product_id, p.name, p.category, 
-                            f"{p.price:.2f}", f"{cost:.2f}", f"{margin:.1f}%",
-                            p.stock, getattr(p, 'barcode', ''), "Active" if p.active else "Inactive"
-                        ])
-                QMessageBox.information(self, "Success", "Export successful!")
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Export failed: {str(e)}")
+        if not path:
+            return
+        products = list(self.filtered)
+        self.export_thread = ExportThread(path, PRODUCT_HEADER, products, product_rows, len(products), self)
+        self.export_thread.progress.connect(lambda done, total: self.export_progress.setValue(done))
+        self.export_thread.export_finished.connect(self.on_export_finished)
+        self.export_thread.export_cancelled.connect(self.on_export_cancelled)
+        self.export_thread.export_failed.connect(self.on_export_failed)
+        
+        self.export_progress.setRange(0, max(1, len(products)))
+        self.export_progress.setValue(0)
+        self.export_progress.show()
+        self.cancel_export_btn.show()
+        self.export_btn.setEnabled(False)
+        self.export_thread.start()
+
+    def cancel_export(self):
+        if self.export_thread is not None:
+            self.export_thread.requestInterruption()
+
+    def end_export(self):
+        self.export_progress.hide()
+        self.cancel_export_btn.hide()
+        self.export_btn.setEnabled(True)
+
+    def on_export_finished(self, path, count):
+        self.end_export()
+        QMessageBox.information(self, "Success", f"Exported {count} products to {path}")
+
+    def on_export_cancelled(self):
+        self.end_export()
+        QMessageBox.information(self, "Cancelled", "Export cancelled; no file was written.")
+
+    def on_export_failed(self, msg):
+        self.end_export()
+        QMessageBox.critical(self, "Error", f"Export failed: {msg}")
 
     def open_context_menu(self, position):
         menu = QMenu()
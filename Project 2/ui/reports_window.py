@@ -1,8 +1,6 @@
 import sys
-import csv
 import json
 from datetime import datetime, timedelta
-from collections import defaultdict
 
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                              QPushButton, QTableWidget, QTableWidgetItem,
@@ -10,7 +8,15 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
                              QDateEdit, QComboBox, QGraphicsDropShadowEffect,
                              QScrollArea, QGridLayout, QProgressBar, QSizePolicy)
 from PyQt5.QtCore import Qt, QDate, QThread, pyqtSignal, QSize, QPointF
-from PyQt5.QtGui import QFont, QColor, QPainter, QPen, QBrush, QLinearGradient
+from PyQt5.QtGui import QFont, QColor, QPainter, QPen, QBrush, QLinearGradient, QPainterPath, QPixmap
+
+from analytics import CategoryJoin, SalesIndex, SalesRankings, parse_timestamp, write_series_csv
+from catalog_snapshot import CatalogSnapshot
+from exporter import SALE_HEADER, sale_rows
+from sales_store import sales_store
+from startup_trace import trace
+from user_directory import user_directory
+from ui.export_worker import ArchiveExportThread, ExportThread
 
 # --- STYLING CONSTANTS ---
 PRIMARY = "#2563eb"
@@ -40,6 +46,12 @@ STYLESHEET = f"""
     QHeaderView::section {{ background-color: #f8fafc; border: none; font-weight: bold; padding: 6px; }}
 """
 
+TOP_K = 5
+# Above this many sales in range the rankings switch to count-min sketch estimates
+APPROXIMATE_TOP_K_SALES = 250_000
+
+GRANULARITY_OPTIONS = [("Hourly", 'hour'), ("Daily", 'day'), ("Weekly", 'week'), ("Monthly", 'month')]
+
 # --- SIMPLE SALE CLASS (with corrected column mapping) ---
 class SimpleSale:
     def __init__(self, sale_id, date, time, items_data, total, tax, discount, payment_method, cashier_id):
@@ -47,9 +59,12 @@ class SimpleSale:
         self.date = date
         self.time = time
         
-        # Parse items_data from JSON string
+        # Parse items_data from JSON string (archived partitions already give a list)
         try:
-            self.items = json.loads(items_data) if items_data else []
+            if isinstance(items_data, list):
+                self.items = items_data
+            else:
+                self.items = json.loads(items_data) if items_data else []
         except (json.JSONDecodeError, TypeError):
             self.items = []
         
@@ -74,97 +89,82 @@ class SimpleSale:
         
         # Combine date and time for full timestamp
         self.full_date = f"{date} {time}" if date and time else date
+        # [(category, revenue)] for this sale, filled in by ReportLoaderThread
+        self.category_lines = None
 
     @classmethod
     def from_dict(cls, data):
-        # Debug: print what we're receiving
-        print(f"DEBUG: Raw data keys: {list(data.keys())}")
-        
-        # Try to map columns correctly based on the actual CSV structure
-        # From your debug output, it seems the columns are mismatched
+        # Records come from sales_store, already in Sale.to_dict column order
         return cls(
             sale_id=data.get('sale_id', ''),
             date=data.get('date', ''),
             time=data.get('time', ''),
-            items_data=data.get('total', '[]'),  # items_data seems to be in the 'total' column
-            total=data.get('tax', 0.0),          # total seems to be in the 'tax' column  
-            tax=data.get('discount', 0.0),       # tax seems to be in the 'discount' column
-            discount=data.get('payment_method', 0.0),  # discount seems to be in 'payment_method'
-            payment_method=data.get('cashier_id', ''), # payment_method seems to be in 'cashier_id'
-            cashier_id=data.get('items_data', '')      # cashier_id seems to be in 'items_data'
+            items_data=data.get('items_data', '[]'),
+            total=data.get('total', 0.0),
+            tax=data.get('tax', 0.0),
+            discount=data.get('discount', 0.0),
+            payment_method=data.get('payment_method', ''),
+            cashier_id=data.get('cashier_id', '')
         )
 
-# --- SIMPLE CSV HANDLER ---
-class SimpleCSVHandler:
-    @staticmethod
-    def read_csv(filename):
-        try:
-            with open(filename, 'r', newline='', encoding='utf-8') as file:
-                reader = csv.DictReader(file)
-                data = list(reader)
-                
-                # Debug: print first record to understand structure
-                if data:
-                    first_record = data[0]
-                    print(f"DEBUG: First record structure:")
-                    for key, value in first_record.items():
-                        print(f"  {key}: {value[:100]}{'...' if len(str(value)) > 100 else ''}")
-                
-                return data
-        except FileNotFoundError:
-            print(f"DEBUG: File {filename} not found")
-            return []
-        except Exception as e:
-            print(f"DEBUG: Error reading CSV: {e}")
-            return []
-
 # --- WORKER THREAD (Prevents UI Freezing) ---
 class ReportLoaderThread(QThread):
-    data_loaded = pyqtSignal(list)
+    data_loaded = pyqtSignal(object, list)  # SalesIndex, ids of sales rejected for a bad date
     error_occurred = pyqtSignal(str)
 
+    def __init__(self, start=None, end=None):
+        super().__init__()
+        # Only the monthly partitions overlapping [start, end) are read
+        self.start = start
+        self.end = end
+
     def run(self):
         try:
-            raw_data = SimpleCSVHandler.read_csv('sales.csv')
-            print(f"DEBUG: Loaded {len(raw_data)} raw records from CSV")
+            start_date = self.start.strftime('%Y-%m-%d') if self.start else None
+            end_date = self.end.strftime('%Y-%m-%d') if self.end else None
+            with trace.span("read sales partitions (reports)", 'csv'):
+                parts = sales_store.partitions_for(start_date, end_date)
+                raw_data = [record for part in parts for record in sales_store.read_partition(part)]
+            print(f"DEBUG: Loaded {len(raw_data)} raw records from {len(parts)} partition(s)")
             
-            sales = []
+            # Line items are joined to catalog categories once, here, not on every filter change
+            join = CategoryJoin(CatalogSnapshot.load_store('products.csv'))
+            
+            # Parse each timestamp once; sales without a usable date are rejected here
+            # rather than being filed under "now"
+            dated = []
+            rejected = []
             for record in raw_data:
                 try:
                     sale = SimpleSale.from_dict(record)
-                    sales.append(sale)
-                    print(f"DEBUG: Processed sale {sale.sale_id}: total={sale.total}, items={len(sale.items)}")
                 except Exception as e:
                     print(f"DEBUG: Error processing record: {e}")
                     continue
+                timestamp = parse_timestamp(sale.full_date or sale.date)
+                if timestamp is None:
+                    rejected.append(sale.sale_id)
+                    continue
+                join.fill(sale)
+                sale.category_lines = join.line_totals(sale)
+                dated.append((timestamp, sale))
             
-            # Sort by date descending
-            sales.sort(key=lambda x: self.parse_date(x.full_date or x.date), reverse=True)
-            print(f"DEBUG: Processed {len(sales)} sales records")
+            # Date-sorted index for range filtering, totals and bucketed series
+            index = SalesIndex.build(dated)
+            print(f"DEBUG: Processed {len(index)} sales records")
+            if rejected:
+                sample = ", ".join(str(r) for r in rejected[:5])
+                more = f" (+{len(rejected) - 5} more)" if len(rejected) > 5 else ""
+                print(f"Sales history: {len(rejected)} sale(s) skipped, unreadable date: {sample}{more}")
             
-            self.data_loaded.emit(sales)
+            self.data_loaded.emit(index, rejected)
         except FileNotFoundError:
-            print("DEBUG: sales.csv file not found")
-            self.data_loaded.emit([])
+            print("DEBUG: sales partition file not found")
+            self.data_loaded.emit(SalesIndex(), [])
         except Exception as e:
             print(f"DEBUG: Error in ReportLoaderThread: {e}")
             import traceback
             traceback.print_exc()
             self.error_occurred.emit(str(e))
-    
-    def parse_date(self, date_str):
-        """Parse date string that could be either with or without time"""
-        try:
-            # Try format with time first
-            return datetime.strptime(date_str, '%Y-%m-%d %H:%M:%S')
-        except ValueError:
-            try:
-                # Try format without time
-                return datetime.strptime(date_str, '%Y-%m-%d')
-            except ValueError:
-                # If both fail, return current date as fallback
-                print(f"DEBUG: Could not parse date: {date_str}")
-                return datetime.now()
 
 # --- CUSTOM WIDGET: KPI CARD ---
 class KPICard(QFrame):
@@ -189,43 +189,147 @@ class KPICard(QFrame):
     def set_value(self, text):
         self.value_lbl.setText(text)
 
+# --- CHART HELPERS ---
+def decimate_min_max(values, columns):
+    """Reduce a series to at most ~2 points per pixel column.
+
+    Each column keeps its minimum and maximum (in index order), so spikes survive
+    and the drawn line looks the same as the full series. Returns [(index, value)]."""
+    n = len(values)
+    if columns <= 0 or n <= 2 * columns:
+        return list(enumerate(values))
+    out = []
+    per_column = n / columns
+    for c in range(columns):
+        start = int(c * per_column)
+        end = min(n, int((c + 1) * per_column))
+        if start >= end:
+            continue
+        chunk = values[start:end]
+        lo = start + chunk.index(min(chunk))
+        hi = start + chunk.index(max(chunk))
+        if lo == hi:
+            out.append((lo, values[lo]))
+        elif lo < hi:
+            out.append((lo, values[lo]))
+            out.append((hi, values[hi]))
+        else:
+            out.append((hi, values[hi]))
+            out.append((lo, values[lo]))
+    # Always keep the real endpoints so the line spans the full range
+    if out[0][0] != 0:
+        out.insert(0, (0, values[0]))
+    if out[-1][0] != n - 1:
+        out.append((n - 1, values[-1]))
+    return out
+
+# --- BASE: CACHED CHART ---
+class CachedChart(QWidget):
+    """Chart drawn once into an offscreen pixmap and blitted on every paint.
+
+    The pixmap is keyed on (data version, size, device pixel ratio), so scrolling the
+    dashboard or uncovering the widget costs one drawPixmap. Subclasses override
+    render_chart() and call invalidate() when their data changes."""
+    def __init__(self):
+        super().__init__()
+        self.data_version = 0
+        self.pixmap = None
+        self.pixmap_key = None
+
+    def invalidate(self):
+        self.data_version += 1
+        self.update()
+
+    def render_chart(self, painter, w, h):
+        """Draws the chart into the cache pixmap. The base chart is empty (abc can't be
+        mixed into a QWidget's metaclass, so this is a no-op rather than abstract)."""
+
+    def paintEvent(self, event):
+        w, h = self.width(), self.height()
+        dpr = self.devicePixelRatioF()
+        key = (self.data_version, w, h, dpr)
+        if key != self.pixmap_key:
+            pixmap = QPixmap(max(1, int(w * dpr)), max(1, int(h * dpr)))
+            pixmap.setDevicePixelRatio(dpr)
+            pixmap.fill(Qt.transparent)
+            chart_painter = QPainter(pixmap)
+            chart_painter.setRenderHint(QPainter.Antialiasing)
+            self.render_chart(chart_painter, w, h)
+            chart_painter.end()
+            self.pixmap = pixmap
+            self.pixmap_key = key
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, self.pixmap)
+
 # --- CUSTOM WIDGET: TREND CHART ---
-class TrendChart(QWidget):
+class TrendChart(CachedChart):
+    # Dots are only drawn when points are at least this many pixels apart
+    MIN_DOT_SPACING = 12
+
     def __init__(self):
         super().__init__()
         self.data_points = [] # List of (date_str, amount)
+        self.values = []
+        self.max_val = 1
+        self.path_cache_key = None
+        self.line_path = None
+        self.dots_path = None
         self.setMinimumHeight(200)
         self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
 
     def set_data(self, data):
         # Data should be a dict {date: total}
         self.data_points = sorted(data.items()) # Sort by date
+        self.values = [d[1] for d in self.data_points]
+        self.max_val = max(self.values) if self.values else 1
+        # Avoid division by zero
+        if self.max_val == 0:
+            self.max_val = 1
         print(f"DEBUG: TrendChart received {len(self.data_points)} data points")
-        self.update() # Trigger repaint
+        self.invalidate() # Trigger re-render
 
-    def paintEvent(self, event):
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing)
-        
-        w, h = self.width(), self.height()
+    def build_paths(self, w, h, padding):
+        """Decimated line (and dots, when sparse) for the current size; cached per (w, h, data)"""
+        key = (w, h, self.data_version)
+        if key == self.path_cache_key:
+            return
+        plot_w = w - 2 * padding
+        plot_h = h - 2 * padding
+        n = len(self.values)
+        x_step = plot_w / (n - 1)
+        points = decimate_min_max(self.values, max(1, int(plot_w)))
+        
+        line = QPainterPath()
+        for i, (idx, val) in enumerate(points):
+            # Invert Y (0 is top)
+            pt = QPointF(padding + idx * x_step, h - padding - (val / self.max_val) * plot_h)
+            if i == 0:
+                line.moveTo(pt)
+            else:
+                line.lineTo(pt)
+        
+        dots = None
+        if x_step >= self.MIN_DOT_SPACING:
+            dots = QPainterPath()
+            for idx, val in points:
+                dots.addEllipse(QPointF(padding + idx * x_step, h - padding - (val / self.max_val) * plot_h), 4, 4)
+        
+        self.line_path = line
+        self.dots_path = dots
+        self.path_cache_key = key
+
+    def render_chart(self, painter, w, h):
         padding = 30
         
         # Background
-        painter.fillRect(self.rect(), QColor(CARD_BG))
+        painter.fillRect(0, 0, w, h, QColor(CARD_BG))
         
         if not self.data_points:
             painter.setPen(QColor(SECONDARY))
-            painter.drawText(self.rect(), Qt.AlignCenter, "No Data Available for Range")
+            painter.drawText(0, 0, w, h, Qt.AlignCenter, "No Data Available for Range")
             return
 
-        # Scales
-        dates = [d[0] for d in self.data_points]
-        values = [d[1] for d in self.data_points]
-        max_val = max(values) if values else 100
-        
-        # Avoid division by zero
-        if max_val == 0:
-            max_val = 1
+        max_val = self.max_val
         
         # Draw Grid & Y-Axis
         painter.setPen(QPen(QColor("#f1f5f9"), 1, Qt.SolidLine))
@@ -240,51 +344,42 @@ class TrendChart(QWidget):
             painter.drawText(0, int(y) - 5, padding - 5, 10, Qt.AlignRight, val_label)
             painter.setPen(QPen(QColor("#f1f5f9"), 1, Qt.SolidLine)) # Reset pen
 
-        # Draw Line
+        # Draw Line (one path, however long the series)
         if len(self.data_points) > 1:
-            path_points = []
-            x_step = (w - 2 * padding) / (len(self.data_points) - 1)
-            
-            for i, val in enumerate(values):
-                x = padding + (i * x_step)
-                # Invert Y (0 is top)
-                y = h - padding - ((val / max_val) * (h - 2 * padding))
-                path_points.append(QPointF(x, y))
+            self.build_paths(w, h, padding)
             
             # Draw Thick Line
             pen = QPen(QColor(CHART_LINE))
             pen.setWidth(3)
             painter.setPen(pen)
-            for i in range(len(path_points) - 1):
-                painter.drawLine(path_points[i], path_points[i+1])
+            painter.setBrush(Qt.NoBrush)
+            painter.drawPath(self.line_path)
                 
             # Draw Dots
-            painter.setBrush(QBrush(QColor(PRIMARY)))
-            painter.setPen(Qt.NoPen)
-            for p in path_points:
-                painter.drawEllipse(p, 4, 4)
+            if self.dots_path is not None:
+                painter.setBrush(QBrush(QColor(PRIMARY)))
+                painter.setPen(Qt.NoPen)
+                painter.drawPath(self.dots_path)
 
 # --- CUSTOM WIDGET: CATEGORY BAR CHART ---
-class CategoryChart(QWidget):
-    def __init__(self):
+class CategoryChart(CachedChart):
+    """Horizontal bars for a ranking: top categories, products or cashiers."""
+    def __init__(self, empty_text="No Category Data"):
         super().__init__()
-        self.categories = [] # List of (name, total)
+        self.categories = [] # List of (name, total), largest first
+        self.empty_text = empty_text
         self.setMinimumHeight(200)
 
-    def set_data(self, data_dict):
-        # Sort by value desc and take top 5
-        self.categories = sorted(data_dict.items(), key=lambda x: x[1], reverse=True)[:5]
-        print(f"DEBUG: CategoryChart received {len(self.categories)} categories")
-        self.update()
+    def set_data(self, ranking):
+        # Already ranked by TopK
+        self.categories = list(ranking)
+        print(f"DEBUG: CategoryChart received {len(self.categories)} entries")
+        self.invalidate()
 
-    def paintEvent(self, event):
-        painter = QPainter(self)
-        painter.setRenderHint(QPainter.Antialiasing)
-        w, h = self.width(), self.height()
-        
+    def render_chart(self, painter, w, h):
         if not self.categories:
             painter.setPen(QColor(SECONDARY))
-            painter.drawText(self.rect(), Qt.AlignCenter, "No Category Data")
+            painter.drawText(0, 0, w, h, Qt.AlignCenter, self.empty_text)
             return
 
         max_val = self.categories[0][1] if self.categories else 1
@@ -329,6 +424,10 @@ class ReportsWindow(QWidget):
         self.setObjectName("reports_window")
         self.setStyleSheet(STYLESHEET)
         self.all_sales = []
+        self.index = SalesIndex()
+        self.loaded_range = None # (start, end) the index was loaded for
+        self.loading = False
+        self.series = []
         self.init_ui()
         self.refresh_data()
 
@@ -344,19 +443,35 @@ class ReportsWindow(QWidget):
         title_block = QVBoxLayout()
         title = QLabel("Sales Analytics")
         title.setFont(QFont("Segoe UI", 24, QFont.Bold))
-        subtitle = QLabel("Overview of financial performance")
-        subtitle.setStyleSheet(f"color: {SECONDARY}; font-size: 14px;")
+        self.subtitle = QLabel("Overview of financial performance")
+        self.subtitle.setStyleSheet(f"color: {SECONDARY}; font-size: 14px;")
         title_block.addWidget(title)
-        title_block.addWidget(subtitle)
+        title_block.addWidget(self.subtitle)
         
         header.addLayout(title_block)
         header.addStretch()
         
         # Filters
         self.period_combo = QComboBox()
-        self.period_combo.addItems(["Last 7 Days", "Last 30 Days", "This Month", "All Time"])
+        self.period_combo.addItems(["Last 7 Days", "Last 30 Days", "This Month", "All Time", "Custom Range"])
         self.period_combo.setFixedWidth(150)
-        self.period_combo.currentIndexChanged.connect(self.process_data)
+        self.period_combo.currentIndexChanged.connect(self.on_period_changed)
+        
+        # Custom range (inclusive dates), only shown for "Custom Range"
+        self.start_date = QDateEdit(QDate.currentDate().addDays(-30))
+        self.end_date = QDateEdit(QDate.currentDate())
+        for date_edit in (self.start_date, self.end_date):
+            date_edit.setCalendarPopup(True)
+            date_edit.setDisplayFormat("yyyy-MM-dd")
+            date_edit.dateChanged.connect(self.process_data)
+            date_edit.hide()
+        
+        self.granularity_combo = QComboBox()
+        for label, granularity in GRANULARITY_OPTIONS:
+            self.granularity_combo.addItem(label, granularity)
+        self.granularity_combo.setCurrentIndex(1) # Daily
+        self.granularity_combo.setFixedWidth(110)
+        self.granularity_combo.currentIndexChanged.connect(self.process_data)
         
         self.refresh_btn = QPushButton("Refresh")
         self.refresh_btn.setStyleSheet(f"background-color: {PRIMARY}; color: white;")
@@ -364,6 +479,9 @@ class ReportsWindow(QWidget):
         self.refresh_btn.clicked.connect(self.refresh_data)
         
         header.addWidget(self.period_combo)
+        header.addWidget(self.start_date)
+        header.addWidget(self.end_date)
+        header.addWidget(self.granularity_combo)
         header.addWidget(self.refresh_btn)
         main_layout.addLayout(header)
 
@@ -396,9 +514,18 @@ class ReportsWindow(QWidget):
         trend_card.setProperty("card", "true")
         t_layout = QVBoxLayout(trend_card)
         
+        trend_header = QHBoxLayout()
         trend_label = QLabel("Revenue Trend")
         trend_label.setProperty("heading", "true")
-        t_layout.addWidget(trend_label)
+        trend_header.addWidget(trend_label)
+        trend_header.addStretch()
+        
+        trend_export_btn = QPushButton("Export Series")
+        trend_export_btn.setCursor(Qt.PointingHandCursor)
+        trend_export_btn.setStyleSheet(f"color: {PRIMARY}; background: transparent; border: 1px solid {PRIMARY};")
+        trend_export_btn.clicked.connect(self.export_series)
+        trend_header.addWidget(trend_export_btn)
+        t_layout.addLayout(trend_header)
         
         self.trend_chart = TrendChart()
         t_layout.addWidget(self.trend_chart)
@@ -419,6 +546,14 @@ class ReportsWindow(QWidget):
         charts_layout.addWidget(cat_card, 1)   # 1/3 width
         content_layout.addLayout(charts_layout)
         
+        # --- B2. Rankings Row ---
+        rankings_layout = QHBoxLayout()
+        product_card, self.product_chart = self.make_ranking_card("Top Products", "No Product Data")
+        cashier_card, self.cashier_chart = self.make_ranking_card("Top Cashiers", "No Cashier Data")
+        rankings_layout.addWidget(product_card, 1)
+        rankings_layout.addWidget(cashier_card, 1)
+        content_layout.addLayout(rankings_layout)
+        
         # --- C. Recent Transactions Table ---
         table_card = QFrame()
         table_card.setProperty("card", "true")
@@ -430,12 +565,18 @@ class ReportsWindow(QWidget):
         table_label.setProperty("heading", "true")
         tbl_header.addWidget(table_label)
         
-        export_btn = QPushButton("Export CSV")
-        export_btn.setCursor(Qt.PointingHandCursor)
-        export_btn.setStyleSheet(f"color: {PRIMARY}; background: transparent; border: 1px solid {PRIMARY};")
-        export_btn.clicked.connect(self.export_csv)
+        self.export_btn = QPushButton("Export CSV")
+        self.export_btn.setCursor(Qt.PointingHandCursor)
+        self.export_btn.setStyleSheet(f"color: {PRIMARY}; background: transparent; border: 1px solid {PRIMARY};")
+        self.export_btn.clicked.connect(self.export_csv)
+        self.archive_btn = QPushButton("Export Archive")
+        self.archive_btn.setCursor(Qt.PointingHandCursor)
+        self.archive_btn.setToolTip("Compressed columnar file (.poscol) with line items; read it back with columnar.read_sales_archive")
+        self.archive_btn.setStyleSheet(f"color: {PRIMARY}; background: transparent; border: 1px solid {PRIMARY};")
+        self.archive_btn.clicked.connect(self.export_archive)
         tbl_header.addStretch()
-        tbl_header.addWidget(export_btn)
+        tbl_header.addWidget(self.archive_btn)
+        tbl_header.addWidget(self.export_btn)
         
         table_layout.addLayout(tbl_header)
         
@@ -461,79 +602,118 @@ class ReportsWindow(QWidget):
         self.progress.setStyleSheet(f"QProgressBar::chunk {{ background-color: {PRIMARY}; }}")
         self.progress.hide()
         main_layout.addWidget(self.progress)
+        
+        # Export progress (Hidden by default)
+        export_row = QHBoxLayout()
+        self.export_progress = QProgressBar()
+        self.export_progress.setFormat("Exporting... %p%")
+        self.export_progress.setStyleSheet(f"QProgressBar::chunk {{ background-color: {SUCCESS}; }}")
+        self.cancel_export_btn = QPushButton("Cancel")
+        self.cancel_export_btn.setStyleSheet(f"background-color: {DANGER}; color: white;")
+        self.cancel_export_btn.clicked.connect(self.cancel_export)
+        export_row.addWidget(self.export_progress)
+        export_row.addWidget(self.cancel_export_btn)
+        self.export_progress.hide()
+        self.cancel_export_btn.hide()
+        main_layout.addLayout(export_row)
+        self.export_thread = None
+
+    def make_ranking_card(self, title, empty_text):
+        card = QFrame()
+        card.setProperty("card", "true")
+        layout = QVBoxLayout(card)
+        
+        label = QLabel(title)
+        label.setProperty("heading", "true")
+        layout.addWidget(label)
+        
+        chart = CategoryChart(empty_text)
+        layout.addWidget(chart)
+        return card, chart
 
     # --- LOGIC ---
 
     def refresh_data(self):
+        if self.loading:
+            return
+        self.loading = True
         self.progress.show()
         self.progress.setRange(0, 0) # Infinite spinner
         self.refresh_btn.setEnabled(False)
         
-        self.loader = ReportLoaderThread()
-        self.loader.data_loaded.connect(self.on_data_loaded)
+        start, end = self.period_range()
+        self.loader = ReportLoaderThread(start, end)
+        self.loader.data_loaded.connect(lambda index, rejected: self.on_data_loaded(index, rejected, (start, end)))
         self.loader.error_occurred.connect(self.on_error)
         self.loader.start()
 
-    def on_data_loaded(self, sales):
-        self.all_sales = sales
-        print(f"DEBUG: Received {len(sales)} sales in on_data_loaded")
+    def on_data_loaded(self, index, rejected, loaded_range=(None, None)):
+        self.loading = False
+        self.index = index
+        self.loaded_range = loaded_range
+        self.all_sales = index.sales[::-1] # Newest first
+        print(f"DEBUG: Received {len(index)} sales in on_data_loaded")
+        if rejected:
+            self.subtitle.setText(f"Overview of financial performance · {len(rejected)} sale(s) skipped (unreadable date)")
+        else:
+            self.subtitle.setText("Overview of financial performance")
         self.progress.hide()
         self.refresh_btn.setEnabled(True)
         self.process_data()
 
     def on_error(self, msg):
+        self.loading = False
         self.progress.hide()
         self.refresh_btn.setEnabled(True)
         print(f"Report Error: {msg}")
 
-    def parse_date(self, date_str):
-        """Parse date string that could be either with or without time"""
-        try:
-            # Try format with time first
-            return datetime.strptime(date_str, '%Y-%m-%d %H:%M:%S')
-        except ValueError:
-            try:
-                # Try format without time
-                return datetime.strptime(date_str, '%Y-%m-%d')
-            except ValueError:
-                # If both fail, return current date as fallback
-                print(f"DEBUG: Could not parse date: {date_str}")
-                return datetime.now()
+    def on_period_changed(self):
+        custom = self.period_combo.currentText() == "Custom Range"
+        self.start_date.setVisible(custom)
+        self.end_date.setVisible(custom)
+        self.process_data()
 
-    def process_data(self):
-        print("DEBUG: process_data called")
-        
-        # 1. Filter by Date
+    def period_range(self):
+        """(start, end) datetimes for the selected period, end exclusive. None means open-ended."""
         filter_mode = self.period_combo.currentText()
-        filtered = []
-        today = datetime.now().date()
+        today = datetime.combine(datetime.now().date(), datetime.min.time())
         
-        cutoff = None
         if filter_mode == "Last 7 Days":
-            cutoff = today - timedelta(days=7)
-        elif filter_mode == "Last 30 Days":
-            cutoff = today - timedelta(days=30)
-        elif filter_mode == "This Month":
-            cutoff = today.replace(day=1)
-        
-        print(f"DEBUG: Filter mode: {filter_mode}, Cutoff: {cutoff}")
-        
-        for s in self.all_sales:
-            try:
-                # Use full_date if available, otherwise use date
-                date_to_parse = s.full_date if hasattr(s, 'full_date') and s.full_date else s.date
-                s_date = self.parse_date(date_to_parse).date()
-                if cutoff is None or s_date >= cutoff:
-                    filtered.append(s)
-            except Exception as e:
-                print(f"Error parsing date {s.date}: {e}")
-                pass
+            return today - timedelta(days=7), None
+        if filter_mode == "Last 30 Days":
+            return today - timedelta(days=30), None
+        if filter_mode == "This Month":
+            return today.replace(day=1), None
+        if filter_mode == "Custom Range":
+            start = datetime.combine(self.start_date.date().toPyDate(), datetime.min.time())
+            end = datetime.combine(self.end_date.date().toPyDate(), datetime.min.time()) + timedelta(days=1)
+            return start, end
+        return None, None
+
+    def covers(self, start, end):
+        """True if the loaded index holds every sale in [start, end)."""
+        if self.loaded_range is None:
+            return False
+        loaded_start, loaded_end = self.loaded_range
+        return ((loaded_start is None or (start is not None and start >= loaded_start)) and
+                (loaded_end is None or (end is not None and end <= loaded_end)))
 
+    def process_data(self):
+        print("DEBUG: process_data called")
+        
+        # 1. Filter by Date (two bisects into the date index, oldest first)
+        start, end = self.period_range()
+        if not self.covers(start, end):
+            # Wider than what's loaded: read the extra partitions, then come back here
+            self.refresh_data()
+            return
+        filtered = self.index.range(start, end)
+        
+        print(f"DEBUG: Filter mode: {self.period_combo.currentText()}, Range: {start} - {end}")
         print(f"DEBUG: After filtering: {len(filtered)} sales")
 
-        # 2. Calculate KPIs
-        total_rev = sum(s.total for s in filtered)
-        count = len(filtered)
+        # 2. Calculate KPIs (prefix sums over the date index)
+        total_rev, count, _ = self.index.totals(start, end)
         avg = total_rev / count if count > 0 else 0
         
         print(f"DEBUG: KPIs - Revenue: {total_rev}, Orders: {count}, Avg: {avg}")
@@ -543,52 +723,36 @@ class ReportsWindow(QWidget):
         self.card_avg.set_value(f"₱{avg:,.2f}")
 
         # 3. Prepare Chart Data
-        # Trend (Daily Sum)
-        trend_data = defaultdict(float)
-        # Categories - group by product name since there's no category field
-        cat_data = defaultdict(float)
-
-        for s in filtered:
-            # Trend - extract just the date part
-            try:
-                day_str = s.date.split(" ")[0] if " " in s.date else s.date  # YYYY-MM-DD
-                trend_data[day_str] += s.total
-            except Exception as e:
-                print(f"DEBUG: Error processing trend data for sale {s.sale_id}: {e}")
-            
-            # Categories - use product names since there's no category field
-            try:
-                if hasattr(s, 'items') and s.items:
-                    for item in s.items:
-                        # Use product name as category
-                        product_name = item.get('name', 'Unknown Product')
-                        # Calculate item total: price * quantity
-                        quantity = item.get('quantity', 1)
-                        price = item.get('price', 0)
-                        item_total = price * quantity
-                        cat_data[product_name] += item_total
-                else:
-                    # If no items, use a default category
-                    cat_data['Uncategorized'] += s.total
-            except Exception as e:
-                print(f"DEBUG: Error processing category data for sale {s.sale_id}: {e}")
-                cat_data['Uncategorized'] += s.total
+        # Trend (bucketed revenue at the selected granularity)
+        granularity = self.granularity_combo.currentData()
+        self.series = self.index.series(granularity, start, end)
+        trend_data = {p.label: p.revenue for p in self.series}
+        # Rankings: products, categories and cashiers in one pass
+        approximate = len(filtered) > APPROXIMATE_TOP_K_SALES
+        rankings = SalesRankings(TOP_K, approximate).add_sales(filtered)
+        cat_data = rankings.categories.top()
 
         print(f"DEBUG: Trend data points: {len(trend_data)}")
         print(f"DEBUG: Category data points: {len(cat_data)}")
         if cat_data:
-            print(f"DEBUG: Sample category data: {list(cat_data.items())[:3]}")
+            print(f"DEBUG: Sample category data: {cat_data[:3]}")
 
         self.trend_chart.set_data(trend_data)
         self.cat_chart.set_data(cat_data)
+        self.product_chart.set_data(rankings.products.top())
+        self.cashier_chart.set_data(self.cashier_ranking(rankings.cashiers.top()))
 
         # 4. Populate Table (Top 50 recent)
+        self.populate_table(filtered[:-51:-1])
+
+    def populate_table(self, recent):
+        """Fills the Recent Transactions table with recent (newest first)."""
         self.table.setRowCount(0)
-        display_limit = min(len(filtered), 50)
+        display_limit = len(recent)
         self.table.setRowCount(display_limit)
         
         for r in range(display_limit):
-            s = filtered[r]
+            s = recent[r]
             
             # Date
             self.table.setItem(r, 0, QTableWidgetItem(s.date))
@@ -605,20 +769,87 @@ class ReportsWindow(QWidget):
 
         print("DEBUG: Table populated")
 
+    def cashier_ranking(self, ranking):
+        """Swaps cashier ids for usernames where the user still exists."""
+        names = {u.user_id: u.username for u in user_directory.all()}
+        return [(names.get(cashier_id, cashier_id or "Unknown"), total) for cashier_id, total in ranking]
+
     def export_csv(self):
-        if not self.all_sales:
+        """Exports the selected period, one row per line item, on a worker thread."""
+        if self.export_thread is not None and self.export_thread.isRunning():
+            return
+        start, end = self.period_range()
+        lo, hi = self.index.bounds(start, end)
+        if hi <= lo:
+            QMessageBox.warning(self, "No Data", "No sales data to export.")
+            return
+
+        filename = f"sales_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        sales = self.index.sales
+        records = (sales[i] for i in range(lo, hi)) # Streamed, no copy of the range
+        self.start_export(ExportThread(filename, SALE_HEADER, records, sale_rows, hi - lo, self))
+
+    def export_archive(self):
+        """Exports the selected period as a columnar archive on a worker thread."""
+        if self.export_thread is not None and self.export_thread.isRunning():
+            return
+        start, end = self.period_range()
+        sales = self.index.range(start, end)
+        if not sales:
             QMessageBox.warning(self, "No Data", "No sales data to export.")
             return
+        filename = f"sales_archive_{datetime.now().strftime('%Y%m%d_%H%M%S')}.poscol"
+        self.start_export(ArchiveExportThread(filename, sales, parent=self))
+
+    def start_export(self, thread):
+        self.export_thread = thread
+        self.export_thread.progress.connect(self.on_export_progress)
+        self.export_thread.export_finished.connect(self.on_export_finished)
+        self.export_thread.export_cancelled.connect(self.on_export_cancelled)
+        self.export_thread.export_failed.connect(self.on_export_failed)
+        
+        self.export_progress.setRange(0, max(1, thread.total))
+        self.export_progress.setValue(0)
+        self.export_progress.show()
+        self.cancel_export_btn.show()
+        self.export_btn.setEnabled(False)
+        self.archive_btn.setEnabled(False)
+        self.export_thread.start()
+
+    def cancel_export(self):
+        if self.export_thread is not None:
+            self.export_thread.requestInterruption()
+
+    def on_export_progress(self, done, total):
+        self.export_progress.setValue(done)
+
+    def end_export(self):
+        self.export_progress.hide()
+        self.cancel_export_btn.hide()
+        self.export_btn.setEnabled(True)
+        self.archive_btn.setEnabled(True)
+
+    def on_export_finished(self, filename, count):
+        self.end_export()
+        QMessageBox.information(self, "Export Successful", f"{count} sales saved to {filename}")
+
+    def on_export_cancelled(self):
+        self.end_export()
+        QMessageBox.information(self, "Export Cancelled", "The export was cancelled; no file was written.")
+
+    def on_export_failed(self, msg):
+        self.end_export()
+        QMessageBox.critical(self, "Export Failed", msg)
+
+    def export_series(self):
+        if not self.series:
+            QMessageBox.warning(self, "No Data", "No trend data to export.")
+            return
 
         try:
-            filename = f"sales_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-            with open(filename, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow(["Date", "Sale ID", "Total Amount", "Items Count"])
-                for s in self.all_sales:
-                    item_count = len(s.items) if hasattr(s, 'items') and s.items else 0
-                    writer.writerow([s.date, s.sale_id, s.total, item_count])
-            
-            QMessageBox.information(self, "Export Successful", f"Report saved to {filename}")
+            granularity = self.granularity_combo.currentData()
+            filename = f"sales_{granularity}_series_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+            write_series_csv(filename, self.series)
+            QMessageBox.information(self, "Export Successful", f"Series saved to {filename}")
         except Exception as e:
             QMessageBox.critical(self, "Export Failed", str(e))
\ No newline at end of file
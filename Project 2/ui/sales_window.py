@@ -13,7 +13,10 @@ import os
 
 # Assumed imports from your project structure
 from csv_handler import CSVHandler
+from catalog_snapshot import CatalogSnapshot
 from models import Product, Sale, SaleItem
+from sales_store import sales_store
+from ui.checkout_worker import CheckoutCommitter
 
 # --- Helper Classes ---
 
@@ -60,21 +63,27 @@ class ToastNotification(QLabel):
 
 class DataWorker(QThread):
     """Background thread for loading data"""
-    data_loaded = pyqtSignal(list, dict)
+    data_loaded = pyqtSignal(list, dict, int)  # products, promos, generation
+    
+    def __init__(self):
+        super().__init__()
+        # Set by SalesWindow.refresh_products before each start()
+        self.generation = 0
     
     def run(self):
+        # Read before the files, so a load tagged N reflects every write made before request N
+        generation = self.generation
         try:
-            products_data = CSVHandler.read_csv('products.csv')
-            products = [Product.from_dict(p) for p in products_data if p.get('active', 'true').lower() == 'true']
+            products = CatalogSnapshot.load_store('products.csv').rows(active_only=True)
             promo_data = CSVHandler.read_promo_codes()
             promos = {}
             for promo in promo_data:
                 if promo.get('active', 'True').lower() == 'true':
                     promos[promo['code']] = float(promo['discount_percent'])
-            self.data_loaded.emit(products, promos)
+            self.data_loaded.emit(products, promos, generation)
         except Exception as e:
             print(f"Background load error: {e}")
-            self.data_loaded.emit([], {})
+            self.data_loaded.emit([], {}, generation)
 
 # --- Main Window ---
 
@@ -91,6 +100,18 @@ class SalesWindow(QWidget):
         self.products_per_page = 10 
         self.promo_codes = {}
         self.tax_rate = 0.12 
+        # txn -> (sale, payment method) until the writer thread has journaled the sale
+        self.pending_receipts = {}
+        # Stock taken by sales the products list doesn't show yet. The loaded rows are
+        # read-only snapshot views, so the decrements live here: txn -> {product_id: qty}
+        self.stock_overlay = {}
+        self.pending_stock = {}   # product_id -> total qty over stock_overlay
+        self.overlay_release = {} # txn -> load generation that includes its stock write
+        self.load_generation = 0
+        self.committer = CheckoutCommitter(parent=self)
+        self.committer.sale_journaled.connect(self.on_sale_journaled)
+        self.committer.sale_committed.connect(self.on_sale_committed)
+        self.committer.sale_failed.connect(self.on_sale_failed)
         
         self.apply_modern_styles()
         self.setup_ui()
@@ -460,19 +481,39 @@ class SalesWindow(QWidget):
     # --- Data Handling ---
 
     def refresh_products(self):
+        self.load_generation += 1
+        self.loader.generation = self.load_generation
         self.loader.start()
         
     def check_for_updates(self):
         self.refresh_products()
 
-    def on_data_loaded(self, products, promos):
+    def on_data_loaded(self, products, promos, generation=0):
         self.products = products
         self.promo_codes = promos
+        # These products.csv reads already include the committed sales' stock
+        released = [txn for txn, needed in self.overlay_release.items() if needed <= generation]
+        for txn in released:
+            del self.overlay_release[txn]
+            self.stock_overlay.pop(txn, None)
+        if released:
+            self.update_pending_stock()
         self.update_products_table()
         self.update_stats()
 
+    def stock_of(self, product):
+        """Stock shown and checked at the till: the loaded value minus unsaved sales."""
+        return max(0, product.stock - self.pending_stock.get(product.product_id, 0))
+
+    def update_pending_stock(self):
+        totals = {}
+        for quantities in self.stock_overlay.values():
+            for pid, qty in quantities.items():
+                totals[pid] = totals.get(pid, 0) + qty
+        self.pending_stock = totals
+
     def update_stats(self):
-        low_stock = sum(1 for p in self.products if p.stock < 10)
+        low_stock = sum(1 for p in self.products if self.stock_of(p) < 10)
         self.stats_label.setText(f"{len(self.products)} Products | {low_stock} Low Stock")
 
     def filter_products_local(self):
@@ -523,12 +564,13 @@ class SalesWindow(QWidget):
             price_item.setForeground(QColor("#16a34a"))
             self.products_table.setItem(row, 2, price_item)
             
-            stock_widget = QLabel(str(product.stock))
+            stock = self.stock_of(product)
+            stock_widget = QLabel(str(stock))
             stock_widget.setAlignment(Qt.AlignCenter)
-            if product.stock == 0:
+            if stock == 0:
                 stock_widget.setStyleSheet("background-color: #fee2e2; color: #dc2626; border-radius: 4px; padding: 2px;")
                 stock_widget.setText("OUT")
-            elif product.stock < 10:
+            elif stock < 10:
                 stock_widget.setStyleSheet("background-color: #fef3c7; color: #d97706; border-radius: 4px; padding: 2px;")
             self.products_table.setCellWidget(row, 3, stock_widget)
             
@@ -542,7 +584,7 @@ class SalesWindow(QWidget):
                 QPushButton:hover { background-color: #1d4ed8; }
             """)
             add_btn.clicked.connect(lambda checked, p=product: self.add_product_to_cart(p))
-            if product.stock <= 0: add_btn.setEnabled(False)
+            if stock <= 0: add_btn.setEnabled(False)
             
             btn_layout.addWidget(add_btn)
             self.products_table.setCellWidget(row, 4, btn_widget)
@@ -581,12 +623,12 @@ class SalesWindow(QWidget):
     # --- Cart Logic ---
 
     def add_product_to_cart(self, product):
-        if product.stock <= 0:
+        if self.stock_of(product) <= 0:
             self.toast.show_message("Out of Stock!")
             return
         for item in self.cart:
             if item.product_id == product.product_id:
-                if item.quantity + 1 > product.stock:
+                if item.quantity + 1 > self.stock_of(product):
                     self.toast.show_message("Max Stock Reached")
                     return
                 item.quantity += 1
@@ -598,7 +640,8 @@ class SalesWindow(QWidget):
             name=product.name,
             quantity=1,
             price=product.price,
-            tax_rate=self.tax_rate
+            tax_rate=self.tax_rate,
+            category=product.category
         )
         self.cart.append(new_item)
         self.update_cart_table()
@@ -689,7 +732,7 @@ class SalesWindow(QWidget):
             if not product:
                 QMessageBox.warning(self, 'Product Not Found', f'{item.name} is no longer available')
                 return
-            if product.stock < item.quantity:
+            if self.stock_of(product) < item.quantity:
                 QMessageBox.warning(self, 'Insufficient Stock', f'Not enough stock for {item.name}')
                 return
         
@@ -708,13 +751,47 @@ class SalesWindow(QWidget):
         elif payment_method in ['gcash', 'maya']:
             QMessageBox.information(self, f"{payment_method.upper()} Payment", f"Waiting for {payment_method.upper()} confirmation...\n(Simulated Success)")
 
-        sale_obj = self.record_sale(payment_method, total_amount)
-        self.show_receipt(sale_obj, payment_method)
+        # Saved on the checkout writer thread; the receipt opens in on_sale_journaled
+        if self.record_sale(payment_method, total_amount) is None:
+            return
         self.cart.clear()
         self.update_cart_table()
         self.discount_input.setValue(0)
+
+    def on_sale_journaled(self, txn, sale):
+        entry = self.pending_receipts.pop(txn, None)
+        if entry is None:
+            return
         self.toast.show_message("Transaction Complete!")
-        self.data_updated.emit() 
+        self.show_receipt(sale, entry[1])
+
+    def on_sale_committed(self, txn):
+        # products.csv now has the new stock counts; the overlay goes once a load
+        # started after this point arrives
+        if txn in self.stock_overlay:
+            self.overlay_release[txn] = self.load_generation + 1
+        self.data_updated.emit()
+
+    def on_sale_failed(self, txn, error):
+        entry = self.pending_receipts.pop(txn, None)
+        if entry is None:
+            # Journaled already: the writer finishes it before the next sale, or recovery does.
+            # Either way the decrement lands in products.csv, so the overlay must go with the
+            # next load, or the till would take the stock twice for the rest of the session
+            self.toast.show_message("Sale saved; stock update pending")
+            if txn in self.stock_overlay:
+                self.overlay_release[txn] = self.load_generation + 1
+            self.refresh_products()
+            return
+        # Never journaled, so its stock was never taken
+        self.stock_overlay.pop(txn, None)
+        self.update_pending_stock()
+        self.update_products_table(self.search_input.text().lower())
+        sale = entry[0]
+        if not self.cart:
+            self.cart = list(sale.items)
+            self.update_cart_table()
+        QMessageBox.warning(self, 'Checkout Failed', f'The sale could not be saved: {error}')
 
     def record_sale(self, payment_method, total):
         sale_id = self.generate_sale_id()
@@ -733,25 +810,29 @@ class SalesWindow(QWidget):
             cashier_id=self.current_user.user_id
         )
         try:
-            CSVHandler.append_csv('sales.csv', sale.to_dict())
-            products_list = CSVHandler.read_csv('products.csv')
-            for item in self.cart:
-                for p_data in products_list:
-                    if p_data['product_id'] == item.product_id:
-                        curr = int(p_data.get('stock', 0))
-                        new_stock = max(0, curr - item.quantity)
-                        CSVHandler.update_csv('products.csv', 'product_id', item.product_id, {'stock': str(new_stock)})
-                        break
-            return sale
+            # Journaled: the sale and its stock changes either both land or are
+            # completed by checkout recovery on the next start
+            txn = self.committer.submit(sale, [(item.product_id, item.quantity) for item in self.cart])
         except Exception as e:
             print(f"Error saving sale: {e}")
-            return sale
+            QMessageBox.warning(self, 'Checkout Failed', f'The sale could not be saved: {e}')
+            return None
+        self.pending_receipts[txn] = (sale, payment_method)
+        # Keep the stock check honest until the writer's products.csv update is reloaded
+        quantities = {}
+        for item in self.cart:
+            quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+        self.stock_overlay[txn] = quantities
+        self.update_pending_stock()
+        self.update_products_table(self.search_input.text().lower())
+        return sale
 
     def generate_sale_id(self):
         try:
-            sales = CSVHandler.read_csv('sales.csv')
-            return str(len(sales) + 1)
-        except:
+            # Reserved from the sales manifest, so sales still being written get distinct ids
+            return sales_store.reserve_sale_id()
+        except Exception as e:
+            print(f"Error reading next sale id: {e}")
             return "1"
 
     def show_receipt(self, sale, payment_method):
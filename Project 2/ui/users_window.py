@@ -1,15 +1,14 @@
-import hashlib
 import uuid
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                              QPushButton, QTableWidget, QTableWidgetItem,
                              QHeaderView, QMessageBox, QDialog, QDialogButtonBox,
                              QLineEdit, QComboBox, QCheckBox, QFrame, QGraphicsOpacityEffect,
                              QFormLayout, QAbstractItemView, QSizePolicy, QStyle)
-from PyQt5.QtCore import Qt, QTimer, QPropertyAnimation, QSize
+from PyQt5.QtCore import Qt, QTimer, QPropertyAnimation, QSize, QThread, pyqtSignal
 from PyQt5.QtGui import QFont, QIcon, QColor, QCursor
 
-from csv_handler import CSVHandler
-from models import User
+from passwords import hash_password
+from user_directory import user_directory
 
 # --- STYLING CONSTANTS (Matches Inventory) ---
 PRIMARY_COLOR = "#2563eb"
@@ -93,12 +92,28 @@ class ToastNotification(QLabel):
         self.animation.start()
 
 # --- Helper: User Dialog ---
+class PasswordHashThread(QThread):
+    """Hashes a new password off the GUI thread (PBKDF2 is deliberately slow)"""
+    hashed = pyqtSignal(str)
+    failed = pyqtSignal(str)
+
+    def __init__(self, password, parent=None):
+        super().__init__(parent)
+        self.password = password
+
+    def run(self):
+        try:
+            self.hashed.emit(hash_password(self.password))
+        except Exception as e:
+            self.failed.emit(str(e))
+
 class UserFormDialog(QDialog):
     def __init__(self, parent=None, user=None, existing_usernames=[]):
         super().__init__(parent)
         self.user = user
         self.existing_usernames = existing_usernames
         self.is_edit = user is not None
+        self.hash_thread = None
         self.setWindowTitle("Edit User" if self.is_edit else "New User")
         self.setMinimumSize(400, 380)
         self.setStyleSheet("""
@@ -157,7 +172,7 @@ class UserFormDialog(QDialog):
         cancel_btn.clicked.connect(self.reject)
         cancel_btn.setStyleSheet("background: white; border: 1px solid #cbd5e1; padding: 6px 14px; border-radius: 4px; color: #475569;")
         
-        save_btn = QPushButton("Save User")
+        self.save_btn = save_btn = QPushButton("Save User")
         save_btn.setCursor(Qt.PointingHandCursor)
         save_btn.clicked.connect(self.save_user)
         save_btn.setStyleSheet(f"background: {PRIMARY_COLOR}; color: white; border: none; padding: 6px 14px; border-radius: 4px; font-weight: bold;")
@@ -167,6 +182,8 @@ class UserFormDialog(QDialog):
         layout.addLayout(btn_box)
         
     def save_user(self):
+        if self.hash_thread is not None and self.hash_thread.isRunning():
+            return
         username = self.username_input.text().strip()
         password = self.password_input.text().strip()
         
@@ -179,24 +196,49 @@ class UserFormDialog(QDialog):
             QMessageBox.warning(self, 'Duplicate', f'The username "{username}" is already taken.')
             return
 
-        final_password = self.user.password if self.is_edit else ""
-        if password:
-            final_password = hashlib.sha256(password.encode()).hexdigest()
-        elif not self.is_edit:
+        if not password and not self.is_edit:
             QMessageBox.warning(self, 'Required', 'Password is required for new users')
             return
+        if not password:
+            self.finish_save(self.user.password)
+            return
+
+        # Hash on a background thread; the dialog closes once it's done
+        self.set_inputs_enabled(False)
+        self.save_btn.setText("Saving...")
+        self.hash_thread = PasswordHashThread(password, self)
+        self.hash_thread.hashed.connect(self.finish_save)
+        self.hash_thread.failed.connect(self.on_hash_failed)
+        self.hash_thread.start()
+
+    def set_inputs_enabled(self, enabled):
+        for widget in (self.username_input, self.password_input, self.role_combo,
+                       self.active_check, self.save_btn):
+            widget.setEnabled(enabled)
 
+    def on_hash_failed(self, error):
+        self.set_inputs_enabled(True)
+        self.save_btn.setText("Save User")
+        QMessageBox.critical(self, 'Error', f'Could not hash the password: {error}')
+
+    def finish_save(self, final_password):
         user_id = self.user.user_id if self.is_edit else str(uuid.uuid4().int)[:8]
         
         self.user_data = {
             'user_id': user_id,
-            'username': username,
+            'username': self.username_input.text().strip(),
             'password': final_password,
             'role': self.role_combo.currentText(),
             'active': str(self.active_check.isChecked())
         }
         self.accept()
 
+    def done(self, result):
+        # The hash thread is our child; it must not be destroyed while running
+        if self.hash_thread is not None:
+            self.hash_thread.wait()
+        super().done(result)
+
 # --- Main Window ---
 class UsersWindow(QWidget):
     def __init__(self):
@@ -289,8 +331,7 @@ class UsersWindow(QWidget):
 
     def load_users(self):
         try:
-            data = CSVHandler.read_csv('users.csv')
-            self.users = [User.from_dict(u) for u in data]
+            self.users = user_directory.all()
             self.filter_users()
             self.toast.show_message("Users Loaded")
         except Exception as e:
@@ -376,7 +417,7 @@ class UsersWindow(QWidget):
         dialog = UserFormDialog(self, existing_usernames=usernames)
         if dialog.exec_() == QDialog.Accepted:
             try:
-                CSVHandler.append_csv('users.csv', dialog.user_data)
+                user_directory.add(dialog.user_data)
                 self.load_users()
                 self.toast.show_message(f"User Added")
             except Exception as e:
@@ -387,7 +428,7 @@ class UsersWindow(QWidget):
         dialog = UserFormDialog(self, user, existing_usernames=usernames)
         if dialog.exec_() == QDialog.Accepted:
             try:
-                CSVHandler.update_csv('users.csv', 'user_id', user.user_id, dialog.user_data)
+                user_directory.update(user.user_id, dialog.user_data)
                 self.load_users()
                 self.toast.show_message(f"User Updated")
             except Exception as e:
@@ -395,16 +436,20 @@ class UsersWindow(QWidget):
 
     def delete_user(self, user):
         # Prevent deleting last admin
-        admins = [u for u in self.users if u.role == "Admin" and str(u.active).lower() == 'true']
-        if user.role == "Admin" and len(admins) <= 1:
+        admins = [u for u in self.users if user_directory.is_active_admin(u.to_dict())]
+        if user_directory.is_active_admin(user.to_dict()) and len(admins) <= 1:
             QMessageBox.critical(self, "Action Denied", "You cannot delete the only active Administrator.")
             return
 
         confirm = QMessageBox.question(self, "Confirm Delete", f"Delete user '{user.username}'?", QMessageBox.Yes | QMessageBox.No)
         if confirm == QMessageBox.Yes:
             try:
-                CSVHandler.delete_row('users.csv', 'user_id', user.user_id)
+                user_directory.delete(user.user_id)
                 self.load_users()
                 self.toast.show_message("User Deleted")
+            except ValueError as e:
+                # Refused against the current users.csv (another terminal may have changed it)
+                QMessageBox.critical(self, "Action Denied", str(e))
+                self.load_users()
             except Exception as e:
                 QMessageBox.critical(self, "Error", str(e))
\ No newline at end of file
@@ -0,0 +1,133 @@
+import os
+import threading
+
+from csv_handler import CSVHandler
+from models import User
+from passwords import hash_password
+
+
+class UserDirectory:
+    """users.csv loaded once and indexed by username.
+
+    The file's mtime and size are checked on every lookup (a single stat call), so edits
+    made by another terminal are picked up; writes made through this class invalidate
+    the cache directly."""
+    def __init__(self, filename='users.csv'):
+        self.filename = filename
+        self.users = []
+        self.by_username = {}
+        self.stamp = None
+        # Password upgrades write from a background thread
+        self.lock = threading.RLock()
+
+    def file_stamp(self):
+        try:
+            st = os.stat(self.filename)
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    def invalidate(self):
+        self.stamp = None
+
+    def refresh(self):
+        """Reloads users.csv if it changed since the last load."""
+        with self.lock:
+            self.reload_if_changed()
+
+    def reload_if_changed(self):
+        stamp = self.file_stamp()
+        if stamp is not None and stamp == self.stamp:
+            return
+        users = []
+        for row in CSVHandler.read_csv(self.filename):
+            try:
+                users.append(User.from_dict(row))
+            except Exception as e:
+                print(f"Error parsing user: {e}")
+        index = {}
+        for user in users:
+            # A hand-edited users.csv can repeat a username; lookups use its first row
+            if user.username not in index:
+                index[user.username] = user
+        self.users = users
+        self.by_username = index
+        self.stamp = stamp
+
+    # --- Lookups ---
+
+    def get(self, username):
+        self.refresh()
+        return self.by_username.get(username)
+
+    def all(self):
+        self.refresh()
+        return list(self.users)
+
+    def usernames(self):
+        self.refresh()
+        return [u.username for u in self.users]
+
+    # --- Writes ---
+
+    def ensure_defaults(self):
+        """Create default users if none exist. Hashes their passwords, so call it off the GUI thread."""
+        with self.lock:
+            self.reload_if_changed()
+            if self.users:
+                return
+            CSVHandler.append_csv(self.filename, User('1', 'admin', hash_password('admin123'), 'Admin', True).to_dict())
+            CSVHandler.append_csv(self.filename, User('2', 'cashier', hash_password('cashier123'), 'Cashier', True).to_dict())
+            self.invalidate()
+
+    def add(self, user_data):
+        with self.lock:
+            CSVHandler.append_csv(self.filename, user_data)
+            self.invalidate()
+
+    def update(self, user_id, user_data):
+        with self.lock:
+            CSVHandler.update_csv(self.filename, 'user_id', user_id, user_data)
+            self.invalidate()
+
+    def delete(self, user_id):
+        """Deletes a user. Raises ValueError, leaving users.csv unchanged, if the user
+        doesn't exist or is the last user or the last active Admin."""
+        with self.lock:
+            rows = CSVHandler.read_csv(self.filename)
+            target = [row for row in rows if row.get('user_id') == str(user_id)]
+            remaining = [row for row in rows if row.get('user_id') != str(user_id)]
+            if not target:
+                raise ValueError("That user no longer exists.")
+            if not remaining:
+                raise ValueError("You cannot delete the only user.")
+            if any(self.is_active_admin(row) for row in target) and not any(self.is_active_admin(row) for row in remaining):
+                raise ValueError("You cannot delete the only active Administrator.")
+            CSVHandler.write_csv(self.filename, remaining)
+            self.invalidate()
+
+    @staticmethod
+    def is_active_admin(row):
+        # Hand-edited users.csv rows may say 'admin' or ' Admin'; MainWindow.is_admin accepts both
+        return (str(row.get('role', '')).strip().lower() == 'admin' and
+                str(row.get('active', 'true')).strip().lower() == 'true')
+
+    def upgrade_password(self, user, password):
+        """Re-hashes a legacy (plaintext / unsalted) password on a background thread."""
+        def work():
+            try:
+                new_hash = hash_password(password)
+                with self.lock:
+                    self.reload_if_changed()
+                    current = self.by_username.get(user.username)
+                    # Skip if the password was changed while we were hashing
+                    if current is not None and current.password == user.password:
+                        self.update(user.user_id, {'password': new_hash})
+            except Exception as e:
+                print(f"Error upgrading password for {user.username}: {e}")
+
+        threading.Thread(target=work, daemon=True).start()
+
+
+# Shared by the login screen and the users page
+user_directory = UserDirectory()